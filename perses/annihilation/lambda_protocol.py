@@ -41,6 +41,21 @@ class RelativeAlchemicalState(AlchemicalState):
         'lambda_torsions': lambda x: x
     }
 
+    # the same functions as OpenMM expressions of the master lambda, e.g. for use in a CustomIntegrator
+    # (step(x) is 1 for x >= 0, and select(x, y, z) is z if x = 0 and y otherwise). Keep them in sync with
+    # lambda_functions; test_lambda_schedule checks that they agree.
+    lambda_expressions = {
+        'lambda_sterics_core': 'lambda',
+        'lambda_electrostatics_core': 'lambda',
+        'lambda_sterics_insert': 'select(step(lambda - 0.5), 1.0, 2.0*lambda)',
+        'lambda_sterics_delete': 'select(step(lambda - 0.5), 2.0*(lambda - 0.5), 0.0)',
+        'lambda_electrostatics_insert': 'select(step(lambda - 0.5), 2.0*(lambda - 0.5), 0.0)',
+        'lambda_electrostatics_delete': 'select(step(lambda - 0.5), 1.0, 2.0*lambda)',
+        'lambda_bonds': 'lambda',
+        'lambda_angles': 'lambda',
+        'lambda_torsions': 'lambda'
+    }
+
     class _LambdaParameter(AlchemicalState._LambdaParameter):
         pass
 
@@ -64,3 +79,68 @@ class RelativeAlchemicalState(AlchemicalState):
            lambda_value = self.lambda_functions[parameter_name](master_lambda)
            setattr(self, parameter_name, lambda_value)
 
+    @classmethod
+    def compute_lambda_table(cls, master_lambdas, lambda_functions=None):
+        """Tabulate the lambda functions over a grid of master lambda values.
+
+        The table can be computed once for a protocol (or a set of windows), and the state
+        parameters then set with set_alchemical_parameters_from_table, without evaluating
+        the lambda functions again.
+
+        Parameters
+        ----------
+        master_lambdas : iterable of float
+            The master lambda values of the grid
+        lambda_functions : dict of str: callable, optional, default None
+            The function of the master lambda for each parameter. If None, lambda_functions is used.
+
+        Returns
+        -------
+        lambda_table : dict of str: np.ndarray
+            The value of each parameter at each master lambda of the grid
+        """
+        if lambda_functions is None:
+            lambda_functions = cls.lambda_functions
+        return {parameter_name: np.array([lambda_function(master_lambda) for master_lambda in master_lambdas], dtype=np.float64)
+                for parameter_name, lambda_function in lambda_functions.items()}
+
+    def set_alchemical_parameters_from_table(self, lambda_table, index):
+        """Set each lambda value to an entry of a table computed with compute_lambda_table.
+
+        Parameters
+        ----------
+        lambda_table : dict of str: np.ndarray
+            The value of each parameter at each master lambda of the grid
+        index : int
+            The index of the master lambda in the grid
+        """
+        for parameter_name, lambda_values in lambda_table.items():
+            setattr(self, parameter_name, float(lambda_values[index]))
+
+    @classmethod
+    def compile_lambda_functions(cls, lambda_functions=None):
+        """Get the OpenMM expression of the master lambda for each lambda function, e.g. to switch the parameters
+        within a CustomIntegrator.
+
+        Parameters
+        ----------
+        lambda_functions : dict of str: callable or str, optional, default None
+            The function of the master lambda for each parameter. Each function must either be an expression string
+            (which is used as is) or one of the functions of lambda_functions. If None, lambda_functions is used.
+
+        Returns
+        -------
+        lambda_expressions : dict of str: str
+            The expression of the master lambda 'lambda' for each parameter
+        """
+        if lambda_functions is None:
+            lambda_functions = cls.lambda_functions
+        lambda_expressions = dict()
+        for parameter_name, lambda_function in lambda_functions.items():
+            if isinstance(lambda_function, str):
+                lambda_expressions[parameter_name] = lambda_function
+            elif cls.lambda_functions.get(parameter_name) is lambda_function:
+                lambda_expressions[parameter_name] = cls.lambda_expressions[parameter_name]
+            else:
+                raise ValueError("The lambda function of {} has no known OpenMM expression".format(parameter_name))
+        return lambda_expressions
@@ -4,7 +4,7 @@ import copy
 import logging
 import traceback
 from simtk import openmm, unit
-from perses.dispersed.feptasks import NonequilibriumSwitchingMove, compute_reduced_potential, ExternalNonequilibriumSwitchingMove
+from perses.dispersed.feptasks import NonequilibriumSwitchingMove, compute_reduced_potential
 from perses.storage import NetCDFStorageView
 from perses.annihilation.new_relative import HybridTopologyFactory
 from perses.tests.utils import quantity_is_finite
@@ -80,13 +80,15 @@ class NCMCEngine(object):
         verbose : bool, optional, default=False
             If True, print debug information.
         LRUCapacity : int, default 10
-            Capacity of LRU cache for hybrid systems
+            Capacity of LRU cache for hybrid systems. Use hybrid_cache_statistics to monitor how often the cache is hit.
+            On a miss, the hybrid system of the reverse transformation is derived from the cached factory of the
+            forward one (if any) rather than built from scratch.
         pressure : float, default None
             The pressure to use for the simulation. If None, no barostat
         """
         # Handle some defaults.
         if functions == None:
-            functions = python_hybrid_functions
+            functions = RelativeAlchemicalState.lambda_expressions
         if nsteps == None:
             nsteps = default_nsteps
         if timestep == None:
@@ -108,7 +110,12 @@ class NCMCEngine(object):
         self._angle_softening_constant = angle_softening_constant
         self._disable_barostat = False
         self._hybrid_cache = LRUCache(capacity=LRUCapacity)
+        self._hybrid_cache_hits = 0
+        self._hybrid_cache_misses = 0
+        self._hybrid_cache_reversals = 0
         self._measure_shadow_work = measure_shadow_work
+        # the alchemical parameters at lambda = 0 and 1, which are looked up rather than evaluated for each proposal
+        self._endpoint_lambda_table = RelativeAlchemicalState.compute_lambda_table([0.0, 1.0])
 
         self._nattempted = 0
 
@@ -130,6 +137,17 @@ class NCMCEngine(object):
         beta = 1.0 / kT
         return beta
 
+    @property
+    def hybrid_cache_statistics(self):
+        """
+        The number of hits and misses of the hybrid factory cache, the hit rate (None if the cache was never used), and
+        the number of misses that were served by reversing the cached factory of the reverse transformation.
+        """
+        n_lookups = self._hybrid_cache_hits + self._hybrid_cache_misses
+        hit_rate = self._hybrid_cache_hits / n_lookups if n_lookups > 0 else None
+        return {'hits': self._hybrid_cache_hits, 'misses': self._hybrid_cache_misses, 'hit_rate': hit_rate,
+                'reversals': self._hybrid_cache_reversals}
+
     def _compute_energy_contribution(self, hybrid_thermodynamic_state, initial_sampler_state, final_sampler_state):
         """
         Compute NCMC energy contribution to log probability.
@@ -151,10 +169,10 @@ class NCMCEngine(object):
         logP_energy : float
             The NCMC energy contribution to log probability.
         """
-        hybrid_thermodynamic_state.set_alchemical_parameters(0.0)
+        hybrid_thermodynamic_state.set_alchemical_parameters_from_table(self._endpoint_lambda_table, 0)
         initial_reduced_potential = compute_reduced_potential(hybrid_thermodynamic_state, initial_sampler_state)
 
-        hybrid_thermodynamic_state.set_alchemical_parameters(1.0)
+        hybrid_thermodynamic_state.set_alchemical_parameters_from_table(self._endpoint_lambda_table, 1)
         final_reduced_potential = compute_reduced_potential(hybrid_thermodynamic_state, final_sampler_state)
 
         return final_reduced_potential - initial_reduced_potential
@@ -184,12 +202,37 @@ class NCMCEngine(object):
         
         return thermostates[0], thermostates[1]
 
+    def _hybrid_cache_key(self, topology_proposal, reverse=False):
+        """
+        The key of a transformation in the hybrid factory cache. Proposals are created anew at every iteration, so the key
+        is built from the content of the transformation (the chemical states and the atom map) rather than the proposal.
+
+        Arguments
+        ---------
+        topology_proposal : perses.rjmc.TopologyProposal
+            The proposed transformation
+        reverse : bool, default False
+            If True, the key of the reverse transformation (new -> old) is returned
+
+        Returns
+        -------
+        key : tuple
+            The old and new chemical state keys and the sorted items of the new to old atom map
+        """
+        if reverse:
+            return (topology_proposal.new_chemical_state_key, topology_proposal.old_chemical_state_key,
+                    tuple(sorted(topology_proposal.old_to_new_atom_map.items())))
+        return (topology_proposal.old_chemical_state_key, topology_proposal.new_chemical_state_key,
+                tuple(sorted(topology_proposal.new_to_old_atom_map.items())))
+
     def make_alchemical_system(self, topology_proposal, current_positions, new_positions):
         """
         Generate an alchemically-modified system at the correct atoms
         based on the topology proposal. This method generates a hybrid system using the new 
         HybridTopologyFactory. It memoizes so that calling multiple times (within a recent time period)
-        will immediately return a cached object.
+        with the same transformation will immediately return a cached object, with updated positions. If only the
+        reverse transformation is cached (e.g. for the back-move of an expanded ensemble), its factory is reversed
+        with HybridTopologyFactory.reverse() instead of building the hybrid system again.
 
         Arguments
         ---------
@@ -205,19 +248,35 @@ class NCMCEngine(object):
         hybrid_factory : perses.annihilation.new_relative.HybridTopologyFactory
             a factory object containing the hybrid system
         """
+        cache_key = self._hybrid_cache_key(topology_proposal)
         try:
-            hybrid_factory = self._hybrid_cache[topology_proposal]
-
-            #If we've retrieved the factory from the cache, update it to include the relevant positions
-            hybrid_factory._old_positions = current_positions
-            hybrid_factory._new_positions = new_positions
-            hybrid_factory._compute_hybrid_positions()
+            hybrid_factory = self._hybrid_cache[cache_key]
+            self._hybrid_cache_hits += 1
         except KeyError:
+            self._hybrid_cache_misses += 1
             try:
-                hybrid_factory = HybridTopologyFactory(topology_proposal, current_positions, new_positions, bond_softening_constant=self._bond_softening_constant, angle_softening_constant=self._angle_softening_constant)
-                self._hybrid_cache[topology_proposal] = hybrid_factory
-            except:
-                hybrid_factory = None
+                reverse_factory = self._hybrid_cache[self._hybrid_cache_key(topology_proposal, reverse=True)]
+            except KeyError:
+                reverse_factory = None
+
+            if reverse_factory is None:
+                try:
+                    hybrid_factory = HybridTopologyFactory(topology_proposal, current_positions, new_positions, bond_softening_constant=self._bond_softening_constant, angle_softening_constant=self._angle_softening_constant)
+                    self._hybrid_cache[cache_key] = hybrid_factory
+                except:
+                    hybrid_factory = None
+                return hybrid_factory
+
+            #the hybrid system of this transformation is that of the reverse one, with lambda reversed
+            hybrid_factory = reverse_factory.reverse()
+            self._hybrid_cache_reversals += 1
+            self._hybrid_cache[cache_key] = hybrid_factory
+
+        #If we've retrieved the factory from the cache, update it to include the relevant positions
+        hybrid_factory._topology_proposal = topology_proposal
+        hybrid_factory._old_positions = current_positions
+        hybrid_factory._new_positions = new_positions
+        hybrid_factory._hybrid_positions = hybrid_factory._compute_hybrid_positions()
 
 
         return hybrid_factory
@@ -274,7 +333,7 @@ class NCMCEngine(object):
 
         #Now create an RelativeAlchemicalState from the hybrid system:
         alchemical_state = RelativeAlchemicalState.from_system(hybrid_system)
-        alchemical_state.set_alchemical_parameters(0.0)
+        alchemical_state.set_alchemical_parameters_from_table(self._endpoint_lambda_table, 0)
 
         #Now create a compound thermodynamic state that combines the hybrid thermodynamic state with the alchemical state:
         compound_thermodynamic_state = CompoundThermodynamicState(hybrid_thermodynamic_state, composable_states=[alchemical_state])
@@ -286,15 +345,15 @@ class NCMCEngine(object):
         initial_hybrid_sampler_state = SamplerState(initial_hybrid_positions, box_vectors=initial_hybrid_box_vectors)
         final_hybrid_sampler_state = copy.deepcopy(initial_hybrid_sampler_state)
 
-        #create the nonequilibrium move:
-        #ne_move = NonequilibriumSwitchingMove(self._functions, self._integrator_splitting, self._temperature, self._nsteps, self._timestep,
-        #                                      work_save_interval=self._write_ncmc_interval, top=topology,subset_atoms=None,
-        #                                      save_configuration=self._save_configuration, measure_shadow_work=self._measure_shadow_work)
-
-        ne_move = ExternalNonequilibriumSwitchingMove(self._functions, nsteps_neq=self._nsteps,
-                                                      timestep=self._timestep, temperature=self._temperature,
-                                                      work_configuration_save_interval=self._work_save_interval,
-                                                      splitting="V R O R V")
+        #create the nonequilibrium move, which switches lambda within the integrator. Without storage, only the total
+        #work is needed, so the whole protocol is run in a single call and no configurations are saved:
+        if self._save_configuration:
+            ne_move = NonequilibriumSwitchingMove(self._functions, self._integrator_splitting, self._temperature, self._nsteps, self._timestep,
+                                                  work_save_interval=self._write_ncmc_interval, top=topology, subset_atoms=None,
+                                                  save_configuration=True, measure_shadow_work=self._measure_shadow_work)
+        else:
+            ne_move = NonequilibriumSwitchingMove(self._functions, self._integrator_splitting, self._temperature, self._nsteps, self._timestep,
+                                                  work_save_interval=self._nsteps, measure_shadow_work=self._measure_shadow_work)
 
 
         #run the NCMC protocol
@@ -339,25 +398,24 @@ class NCMCEngine(object):
         old_box_vectors = copy.deepcopy(new_box_vectors) #these are the same as the new system
         final_old_sampler_state = SamplerState(old_positions, box_vectors=old_box_vectors)
 
-        #extract the trajectory and box vectors from the move:
-        trajectory = ne_move.trajectory[::-self._write_ncmc_interval, :, :][::-1]
-        topology = hybrid_factory.hybrid_topology
-        position_varname = "ncmcpositions"
-        nframes = np.shape(trajectory)[0]
+        #extract the trajectory and box vectors from the move (without storage, the move only records the work).
+        #the move records a frame every write_ncmc_interval steps:
+        if self._storage:
+            ncmc_trajectory = ne_move.trajectory
+            trajectory = ncmc_trajectory.xyz
+            topology = hybrid_factory.hybrid_topology
+            position_varname = "ncmcpositions"
+            nframes = np.shape(trajectory)[0]
 
-        #extract box vectors:
-        box_vec_varname = "ncmcboxvectors"
-        box_lengths = ne_move.box_lengths[::-self._write_ncmc_interval, :][::-1]
-        box_angles = ne_move.box_angles[::-self._write_ncmc_interval, :][::-1]
-        box_lengths_and_angles = np.stack([box_lengths, box_angles])
+            #extract box vectors:
+            box_vec_varname = "ncmcboxvectors"
+            box_lengths_and_angles = np.stack([ncmc_trajectory.unitcell_lengths, ncmc_trajectory.unitcell_angles])
 
-        #write out the positions of the topology
-        if self._storage:
+            #write out the positions of the topology
             for frame in range(nframes):
                 self._storage.write_configuration(position_varname, trajectory[frame, :, :], topology, iteration=iteration, frame=frame, nframes=nframes)
 
-        #write out the periodict box vectors:
-        if self._storage:
+            #write out the periodict box vectors:
             self._storage.write_array(box_vec_varname, box_lengths_and_angles, iteration=iteration)
 
         #retrieve the protocol work and write that out too:
@@ -6,9 +6,16 @@ import mdtraj as md
 import numpy as np
 import copy
 import enum
+import hashlib
+import os
+import pickle
+import re
+import shutil
+import tempfile
 from io import StringIO
 import lxml.etree as etree
 from openmmtools.constants import ONE_4PI_EPS0
+from perses.utils.openmm_utils import read_serialized_force_terms
 
 InteractionGroup = enum.Enum("InteractionGroup", ['unique_old', 'unique_new', 'core', 'environment'])
 
@@ -47,7 +54,16 @@ class HybridTopologyFactory(object):
 
     _known_forces = {'HarmonicBondForce', 'HarmonicAngleForce', 'PeriodicTorsionForce', 'NonbondedForce', 'MonteCarloBarostat'}
 
-    def __init__(self, topology_proposal, current_positions, new_positions, use_dispersion_correction=False, functions=None, softcore_alpha=None, bond_softening_constant=1.0, angle_softening_constant=1.0, soften_only_new=False):
+    #attributes that are only needed to construct (or reverse) the hybrid system; see freeze()
+    _construction_attributes = ['_topology_proposal', '_old_system', '_new_system', '_old_system_forces', '_new_system_forces',
+                                '_old_system_exceptions', '_new_system_exceptions', '_old_positions', '_new_positions',
+                                '_old_to_hybrid_map', '_new_to_hybrid_map', '_hybrid_to_old_map', '_hybrid_to_new_map',
+                                '_hybrid_system_forces', '_term_indices', '_serialized_forces', '_environment_atom_mask']
+
+    #bump this whenever the construction of the hybrid system changes, so that stale cached hybrid systems are not reused
+    _cache_format_version = 1
+
+    def __init__(self, topology_proposal, current_positions, new_positions, use_dispersion_correction=False, functions=None, softcore_alpha=None, bond_softening_constant=1.0, angle_softening_constant=1.0, soften_only_new=False, cache_directory=None):
         """
         Initialize the Hybrid topology factory.
 
@@ -74,6 +90,12 @@ class HybridTopologyFactory(object):
         angle_softening_constant : float
             For bonds between unique atoms and unique-core atoms, soften the force constant at the "dummy" endpoint by this factor.
             If 1.0, do not soften
+        soften_only_new : bool, default False
+            If True, only soften the bonds and angles of unique new atoms
+        cache_directory : str, default None
+            If not None, a directory in which hybrid systems are cached on disk, keyed by a hash of the old and new
+            systems and topologies, the atom map and the options above. If an identical hybrid system was cached before,
+            it is reloaded instead of being rebuilt; otherwise, the hybrid system is built and added to the cache.
 
         .. todo :: Document how positions for hybrid system are constructed
 
@@ -84,6 +106,8 @@ class HybridTopologyFactory(object):
         self._old_to_hybrid_map = {}
         self._new_to_hybrid_map = {}
         self._hybrid_system_forces = dict()
+        self._term_indices = dict() # lookup tables of force terms by atom indices; see _get_term_index
+        self._serialized_forces = dict() # serialized old and new system forces; see _serialize_force
         self._old_positions = current_positions
         self._new_positions = new_positions
         self._soften_only_new = soften_only_new
@@ -130,6 +154,17 @@ class HybridTopologyFactory(object):
         #get and store the nonbonded method from the system:
         self._nonbonded_method = self._old_system_forces['NonbondedForce'].getNonbondedMethod()
 
+        #if an identical hybrid system has been cached, reload it instead of building it again
+        self._cache_directory = cache_directory
+        if self._cache_directory is not None:
+            options = {'use_dispersion_correction': use_dispersion_correction, 'functions': sorted(functions.items()) if functions else None,
+                       'softcore_alpha': self.softcore_alpha, 'bond_softening_constant': bond_softening_constant,
+                       'angle_softening_constant': angle_softening_constant, 'soften_only_new': soften_only_new}
+            self._cache_key = self._compute_cache_key(options)
+            if self._load_from_cache():
+                self._hybrid_positions = self._compute_hybrid_positions()
+                return
+
         #start by creating an empty system. This will become the hybrid system.
         self._hybrid_system = openmm.System()
 
@@ -154,6 +189,10 @@ class HybridTopologyFactory(object):
             hybrid_idx = self._hybrid_system.addParticle(particle_mass)
             self._new_to_hybrid_map[particle_idx] = hybrid_idx
 
+        #store the maps as integer arrays (the hybrid index of each old or new atom) for mapping positions by fancy indexing
+        self._old_to_hybrid_indices = np.array([self._old_to_hybrid_map[particle_idx] for particle_idx in range(self._topology_proposal.n_atoms_old)], dtype=np.int64)
+        self._new_to_hybrid_indices = np.array([self._new_to_hybrid_map[particle_idx] for particle_idx in range(self._topology_proposal.n_atoms_new)], dtype=np.int64)
+
         #check that if there is a barostat in the original system, it is added to the hybrid.
         #We copy the barostat from the old system.
         if "MonteCarloBarostat" in self._old_system_forces.keys():
@@ -167,13 +206,18 @@ class HybridTopologyFactory(object):
         #assign atoms to one of the classes described in the class docstring
         self._atom_classes = self._determine_atom_classes()
 
+        #mark the environment atoms (by hybrid index), so that terms among them can be copied to the hybrid system in bulk
+        self._environment_atom_mask = np.zeros(self._hybrid_system.getNumParticles(), dtype=bool)
+        self._environment_atom_mask[list(self._atom_classes['environment_atoms'])] = True
+
         #create the opposite atom maps for use in nonbonded force processing
         self._hybrid_to_old_map = {value : key for key, value in self._old_to_hybrid_map.items()}
         self._hybrid_to_new_map = {value : key for key, value in self._new_to_hybrid_map.items()}
 
-        #construct dictionary of exceptions in old and new systems
-        self._old_system_exceptions = self._generate_dict_from_exceptions(self._old_system_forces['NonbondedForce'])
-        self._new_system_exceptions = self._generate_dict_from_exceptions(self._new_system_forces['NonbondedForce'])
+        #construct dictionary of exceptions in old and new systems (exceptions between environment atoms are omitted, since
+        #these are copied in bulk)
+        self._old_system_exceptions = self._generate_dict_from_exceptions(self._old_system_forces['NonbondedForce'], self._old_to_hybrid_indices)
+        self._new_system_exceptions = self._generate_dict_from_exceptions(self._new_system_forces['NonbondedForce'], self._new_to_hybrid_indices)
 
         #copy constraints, checking to make sure they are not changing
         self._handle_constraints()
@@ -199,6 +243,112 @@ class HybridTopologyFactory(object):
         #generate the topology representation
         self._hybrid_topology = self._create_topology()
 
+        if self._cache_directory is not None:
+            self._save_to_cache()
+
+    def _compute_cache_key(self, options):
+        """
+        Compute the key of the hybrid system in the on-disk cache.
+
+        Parameters
+        ----------
+        options : dict
+            The options passed to the constructor that affect the hybrid system
+
+        Returns
+        -------
+        cache_key : str
+            A SHA-256 hex digest of the old and new systems and topologies, the atom map and the options
+        """
+        hasher = hashlib.sha256()
+        hasher.update(str(self._cache_format_version).encode())
+        for system in (self._topology_proposal.old_system, self._topology_proposal.new_system):
+            hasher.update(openmm.XmlSerializer.serialize(system).encode())
+        for topology in (self._topology_proposal.old_topology, self._topology_proposal.new_topology):
+            for atom in topology.atoms():
+                element_symbol = atom.element.symbol if atom.element is not None else None
+                hasher.update(repr((atom.name, element_symbol, atom.residue.name, atom.residue.index, atom.residue.chain.index)).encode())
+            for bond in topology.bonds():
+                hasher.update(repr((bond[0].index, bond[1].index)).encode())
+        hasher.update(repr(sorted(self._topology_proposal.new_to_old_atom_map.items())).encode())
+        hasher.update(repr(sorted(self._topology_proposal.unique_new_atoms)).encode())
+        hasher.update(repr(sorted(options.items())).encode())
+        return hasher.hexdigest()
+
+    def _load_from_cache(self):
+        """
+        Reload the hybrid system, atom maps, atom classes and hybrid topology from the on-disk cache, if present.
+
+        Returns
+        -------
+        loaded : bool
+            Whether the hybrid system was found in the cache
+        """
+        cache_path = os.path.join(self._cache_directory, self._cache_key)
+        if not os.path.isdir(cache_path):
+            return False
+
+        with open(os.path.join(cache_path, 'hybrid_system.xml'), 'r') as infile:
+            self._hybrid_system = openmm.XmlSerializer.deserialize(infile.read())
+        with np.load(os.path.join(cache_path, 'hybrid_factory.npz'), allow_pickle=False) as arrays:
+            self._old_to_hybrid_indices = arrays['old_to_hybrid_indices']
+            self._new_to_hybrid_indices = arrays['new_to_hybrid_indices']
+            self._atom_classes = {atom_class: set(arrays[atom_class].tolist()) for atom_class in ('unique_old_atoms', 'unique_new_atoms', 'core_atoms', 'environment_atoms')}
+            force_names = arrays['force_names'].tolist()
+        with open(os.path.join(cache_path, 'hybrid_topology.pkl'), 'rb') as infile:
+            self._hybrid_topology = pickle.load(infile)
+
+        self._old_to_hybrid_map = dict(enumerate(self._old_to_hybrid_indices.tolist()))
+        self._new_to_hybrid_map = dict(enumerate(self._new_to_hybrid_indices.tolist()))
+        self._hybrid_to_old_map = {value : key for key, value in self._old_to_hybrid_map.items()}
+        self._hybrid_to_new_map = {value : key for key, value in self._new_to_hybrid_map.items()}
+        self._environment_atom_mask = np.zeros(self._hybrid_system.getNumParticles(), dtype=bool)
+        self._environment_atom_mask[list(self._atom_classes['environment_atoms'])] = True
+        self._hybrid_system_forces = {force_name: self._hybrid_system.getForce(force_index) for force_index, force_name in enumerate(force_names) if force_name}
+        return True
+
+    def _save_to_cache(self):
+        """
+        Write the hybrid system, atom maps, atom classes and hybrid topology to the on-disk cache. The entry is written
+        to a temporary directory first and then renamed, so that concurrent jobs never read a partially written entry.
+        """
+        cache_path = os.path.join(self._cache_directory, self._cache_key)
+        if os.path.isdir(cache_path):
+            return
+        os.makedirs(self._cache_directory, exist_ok=True)
+
+        force_names = self._hybrid_force_names()
+        temporary_path = tempfile.mkdtemp(dir=self._cache_directory)
+        with open(os.path.join(temporary_path, 'hybrid_system.xml'), 'w') as outfile:
+            outfile.write(openmm.XmlSerializer.serialize(self._hybrid_system))
+        np.savez(os.path.join(temporary_path, 'hybrid_factory.npz'), old_to_hybrid_indices=self._old_to_hybrid_indices,
+                 new_to_hybrid_indices=self._new_to_hybrid_indices, force_names=np.array(force_names),
+                 **{atom_class: np.array(sorted(atoms), dtype=np.int64) for atom_class, atoms in self._atom_classes.items()})
+        with open(os.path.join(temporary_path, 'hybrid_topology.pkl'), 'wb') as outfile:
+            pickle.dump(self._hybrid_topology, outfile)
+
+        try:
+            os.rename(temporary_path, cache_path)
+        except OSError:
+            #another process has written the same entry in the meantime
+            shutil.rmtree(temporary_path)
+
+    def _hybrid_force_names(self):
+        """
+        The name of each force of the hybrid system in self._hybrid_system_forces, by index in the hybrid system.
+
+        Returns
+        -------
+        force_names : list of str
+            The name of each force of the hybrid system ('' for forces which are not in self._hybrid_system_forces)
+        """
+        force_names = [''] * self._hybrid_system.getNumForces()
+        for force_name, force in self._hybrid_system_forces.items():
+            for force_index in range(self._hybrid_system.getNumForces()):
+                if int(self._hybrid_system.getForce(force_index).this) == int(force.this):
+                    force_names[force_index] = force_name
+        return force_names
+
     def _handle_virtual_sites(self):
         """
         Ensure that all virtual sites in old and new system are copied over to the hybrid system. Note that we do not
@@ -374,6 +524,9 @@ class HybridTopologyFactory(object):
             for constraint_idx in range(system.getNumConstraints()):
                 atom1, atom2, length = system.getConstraintParameters(constraint_idx)
                 hybrid_atoms = tuple(sorted([hybrid_map[atom1], hybrid_map[atom2]]))
+                #constraints between environment atoms are the same in both systems, so they only need to be added once
+                if system_name == 'new' and self._environment_atom_mask[hybrid_atoms[0]] and self._environment_atom_mask[hybrid_atoms[1]]:
+                    continue
                 if hybrid_atoms not in constraint_lengths.keys():
                     self._hybrid_system.addConstraint(hybrid_atoms[0], hybrid_atoms[1], length)
                     constraint_lengths[hybrid_atoms] = length
@@ -743,6 +896,90 @@ class HybridTopologyFactory(object):
         sterics_mixing_rules += "sigmaB = 0.5*(sigmaB1 + sigmaB2);" # mixing rule for sigma
         return sterics_mixing_rules
 
+    def _get_term_index(self, force, term_name):
+        """
+        Get a dictionary of the terms of a force, keyed by the sorted tuple of the atom indices of each term.
+
+        The dictionary is built once per force, reading the atom indices of all terms from the serialized force. If
+        terms have been added to the force since it was last used (as for the hybrid core forces while they are being
+        filled), only the new terms are added, so each lookup is O(1) and building all the lookup tables is linear in
+        the number of terms.
+
+        Parameters
+        ----------
+        force : openmm.Force
+            The force whose terms should be indexed
+        term_name : str
+            The kind of term to index: one of 'Bond', 'Angle', 'Torsion', or 'Exception'
+
+        Returns
+        -------
+        term_index : dict of tuple of int : list of int
+            The indices (in the force) of the terms with the given atom indices, in increasing order
+        """
+        n_term_atoms = {'Bond': 2, 'Angle': 3, 'Torsion': 4, 'Exception': 2}[term_name]
+
+        # Keep a reference to the force, so that its id cannot be reused while the index exists
+        if id(force) not in self._term_indices:
+            self._term_indices[id(force)] = [force, 0, dict()]
+        _, n_indexed_terms, term_index = self._term_indices[id(force)]
+
+        n_terms = getattr(force, 'getNum{}s'.format(term_name))()
+        if n_indexed_terms == 0:
+            atom_attributes = ['p{}'.format(atom + 1) for atom in range(n_term_atoms)]
+            terms_atoms = read_serialized_force_terms(self._serialize_force(force), term_name, atom_attributes).astype(np.int64)
+        else:
+            get_term_parameters = getattr(force, 'get{}Parameters'.format(term_name))
+            terms_atoms = [get_term_parameters(term_idx)[:n_term_atoms] for term_idx in range(n_indexed_terms, n_terms)]
+        assert len(terms_atoms) == n_terms - n_indexed_terms, "Could not read the {} terms of {}".format(term_name, force)
+
+        for term_idx, term_atoms in enumerate(terms_atoms, start=n_indexed_terms):
+            key = tuple(sorted(int(atom) for atom in term_atoms))
+            term_index.setdefault(key, list()).append(term_idx)
+        self._term_indices[id(force)][1] = n_terms
+
+        return term_index
+
+    def _serialize_force(self, force):
+        """
+        Serialize a force with openmm.XmlSerializer. Forces of the old and new systems (which are not modified) are only
+        serialized once.
+
+        Parameters
+        ----------
+        force : openmm.Force
+            The force to serialize
+
+        Returns
+        -------
+        xml : str
+            The serialized force
+        """
+        system_forces = list(self._old_system_forces.values()) + list(self._new_system_forces.values())
+        if not any(force is system_force for system_force in system_forces):
+            return openmm.XmlSerializer.serialize(force)
+        if id(force) not in self._serialized_forces:
+            self._serialized_forces[id(force)] = openmm.XmlSerializer.serialize(force)
+        return self._serialized_forces[id(force)]
+
+    def _is_environment_term(self, term_atoms, hybrid_indices):
+        """
+        Determine which terms of a force of the old or new system involve only environment atoms.
+
+        Parameters
+        ----------
+        term_atoms : np.ndarray of int of shape (n_terms, n_term_atoms)
+            The atom indices of each term, in the old or new system
+        hybrid_indices : np.ndarray of int
+            The hybrid index of each atom of that system (self._old_to_hybrid_indices or self._new_to_hybrid_indices)
+
+        Returns
+        -------
+        is_environment : np.ndarray of bool of shape (n_terms,)
+            Whether all the atoms of each term are environment atoms
+        """
+        return np.all(self._environment_atom_mask[hybrid_indices[term_atoms]], axis=1)
+
     def _find_bond_parameters(self, bond_force, index1, index2):
         """
         This is a convenience function to find bond parameters in another system given the two indices.
@@ -761,13 +998,10 @@ class HybridTopologyFactory(object):
         bond_parameters : list
             List of relevant bond parameters
         """
-        index_set = {index1, index2}
-        #loop through all the bonds:
-        for bond_index in range(bond_force.getNumBonds()):
-            parms = bond_force.getBondParameters(bond_index)
-            if index_set=={parms[0], parms[1]}:
-                return parms
-
+        bond_index = self._get_term_index(bond_force, 'Bond')
+        key = tuple(sorted([index1, index2]))
+        if key in bond_index:
+            return bond_force.getBondParameters(bond_index[key][0])
         return []
 
     def handle_harmonic_bonds(self):
@@ -781,8 +1015,21 @@ class HybridTopologyFactory(object):
         old_system_bond_force = self._old_system_forces['HarmonicBondForce']
         new_system_bond_force = self._new_system_forces['HarmonicBondForce']
 
+        #read all the bonds at once, to copy those between environment atoms in bulk
+        old_bonds = read_serialized_force_terms(self._serialize_force(old_system_bond_force), 'Bond', ['p1', 'p2', 'd', 'k'])
+        old_bond_atoms = old_bonds[:, :2].astype(np.int64)
+        old_is_environment = self._is_environment_term(old_bond_atoms, self._old_to_hybrid_indices)
+        new_bond_atoms = read_serialized_force_terms(self._serialize_force(new_system_bond_force), 'Bond', ['p1', 'p2']).astype(np.int64)
+        new_is_environment = self._is_environment_term(new_bond_atoms, self._new_to_hybrid_indices)
+
         #first, loop through the old system bond forces and add relevant terms
         for bond_index in range(old_system_bond_force.getNumBonds()):
+            #environment bonds are added to the regular bond force with the same parameters as those in the old system
+            if old_is_environment[bond_index]:
+                [index1_hybrid, index2_hybrid] = self._old_to_hybrid_indices[old_bond_atoms[bond_index]].tolist()
+                self._hybrid_system_forces['standard_bond_force'].addBond(index1_hybrid, index2_hybrid, old_bonds[bond_index, 2], old_bonds[bond_index, 3])
+                continue
+
             #get each set of bond parameters
             [index1_old, index2_old, r0_old, k_old] = old_system_bond_force.getBondParameters(bond_index)
 
@@ -804,9 +1051,8 @@ class HybridTopologyFactory(object):
                     [index1, index2, r0_new, k_new] = self._find_bond_parameters(new_system_bond_force, index1_new, index2_new)
                 self._hybrid_system_forces['core_bond_force'].addBond(index1_hybrid, index2_hybrid,[r0_old, k_old, r0_new, k_new])
 
-            #check if the index set is a subset of anything besides environemnt (in the case of environment, we just add the bond to the regular bond force)
-            # that would mean that this bond is core-unique_old or unique_old-unique_old
-            elif not index_set.issubset(self._atom_classes['environment_atoms']):
+            #otherwise (since environment bonds were handled above), this bond is core-unique_old or unique_old-unique_old
+            else:
 
                 # If we're not softening bonds, we can just add it to the regular bond force. Likewise if we are only softening new bonds
                 if not self._soften_bonds or self._soften_only_new:
@@ -822,13 +1068,9 @@ class HybridTopologyFactory(object):
                     self._hybrid_system_forces['core_bond_force'].addBond(index1_hybrid, index2_hybrid,
                                                                           [r0_old, k_old, r0_new, k_new])
 
-            #otherwise, we just add the same parameters as those in the old system (these are environment atoms, and the parameters are the same)
-            else:
-                self._hybrid_system_forces['standard_bond_force'].addBond(index1_hybrid, index2_hybrid, r0_old, k_old)
 
-
-        #now loop through the new system to get the interactions that are unique to it.
-        for bond_index in range(new_system_bond_force.getNumBonds()):
+        #now loop through the new system to get the interactions that are unique to it (environment bonds have already been added).
+        for bond_index in np.flatnonzero(~new_is_environment).tolist():
             #get each set of bond parameters
             [index1_new, index2_new, r0_new, k_new] = new_system_bond_force.getBondParameters(bond_index)
 
@@ -879,17 +1121,10 @@ class HybridTopologyFactory(object):
         angle_parameters : list
             list of angle parameters
         """
-        index_set = set(indices)
-
-        #now loop through and try to find the angle:
-        for angle_index in range(angle_force.getNumAngles()):
-            angle_parameters = angle_force.getAngleParameters(angle_index)
-
-            #get a set representing the angle indices
-            angle_parameter_indices = set(angle_parameters[:3])
-
-            if index_set==angle_parameter_indices:
-                return angle_parameters
+        angle_index = self._get_term_index(angle_force, 'Angle')
+        key = tuple(sorted(indices))
+        if key in angle_index:
+            return angle_force.getAngleParameters(angle_index[key][0])
         return []  # return empty if no matching angle found
 
     def _find_torsion_parameters(self, torsion_force, indices):
@@ -908,19 +1143,8 @@ class HybridTopologyFactory(object):
         torsion_parameters : list
             torsion parameters
         """
-        index_set = set(indices)
-
-        torsion_parameters_list = list()
-
-        #now loop through and try to find the torsion:
-        for torsion_index in range(torsion_force.getNumTorsions()):
-            torsion_parameters = torsion_force.getTorsionParameters(torsion_index)
-
-            #get a set representing the torsion indices:
-            torsion_parameter_indices = set(torsion_parameters[:4])
-
-            if index_set==torsion_parameter_indices:
-                torsion_parameters_list.append(torsion_parameters)
+        torsion_index = self._get_term_index(torsion_force, 'Torsion')
+        torsion_parameters_list = [torsion_force.getTorsionParameters(torsion_idx) for torsion_idx in torsion_index.get(tuple(sorted(indices)), [])]
 
         return torsion_parameters_list
 
@@ -935,10 +1159,25 @@ class HybridTopologyFactory(object):
         old_system_angle_force = self._old_system_forces['HarmonicAngleForce']
         new_system_angle_force = self._new_system_forces['HarmonicAngleForce']
 
+        #read all the angles at once, to copy those between environment atoms in bulk
+        old_angles = read_serialized_force_terms(self._serialize_force(old_system_angle_force), 'Angle', ['p1', 'p2', 'p3', 'a', 'k'])
+        old_angle_atoms = old_angles[:, :3].astype(np.int64)
+        old_is_environment = self._is_environment_term(old_angle_atoms, self._old_to_hybrid_indices)
+        new_angle_atoms = read_serialized_force_terms(self._serialize_force(new_system_angle_force), 'Angle', ['p1', 'p2', 'p3']).astype(np.int64)
+        new_is_environment = self._is_environment_term(new_angle_atoms, self._new_to_hybrid_indices)
+
         #first, loop through all the angles in the old system to determine what to do with them. We will only use the
         #custom angle force if all atoms are part of "core." Otherwise, they are either unique to one system or never
         #change.
         for angle_index in range(old_system_angle_force.getNumAngles()):
+            #if only environment atoms are in this interaction, add it to the standard angle force
+            if old_is_environment[angle_index]:
+                hybrid_index_list = self._old_to_hybrid_indices[old_angle_atoms[angle_index]].tolist()
+                self._hybrid_system_forces['standard_angle_force'].addAngle(hybrid_index_list[0], hybrid_index_list[1],
+                                                                            hybrid_index_list[2], old_angles[angle_index, 3],
+                                                                            old_angles[angle_index, 4])
+                continue
+
             old_angle_parameters = old_system_angle_force.getAngleParameters(angle_index)
 
             #get the indices in the hybrid system
@@ -959,8 +1198,8 @@ class HybridTopologyFactory(object):
                 hybrid_force_parameters = [old_angle_parameters[3], old_angle_parameters[4], new_angle_parameters[3], new_angle_parameters[4]]
                 self._hybrid_system_forces['core_angle_force'].addAngle(hybrid_index_list[0], hybrid_index_list[1], hybrid_index_list[2], hybrid_force_parameters)
 
-            # Check if the atoms are neither all core nor all environment, which would mean they involve unique old interactions
-            elif not hybrid_index_set.issubset(self._atom_classes['environment_atoms']):
+            # Otherwise, the atoms are neither all core nor all environment, which means they involve unique old interactions
+            else:
 
                 # Check if we are softening angles, and not softening only new angles:
                 if self._soften_angles and not self._soften_only_new:
@@ -984,14 +1223,9 @@ class HybridTopologyFactory(object):
                                                                                 hybrid_index_list[2],
                                                                                 old_angle_parameters[3],
                                                                                 old_angle_parameters[4])
-            #otherwise, only environment atoms are in this interaction, so add it to the standard angle force
-            else:
-                self._hybrid_system_forces['standard_angle_force'].addAngle(hybrid_index_list[0], hybrid_index_list[1],
-                                                                            hybrid_index_list[2], old_angle_parameters[3],
-                                                                            old_angle_parameters[4])
 
-        #finally, loop through the new system force to add any unique new angles
-        for angle_index in range(new_system_angle_force.getNumAngles()):
+        #finally, loop through the new system force to add any unique new angles (environment angles have already been added)
+        for angle_index in np.flatnonzero(~new_is_environment).tolist():
             new_angle_parameters = new_system_angle_force.getAngleParameters(angle_index)
 
             #get the indices in the hybrid system
@@ -1031,13 +1265,29 @@ class HybridTopologyFactory(object):
         old_system_torsion_force = self._old_system_forces['PeriodicTorsionForce']
         new_system_torsion_force = self._new_system_forces['PeriodicTorsionForce']
 
+        #read all the torsions at once, to copy those between environment atoms in bulk
+        old_torsions = read_serialized_force_terms(self._serialize_force(old_system_torsion_force), 'Torsion', ['p1', 'p2', 'p3', 'p4', 'periodicity', 'phase', 'k'])
+        old_torsion_atoms = old_torsions[:, :4].astype(np.int64)
+        old_is_environment = self._is_environment_term(old_torsion_atoms, self._old_to_hybrid_indices)
+        new_torsion_atoms = read_serialized_force_terms(self._serialize_force(new_system_torsion_force), 'Torsion', ['p1', 'p2', 'p3', 'p4']).astype(np.int64)
+        new_is_environment = self._is_environment_term(new_torsion_atoms, self._new_to_hybrid_indices)
+
         #first, loop through all the torsions in the old system to determine what to do with them. We will only use the
         #custom torsion force if all atoms are part of "core." Otherwise, they are either unique to one system or never
         #change.
 
         #we need to keep track of what torsions we added so that we do not double count.
-        added_torsions = []
+        added_torsions = set()
         for torsion_index in range(old_system_torsion_force.getNumTorsions()):
+            #environment torsions are added to the regular force with the same parameters
+            if old_is_environment[torsion_index]:
+                hybrid_index_list = self._old_to_hybrid_indices[old_torsion_atoms[torsion_index]].tolist()
+                [periodicity, phase, k] = old_torsions[torsion_index, 4:]
+                self._hybrid_system_forces['standard_torsion_force'].addTorsion(hybrid_index_list[0], hybrid_index_list[1],
+                                                                            hybrid_index_list[2], hybrid_index_list[3], int(periodicity),
+                                                                            phase, k)
+                continue
+
             torsion_parameters = old_system_torsion_force.getTorsionParameters(torsion_index)
 
             #get the indices in the hybrid system
@@ -1051,7 +1301,7 @@ class HybridTopologyFactory(object):
 
                 #if we've already added these indices (they may appear >once for high periodicities)
                 #then just continue to the next torsion.
-                if torsion_indices in added_torsions:
+                if tuple(torsion_indices) in added_torsions:
                     continue
                 #get the new indices so we can get the new angle parameters, as well as all old parameters of the old torsion
                 #The reason we do it like this is to take care of varying periodicity between new and old system.
@@ -1071,7 +1321,7 @@ class HybridTopologyFactory(object):
                     hybrid_force_parameters = [0.0, 0.0, 0.0,torsion_parameters[4], torsion_parameters[5], torsion_parameters[6]]
                     self._hybrid_system_forces['core_torsion_force'].addTorsion(hybrid_index_list[0], hybrid_index_list[1], hybrid_index_list[2], hybrid_index_list[3], hybrid_force_parameters)
 
-                added_torsions.append(torsion_indices)
+                added_torsions.add(tuple(torsion_indices))
 
             #otherwise, just add the parameters to the regular force:
             else:
@@ -1079,7 +1329,8 @@ class HybridTopologyFactory(object):
                                                                             hybrid_index_list[2], hybrid_index_list[3], torsion_parameters[4],
                                                                             torsion_parameters[5], torsion_parameters[6])
 
-        for torsion_index in range(new_system_torsion_force.getNumTorsions()):
+        #environment torsions have already been added
+        for torsion_index in np.flatnonzero(~new_is_environment).tolist():
             torsion_parameters = new_system_torsion_force.getTorsionParameters(torsion_index)
 
             #get the indices in the hybrid system:
@@ -1107,10 +1358,23 @@ class HybridTopologyFactory(object):
         self._hybrid_system_forces['standard_nonbonded_force'].addGlobalParameter("lambda_electrostatics_delete", 0.0)
         self._hybrid_system_forces['standard_nonbonded_force'].addGlobalParameter("lambda_electrostatics_insert", 0.0)
 
+        #read the parameters of all the old system particles at once, to add the environment particles in bulk
+        old_particle_parameters = read_serialized_force_terms(self._serialize_force(old_system_nonbonded_force), 'Particle', ['q', 'sig', 'eps'])
+
         #We have to loop through the particles in the system, because nonbonded force does not accept index
         for particle_index in range(self._hybrid_system.getNumParticles()):
 
-            if particle_index in self._atom_classes['unique_old_atoms']:
+            #if the particle is in the environment, the parameters will be the same in new and old system, so just take the old parameters
+            if self._environment_atom_mask[particle_index]:
+                [charge, sigma, epsilon] = old_particle_parameters[hybrid_to_old_map[particle_index]]
+
+                #add the particle to the hybrid custom sterics and electrostatics, but they dont change
+                self._hybrid_system_forces['core_sterics_force'].addParticle([sigma, epsilon, sigma, epsilon, 0, 0])
+
+                #add the environment atoms to the regular nonbonded force as well:
+                self._hybrid_system_forces['standard_nonbonded_force'].addParticle(charge, sigma, epsilon)
+
+            elif particle_index in self._atom_classes['unique_old_atoms']:
                 #get the parameters in the old system
                 old_index = hybrid_to_old_map[particle_index]
                 [charge, sigma, epsilon] = old_system_nonbonded_force.getParticleParameters(old_index)
@@ -1161,23 +1425,11 @@ class HybridTopologyFactory(object):
                 # TODO: We could also interpolate the Lennard-Jones here instead of core_sterics force so that core_sterics_force could just be softcore
                 self._hybrid_system_forces['standard_nonbonded_force'].addParticleParameterOffset('lambda_electrostatics_core', particle_index, (charge_new - charge_old), 0, 0)
 
-            #otherwise, the particle is in the environment
-            else:
-                #the parameters will be the same in new and old system, so just take the old parameters
-                old_index = hybrid_to_old_map[particle_index]
-                [charge, sigma, epsilon] = old_system_nonbonded_force.getParticleParameters(old_index)
-
-                #add the particle to the hybrid custom sterics and electrostatics, but they dont change
-                self._hybrid_system_forces['core_sterics_force'].addParticle([sigma, epsilon, sigma, epsilon, 0, 0])
-
-                #add the environment atoms to the regular nonbonded force as well:
-                self._hybrid_system_forces['standard_nonbonded_force'].addParticle(charge, sigma, epsilon)
-
         self._handle_interaction_groups()
         self._handle_hybrid_exceptions()
         self._handle_original_exceptions()
 
-    def _generate_dict_from_exceptions(self, force):
+    def _generate_dict_from_exceptions(self, force, hybrid_indices=None):
         """
         This is a utility function to generate a dictionary of the form
         (particle1_idx, particle2_idx) : [exception parameters]. This will facilitate access and search of exceptions
@@ -1186,6 +1438,8 @@ class HybridTopologyFactory(object):
         ----------
         force : openmm.NonbondedForce object
             a force containing exceptions
+        hybrid_indices : np.ndarray of int, default None
+            The hybrid index of each particle of the force. If given, exceptions between environment atoms are omitted.
 
         Returns
         -------
@@ -1194,7 +1448,12 @@ class HybridTopologyFactory(object):
         """
         exceptions_dict = {}
 
-        for exception_index in range(force.getNumExceptions()):
+        exception_indices = range(force.getNumExceptions())
+        if hybrid_indices is not None:
+            exception_atoms = read_serialized_force_terms(self._serialize_force(force), 'Exception', ['p1', 'p2']).astype(np.int64)
+            exception_indices = np.flatnonzero(~self._is_environment_term(exception_atoms, hybrid_indices)).tolist()
+
+        for exception_index in exception_indices:
             [index1, index2, chargeProd, sigma, epsilon] = force.getExceptionParameters(exception_index)
             exceptions_dict[(index1, index2)] = [chargeProd, sigma, epsilon]
 
@@ -1321,27 +1580,34 @@ class HybridTopologyFactory(object):
         hybrid_to_old_map = {value: key for key, value in self._old_to_hybrid_map.items()}
         hybrid_to_new_map = {value: key for key, value in self._new_to_hybrid_map.items()}
 
+        #read all the old system's exceptions at once, to copy those between environment atoms in bulk
+        old_exceptions = read_serialized_force_terms(self._serialize_force(old_system_nonbonded_force), 'Exception', ['p1', 'p2', 'q', 'sig', 'eps'])
+        old_exception_atoms = old_exceptions[:, :2].astype(np.int64)
+        old_is_environment = self._is_environment_term(old_exception_atoms, self._old_to_hybrid_indices)
+
         #first, loop through the old system's exceptions and add them to the hybrid appropriately:
-        for exception_pair, exception_parameters in self._old_system_exceptions.items():
+        for exception_index in range(len(old_exceptions)):
+
+            #in this case, the interaction is only covered by the regular nonbonded force, and as such will be copied to that force
+            #in the unique-old case, it is handled elsewhere due to internal peculiarities regarding exceptions
+            if old_is_environment[exception_index]:
+                [index1_hybrid, index2_hybrid] = self._old_to_hybrid_indices[old_exception_atoms[exception_index]].tolist()
+                [chargeProd_old, sigma_old, epsilon_old] = old_exceptions[exception_index, 2:]
+                self._hybrid_system_forces['standard_nonbonded_force'].addException(index1_hybrid, index2_hybrid, chargeProd_old, sigma_old, epsilon_old)
+                self._hybrid_system_forces['core_sterics_force'].addExclusion(index1_hybrid, index2_hybrid)
+                continue
 
-            [index1_old, index2_old] = exception_pair
+            [index1_old, index2_old] = old_exception_atoms[exception_index].tolist()
 
-            [chargeProd_old, sigma_old, epsilon_old] = exception_parameters
+            [chargeProd_old, sigma_old, epsilon_old] = self._old_system_exceptions[(index1_old, index2_old)]
 
             #get hybrid indices:
             index1_hybrid = self._old_to_hybrid_map[index1_old]
             index2_hybrid = self._old_to_hybrid_map[index2_old]
             index_set = {index1_hybrid, index2_hybrid}
 
-
-            #in this case, the interaction is only covered by the regular nonbonded force, and as such will be copied to that force
-            #in the unique-old case, it is handled elsewhere due to internal peculiarities regarding exceptions
-            if index_set.issubset(self._atom_classes['environment_atoms']):
-                self._hybrid_system_forces['standard_nonbonded_force'].addException(index1_hybrid, index2_hybrid, chargeProd_old, sigma_old, epsilon_old)
-                self._hybrid_system_forces['core_sterics_force'].addExclusion(index1_hybrid, index2_hybrid)
-
             #we have already handled unique old - unique old exceptions
-            elif len(index_set.intersection(self._atom_classes['unique_old_atoms'])) == 2:
+            if len(index_set.intersection(self._atom_classes['unique_old_atoms'])) == 2:
                 continue
 
             #otherwise, check if one of the atoms in the set is in the unique_old_group and the other is not:
@@ -1378,7 +1644,7 @@ class HybridTopologyFactory(object):
 
         #now, loop through the new system to collect remaining interactions. The only that remain here are
         #uniquenew-uniquenew, uniquenew-core, and uniquenew-environment. There might also be core-core, since not all
-        #core-core exceptions exist in both
+        #core-core exceptions exist in both (environment-environment exceptions were already copied from the old system)
         for exception_pair, exception_parameters in self._new_system_exceptions.items():
             [index1_new, index2_new] = exception_pair
             [chargeProd_new, sigma_new, epsilon_new] = exception_parameters
@@ -1456,30 +1722,32 @@ class HybridTopologyFactory(object):
         exception_parameters : list
             List of exception parameters
         """
-        index_set = {index1, index2}
-
-        #loop through the exceptions and try to find one matching the criteria
-        for exception_idx in range(force.getNumExceptions()):
-            exception_parameters = force.getExceptionParameters(exception_idx)
-            if index_set==set(exception_parameters[:2]):
-                return exception_parameters
+        exception_index = self._get_term_index(force, 'Exception')
+        key = tuple(sorted([index1, index2]))
+        if key in exception_index:
+            return force.getExceptionParameters(exception_index[key][0])
         return []
 
-    def _compute_hybrid_positions(self):
+    def _compute_hybrid_positions(self, unitless=False):
         """
         The positions of the hybrid system. Dimensionality is (n_environment + n_core + n_old_unique + n_new_unique)
         The positions are assigned by first copying all the mapped positions from the old system in, then copying the
         mapped positions from the new system. This means that there is an assumption that the positions common to old
         and new are the same (which is the case for perses as-is).
 
+        Parameters
+        ----------
+        unitless : bool, default False
+            If True, return a plain np.ndarray implicitly in nanometers rather than a Quantity
+
         Returns
         -------
         hybrid_positions : np.ndarray [n, 3]
             Positions of the hybrid system, in nm
         """
-        #get unitless positions
-        old_positions_without_units = np.array(self._old_positions.value_in_unit(unit.nanometer))
-        new_positions_without_units = np.array(self._new_positions.value_in_unit(unit.nanometer))
+        #get unitless positions (which may also be given as arrays implicitly in nm)
+        old_positions_without_units = self._strip_position_units(self._old_positions)
+        new_positions_without_units = self._strip_position_units(self._new_positions)
 
         #determine the number of particles in the system
         n_atoms_hybrid = self._hybrid_system.getNumParticles()
@@ -1487,17 +1755,33 @@ class HybridTopologyFactory(object):
         #initialize an array for hybrid positions
         hybrid_positions_array = np.zeros([n_atoms_hybrid, 3])
 
-        #loop through the old system indices, and assign positions.
-        for old_index, hybrid_index in self._old_to_hybrid_map.items():
-            hybrid_positions_array[hybrid_index, :] = old_positions_without_units[old_index, :]
-
-        #Do the same for new indices. Note that this overwrites some coordinates, but as stated above, the assumption
-        #is that these are the same.
-        for new_index, hybrid_index in self._new_to_hybrid_map.items():
-            hybrid_positions_array[hybrid_index, :] = new_positions_without_units[new_index, :]
+        #assign the old system positions, then the new ones. Note that this overwrites some coordinates, but as stated
+        #above, the assumption is that these are the same.
+        hybrid_positions_array[self._old_to_hybrid_indices, :] = old_positions_without_units[:len(self._old_to_hybrid_indices), :]
+        hybrid_positions_array[self._new_to_hybrid_indices, :] = new_positions_without_units[:len(self._new_to_hybrid_indices), :]
 
+        if unitless:
+            return hybrid_positions_array
         return unit.Quantity(hybrid_positions_array, unit=unit.nanometers)
 
+    @staticmethod
+    def _strip_position_units(positions):
+        """
+        Get positions as a float array implicitly in nanometers, without copying if they already are one.
+
+        Parameters
+        ----------
+        positions : [n, 3] np.ndarray with units compatible with nanometers, or [n, 3] np.ndarray implicitly in nm
+
+        Returns
+        -------
+        positions_without_units : [n, 3] np.ndarray
+            The positions in nanometers
+        """
+        if unit.is_quantity(positions):
+            positions = positions.value_in_unit(unit.nanometer)
+        return np.asarray(positions, dtype=np.float64)
+
     def _create_topology(self):
         """
         Create an mdtraj topology corresponding to the hybrid system.
@@ -1572,45 +1856,188 @@ class HybridTopologyFactory(object):
 
         return hybrid_topology
 
-    def old_positions(self, hybrid_positions):
+    def old_positions(self, hybrid_positions, unitless=False):
         """
         Get the positions corresponding to the old system
 
         Parameters
         ----------
         hybrid_positions : [n, 3] np.ndarray with unit
-            The positions of the hybrid system
+            The positions of the hybrid system (or a [n, 3] np.ndarray implicitly in nm)
+        unitless : bool, default False
+            If True, return a plain np.ndarray implicitly in nanometers rather than a Quantity
 
         Returns
         -------
         old_positions : [m, 3] np.ndarray with unit
             The positions of the old system
         """
-        n_atoms_old = self._topology_proposal.n_atoms_old
-        old_positions = unit.Quantity(np.zeros([n_atoms_old, 3]), unit=unit.nanometer)
-        for idx in range(n_atoms_old):
-            old_positions[idx, :] = hybrid_positions[idx, :]
-        return old_positions
+        old_positions = self._strip_position_units(hybrid_positions)[self._old_to_hybrid_indices, :]
+        if unitless:
+            return old_positions
+        return unit.Quantity(old_positions, unit=unit.nanometer)
 
-    def new_positions(self, hybrid_positions):
+    def new_positions(self, hybrid_positions, unitless=False):
         """
         Get the positions corresponding to the new system.
 
         Parameters
         ----------
         hybrid_positions : [n, 3] np.ndarray with unit
-            The positions of the hybrid system
+            The positions of the hybrid system (or a [n, 3] np.ndarray implicitly in nm)
+        unitless : bool, default False
+            If True, return a plain np.ndarray implicitly in nanometers rather than a Quantity
 
         Returns
         -------
         new_positions : [m, 3] np.ndarray with unit
             The positions of the new system
         """
-        n_atoms_new = self._topology_proposal.n_atoms_new
-        new_positions = unit.Quantity(np.zeros([n_atoms_new, 3]), unit=unit.nanometer)
-        for idx in range(n_atoms_new):
-            new_positions[idx, :] = hybrid_positions[self._new_to_hybrid_map[idx], :]
-        return new_positions
+        new_positions = self._strip_position_units(hybrid_positions)[self._new_to_hybrid_indices, :]
+        if unitless:
+            return new_positions
+        return unit.Quantity(new_positions, unit=unit.nanometer)
+
+    def reverse(self):
+        """
+        Create the factory of the reverse transformation (new system -> old system) without rebuilding the hybrid system.
+
+        The reverse factory uses the same hybrid atoms (and hybrid topology), with the old and new atom maps, atom classes
+        and positions exchanged. Its hybrid system is a copy of this one in which each alchemical parameter is
+        reinterpreted: lambda_X of the reverse system acts as 1 - lambda_Y of this one, where Y is X with insert and
+        delete exchanged (the unique new atoms of the reverse transformation are the unique old atoms of this one).
+        Hence, the reverse hybrid system at lambda is the hybrid system of this factory at 1 - lambda.
+
+        Returns
+        -------
+        reverse_factory : HybridTopologyFactory
+            The factory of the reverse transformation
+        """
+        if self._topology_proposal is None:
+            raise ValueError("A frozen factory cannot be reversed")
+
+        from perses.rjmc.topology_proposal import TopologyProposal
+        topology_proposal = self._topology_proposal
+        old_to_new_atom_map = topology_proposal.old_to_new_atom_map
+        reverse_alchemical_atoms = {old_to_new_atom_map[atom] for atom in topology_proposal.old_alchemical_atoms if atom in old_to_new_atom_map}
+        reverse_topology_proposal = TopologyProposal(new_topology=topology_proposal.old_topology, new_system=topology_proposal.old_system,
+                                                     old_topology=topology_proposal.new_topology, old_system=topology_proposal.new_system,
+                                                     logp_proposal=-topology_proposal.logp_proposal if topology_proposal.logp_proposal is not None else None,
+                                                     new_to_old_atom_map=old_to_new_atom_map,
+                                                     old_alchemical_atoms=reverse_alchemical_atoms.union(topology_proposal.unique_new_atoms),
+                                                     old_chemical_state_key=topology_proposal.new_chemical_state_key,
+                                                     new_chemical_state_key=topology_proposal.old_chemical_state_key,
+                                                     metadata=topology_proposal.metadata)
+
+        reverse_factory = copy.copy(self)
+        reverse_factory._topology_proposal = reverse_topology_proposal
+
+        #exchange everything that refers to the old or new system
+        for old_attribute, new_attribute in [('_old_system', '_new_system'), ('_old_system_forces', '_new_system_forces'),
+                                             ('_old_positions', '_new_positions'), ('_old_to_hybrid_map', '_new_to_hybrid_map'),
+                                             ('_old_to_hybrid_indices', '_new_to_hybrid_indices'), ('_hybrid_to_old_map', '_hybrid_to_new_map'),
+                                             ('_old_system_exceptions', '_new_system_exceptions')]:
+            if hasattr(self, old_attribute):
+                setattr(reverse_factory, old_attribute, getattr(self, new_attribute))
+                setattr(reverse_factory, new_attribute, getattr(self, old_attribute))
+        reverse_factory._atom_classes = dict(self._atom_classes)
+        reverse_factory._atom_classes['unique_old_atoms'] = self._atom_classes['unique_new_atoms']
+        reverse_factory._atom_classes['unique_new_atoms'] = self._atom_classes['unique_old_atoms']
+
+        #copy the hybrid system, and reinterpret its alchemical parameters
+        reverse_factory._hybrid_system = copy.deepcopy(self._hybrid_system)
+        force_indices = {force_name: force_index for force_index, force_name in enumerate(self._hybrid_force_names()) if force_name}
+        reverse_factory._hybrid_system_forces = {force_name: reverse_factory._hybrid_system.getForce(force_index) for force_name, force_index in force_indices.items()}
+        self._reverse_alchemical_parameters(reverse_factory._hybrid_system)
+
+        reverse_factory._term_indices = dict()
+        reverse_factory._serialized_forces = dict()
+        reverse_factory._cache_directory = None
+        reverse_factory._hybrid_positions = reverse_factory._compute_hybrid_positions()
+        return reverse_factory
+
+    def freeze(self):
+        """
+        Drop everything that is only needed to construct the hybrid system: the old and new systems, their forces and
+        exceptions, the topology proposal, the old and new positions and the lookup tables. The factory keeps the hybrid
+        system, the index maps and atom classes (as integer arrays), the hybrid positions and the hybrid topology, which
+        is all that is needed to simulate the hybrid system and map positions to the old and new systems. This makes
+        the factory much smaller in memory and when pickled (e.g. when it is sent to dask workers).
+
+        A frozen factory cannot be reversed.
+
+        Returns
+        -------
+        self : HybridTopologyFactory
+            The frozen factory
+        """
+        self._atom_classes = {atom_class: np.array(sorted(atoms), dtype=np.int64) for atom_class, atoms in self._atom_classes.items()}
+        for attribute in self._construction_attributes:
+            setattr(self, attribute, None)
+        return self
+
+    @staticmethod
+    def _reverse_alchemical_parameters(hybrid_system):
+        """
+        Reinterpret the alchemical parameters of a hybrid system for the reverse transformation, in place. Each
+        alchemical parameter lambda_X is replaced by 1 - lambda_Y, where Y is X with insert and delete exchanged.
+
+        Parameters
+        ----------
+        hybrid_system : openmm.System
+            The hybrid system to modify
+        """
+        def swap_insert_delete(parameter_name):
+            return parameter_name.replace('insert', '__swap__').replace('delete', 'insert').replace('__swap__', 'delete')
+
+        for force in hybrid_system.getForces():
+            if isinstance(force, openmm.NonbondedForce):
+                #offsets are linear: q_old + lambda*dq = (q_old + dq) + (1 - lambda)*(-dq)
+                particle_offsets = dict()
+                for offset_index in range(force.getNumParticleParameterOffsets()):
+                    [parameter_name, particle_index, charge_scale, sigma_scale, epsilon_scale] = force.getParticleParameterOffset(offset_index)
+                    if not parameter_name.startswith('lambda'):
+                        continue
+                    force.setParticleParameterOffset(offset_index, swap_insert_delete(parameter_name), particle_index, -charge_scale, -sigma_scale, -epsilon_scale)
+                    particle_offsets.setdefault(particle_index, []).append([charge_scale, sigma_scale, epsilon_scale])
+                for particle_index, offsets in particle_offsets.items():
+                    [charge_offset, sigma_offset, epsilon_offset] = np.sum(offsets, axis=0).tolist()
+                    [charge, sigma, epsilon] = force.getParticleParameters(particle_index)
+                    force.setParticleParameters(particle_index, charge.value_in_unit_system(unit.md_unit_system) + charge_offset,
+                                                sigma.value_in_unit_system(unit.md_unit_system) + sigma_offset,
+                                                epsilon.value_in_unit_system(unit.md_unit_system) + epsilon_offset)
+
+                exception_offsets = dict()
+                for offset_index in range(force.getNumExceptionParameterOffsets()):
+                    [parameter_name, exception_index, charge_prod_scale, sigma_scale, epsilon_scale] = force.getExceptionParameterOffset(offset_index)
+                    if not parameter_name.startswith('lambda'):
+                        continue
+                    force.setExceptionParameterOffset(offset_index, swap_insert_delete(parameter_name), exception_index, -charge_prod_scale, -sigma_scale, -epsilon_scale)
+                    exception_offsets.setdefault(exception_index, []).append([charge_prod_scale, sigma_scale, epsilon_scale])
+                for exception_index, offsets in exception_offsets.items():
+                    [charge_prod_offset, sigma_offset, epsilon_offset] = np.sum(offsets, axis=0).tolist()
+                    [index1, index2, charge_prod, sigma, epsilon] = force.getExceptionParameters(exception_index)
+                    force.setExceptionParameters(exception_index, index1, index2, charge_prod.value_in_unit_system(unit.md_unit_system) + charge_prod_offset,
+                                                 sigma.value_in_unit_system(unit.md_unit_system) + sigma_offset,
+                                                 epsilon.value_in_unit_system(unit.md_unit_system) + epsilon_offset)
+
+            elif hasattr(force, 'getEnergyFunction') and hasattr(force, 'getNumGlobalParameters'):
+                #refer to each alchemical parameter as forward_<name> in the energy expression, and define it in terms of the reverse parameter
+                parameter_names = [force.getGlobalParameterName(parameter_index) for parameter_index in range(force.getNumGlobalParameters())]
+                lambda_names = [parameter_name for parameter_name in parameter_names if parameter_name.startswith('lambda')]
+                if not lambda_names:
+                    continue
+                energy_expression = force.getEnergyFunction()
+                #make sure the new variable names are not already used (e.g. if the system has been reversed before)
+                prefix = 'forward_'
+                while prefix in energy_expression:
+                    prefix = 'forward_' + prefix
+                pattern = re.compile(r'\b({})\b'.format('|'.join(sorted(lambda_names, key=len, reverse=True))))
+                energy_expression = pattern.sub(prefix + r'\1', energy_expression).rstrip().rstrip(';')
+                for lambda_name in lambda_names:
+                    reverse_name = swap_insert_delete(lambda_name) if swap_insert_delete(lambda_name) in parameter_names else lambda_name
+                    energy_expression += '; {}{} = 1 - {}'.format(prefix, lambda_name, reverse_name)
+                force.setEnergyFunction(energy_expression)
 
     @property
     def hybrid_system(self):
@@ -1634,6 +2061,9 @@ class HybridTopologyFactory(object):
         new_to_hybrid_atom_map : dict of {int, int}
             The mapping of atoms from the new system to the hybrid
         """
+        if self._new_to_hybrid_map is None:
+            #the factory has been frozen, and only keeps the map as an array
+            return dict(enumerate(self._new_to_hybrid_indices.tolist()))
         return self._new_to_hybrid_map
 
     @property
@@ -1646,6 +2076,9 @@ class HybridTopologyFactory(object):
         old_to_hybrid_atom_map : dict of {int, int}
             The mapping of atoms from the old system to the hybrid
         """
+        if self._old_to_hybrid_map is None:
+            #the factory has been frozen, and only keeps the map as an array
+            return dict(enumerate(self._old_to_hybrid_indices.tolist()))
         return self._old_to_hybrid_map
 
     @property
@@ -25,6 +25,7 @@ import openmmtools.states as states
 import numpy as np
 import mdtraj as md
 from perses.annihilation.new_relative import HybridTopologyFactory
+from perses.annihilation.lambda_protocol import RelativeAlchemicalState
 import mdtraj.utils as mdtrajutils
 import pickle
 import simtk.unit as unit
@@ -34,12 +35,128 @@ from openmmtools.constants import kB
 import pdb
 
 #Make containers for results from tasklets. This allows us to chain tasks together easily.
-EquilibriumResult = NamedTuple('EquilibriumResult', [('sampler_state', states.SamplerState), ('reduced_potential', float)])
-NonequilibriumResult = NamedTuple('NonequilibriumResult', [('cumulative_work', np.array), ('protocol_work', np.array), ('shadow_work', np.array)])
+EquilibriumResult = NamedTuple('EquilibriumResult', [('sampler_state', states.SamplerState), ('reduced_potential', float),
+                                                       ('trajectory_frames', tuple)])
+#the (start, stop) frames written to the trajectory file by run_equilibrium, or None if no trajectory was written
+EquilibriumResult.__new__.__defaults__ = (None,)
+NonequilibriumResult = NamedTuple('NonequilibriumResult', [('cumulative_work', np.array), ('protocol_work', np.array), ('shadow_work', float)])
 
 class NoTrajectoryException(Exception):
     pass
 
+class TrajectoryWriter(object):
+    """
+    Stream frames of a subset of the atoms of a simulation to an appendable trajectory file, so that the frames of a
+    long protocol need not be held in memory. The format is chosen by mdtraj from the file extension: HDF5 (.h5) files
+    also store the topology and can be appended to, whereas e.g. NetCDF (.nc) or DCD (.dcd) files can only be written
+    from scratch. Coordinates are written in single precision.
+
+    Parameters
+    ----------
+    trajectory_filename : str
+        The file to which the frames are written
+    topology : md.Topology
+        The topology of the atoms that are written
+    atom_indices : np.array of int, default None
+        The indices (in the full system) of the atoms to write. If None, all atoms are written.
+    mode : str, default 'w'
+        'w' to overwrite an existing file, or 'a' to append to it (HDF5 only)
+    """
+
+    def __init__(self, trajectory_filename: str, topology: md.Topology, atom_indices: np.array=None, mode: str='w'):
+        if atom_indices is None:
+            atom_indices = np.arange(topology.n_atoms)
+        self._atom_indices = np.asarray(atom_indices, dtype=np.int64)
+        if len(self._atom_indices) != topology.n_atoms:
+            raise ValueError("The topology must have one atom for each of the atom indices")
+        self._trajectory_filename = trajectory_filename
+        if mode == 'a' and not os.path.exists(trajectory_filename):
+            mode = 'w'
+        self._file = md.open(trajectory_filename, mode=mode)
+        self._distance_unit = self._file.distance_unit
+        self._n_frames = 0
+        #the number of frames already in the file, which are kept when appending
+        self._frame_offset = len(self._file) if mode == 'a' else 0
+        #only some formats (e.g. HDF5) store the topology
+        if mode == 'w' and hasattr(self._file, 'topology'):
+            self._file.topology = topology
+
+    def write_frame(self, positions: np.array, box_vectors=None):
+        """
+        Write a frame of the subset of atoms.
+
+        Parameters
+        ----------
+        positions : [n_atoms, 3] np.array or unit.Quantity
+            The positions of all the atoms (in nm if unitless)
+        box_vectors : [3, 3] np.array or unit.Quantity (or list of 3 vectors), default None
+            The periodic box vectors (in nm if unitless), if any
+        """
+        if isinstance(positions, unit.Quantity):
+            positions = positions.value_in_unit_system(unit.md_unit_system)
+        coordinates = np.asarray(positions, dtype=np.float32)[self._atom_indices][np.newaxis, :, :]
+
+        cell_lengths, cell_angles = None, None
+        if box_vectors is not None:
+            box_vectors = [vector.value_in_unit_system(unit.md_unit_system) if isinstance(vector, unit.Quantity) else vector for vector in box_vectors]
+            a, b, c, alpha, beta, gamma = mdtrajutils.unitcell.box_vectors_to_lengths_and_angles(*np.asarray(box_vectors, dtype=np.float64))
+            cell_lengths = np.array([[a, b, c]], dtype=np.float32)
+            cell_angles = np.array([[alpha, beta, gamma]], dtype=np.float32)
+            cell_lengths = mdtrajutils.in_units_of(cell_lengths, 'nanometers', self._distance_unit, inplace=True)
+
+        coordinates = mdtrajutils.in_units_of(coordinates, 'nanometers', self._distance_unit, inplace=True)
+        self._file.write(coordinates, cell_lengths=cell_lengths, cell_angles=cell_angles)
+        self._n_frames += 1
+
+    def write_context_frame(self, context: openmm.Context):
+        """
+        Write the current positions and box vectors of a context.
+
+        Parameters
+        ----------
+        context : openmm.Context
+            The context whose state is written
+        """
+        #wrap the molecules into the box, as SamplerState.update_from_context does
+        state = context.getState(getPositions=True, enforcePeriodicBox=context.getSystem().usesPeriodicBoundaryConditions())
+        self.write_frame(state.getPositions(asNumpy=True), state.getPeriodicBoxVectors(asNumpy=True))
+
+    def write_trajectory(self, trajectory: md.Trajectory):
+        """
+        Write the frames of an mdtraj trajectory of all the atoms of the system.
+
+        Parameters
+        ----------
+        trajectory : md.Trajectory
+            The trajectory to write
+        """
+        for frame_index in range(trajectory.n_frames):
+            box_vectors = trajectory.unitcell_vectors[frame_index] if trajectory.unitcell_vectors is not None else None
+            self.write_frame(trajectory.xyz[frame_index], box_vectors)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def n_frames(self):
+        """The number of frames written by this writer"""
+        return self._n_frames
+
+    @property
+    def frame_range(self):
+        """The (start, stop) indices in the file of the frames written by this writer"""
+        return (self._frame_offset, self._frame_offset + self._n_frames)
+
+    @property
+    def trajectory_filename(self):
+        return self._trajectory_filename
+
 class ExternalNonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
     """
     This class performs nonequilibrium switching, but rather than using the AlchemicalNonequilibriumLangevinIntegrator, it uses
@@ -59,6 +176,16 @@ class ExternalNonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
     configuration_save_interval : int, default 1
         The frequency with which to save the configurations.
         if 1, it is saved at every step.
+    work_only : bool, default False
+        If True, only the work is recorded, every work_configuration_save_interval steps, and the positions and box
+        vectors are only retrieved from the context at the end of the protocol (no trajectory is saved).
+    trajectory_filename : str, default None
+        If specified, the configurations are streamed to this file (see TrajectoryWriter) every
+        work_configuration_save_interval steps, rather than held in memory.
+    topology : md.Topology, default None
+        The topology of the system, required if trajectory_filename is specified
+    atom_indices : np.array of int, default None
+        The indices of the atoms to write to trajectory_filename. If None, all atoms are written.
     context_cache : openmmtools.cache.ContextCache, default None
         The ContextCache to use for context creation. If None,
         the global cache will be used
@@ -66,7 +193,8 @@ class ExternalNonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
 
     def __init__(self, alchemical_functions: dict, nsteps_neq: int, timestep: unit.Quantity,
                  temperature: unit.Quantity, work_configuration_save_interval: int=1, splitting: str = "V R O R V",
-                 **kwargs):
+                 work_only: bool=False, trajectory_filename: str=None, topology: md.Topology=None,
+                 atom_indices: np.array=None, **kwargs):
 
         super(ExternalNonequilibriumSwitchingMove, self).__init__(n_steps=nsteps_neq, **kwargs)
 
@@ -77,8 +205,22 @@ class ExternalNonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
         if nsteps_neq % work_configuration_save_interval != 0:
             raise ValueError("Please use a saving interval that is a divisor of the total number of steps")
         #self._number_of_step_moves = self._nsteps_neq // self._work_configuration_save_interval
-        self._cumulative_work = np.zeros([self._nsteps_neq + 1])
+        self._work_only = work_only
+        #in work-only mode, the work is only recorded every work_configuration_save_interval steps
+        if self._work_only:
+            self._cumulative_work = np.zeros([self._nsteps_neq // self._work_configuration_save_interval + 1])
+        else:
+            self._cumulative_work = np.zeros([self._nsteps_neq + 1])
         self._current_protocol_work = 0.0
+        self._trajectory = None
+        self._box_lengths = None
+        self._box_angles = None
+
+        if trajectory_filename is not None and topology is None:
+            raise ValueError("A topology is required to write the trajectory")
+        self._trajectory_filename = trajectory_filename
+        self._topology = topology
+        self._atom_indices = atom_indices
 
     def _get_integrator(self, thermodynamic_state):
         """
@@ -129,9 +271,12 @@ class ExternalNonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
         #get the number of atoms:
         n_atoms = thermodynamic_state.n_particles
 
-        trajectory_positions = np.zeros([self._nsteps_neq, n_atoms, 3])
-        box_lengths = np.zeros([self._nsteps_neq, 3])
-        box_angles = np.zeros([self._nsteps_neq, 3])
+        #the trajectory is either streamed to a file at the save interval, or held in memory
+        trajectory_positions = None
+        if self._trajectory_filename is None and not self._work_only:
+            trajectory_positions = np.zeros([self._nsteps_neq, n_atoms, 3])
+            box_lengths = np.zeros([self._nsteps_neq, 3])
+            box_angles = np.zeros([self._nsteps_neq, 3])
 
         # Create integrator.
         integrator = self._get_integrator(thermodynamic_state)
@@ -150,39 +295,65 @@ class ExternalNonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
         if self._cumulative_work[0] != 0.0:
             raise RuntimeError("The initial cumulative work after reset was not zero.")
 
-        #set the master parameter to zero:
-        master_lambda = 0.0
-
-        # loop through the number of times we have to apply in order to collect the requested work and trajectory statistics.
-        for iteration in tqdm.trange(self._nsteps_neq):
-
-            #update all relevant context parameters
-            for parameter, parameter_function in self._alchemical_functions.items():
-                context.setParameter(parameter, parameter_function(master_lambda/self._nsteps_neq))
-
-            integrator.step(1)
-
-            #increment the master lambda variable
-            master_lambda += 1
-
-            #retrieve the current amount of work and add it to the appropriate array
-            self._current_protocol_work = integrator.get_protocol_work(dimensionless=True)
-            self._cumulative_work[iteration + 1] = self._current_protocol_work
-
-
-            #update the sampler state from the context and retrieve positions and box vectors
-            sampler_state.update_from_context(context)
-            trajectory_positions[iteration, :, :] = sampler_state.positions[:, :].value_in_unit_system(unit.md_unit_system)
-            a, b, c, alpha, beta, gamma = mdtrajutils.unitcell.box_vectors_to_lengths_and_angles(
-                *sampler_state.box_vectors)
-            box_lengths[iteration, :] = [a, b, c]
-            box_angles[iteration, :] = [alpha, beta, gamma]
-
+        #tabulate the context parameters over the protocol, so that the alchemical functions are only evaluated once
+        master_lambdas = np.arange(self._nsteps_neq) / self._nsteps_neq
+        lambda_table = RelativeAlchemicalState.compute_lambda_table(master_lambdas, self._alchemical_functions)
+        current_parameter_values = dict()
+
+        trajectory_writer = None
+        if self._trajectory_filename is not None:
+            if self._atom_indices is None:
+                trajectory_topology = self._topology
+            else:
+                trajectory_topology = self._topology.subset(self._atom_indices)
+            trajectory_writer = TrajectoryWriter(self._trajectory_filename, trajectory_topology, self._atom_indices)
+
+        try:
+            # loop through the number of times we have to apply in order to collect the requested work and trajectory statistics.
+            for iteration in tqdm.trange(self._nsteps_neq):
+
+                #update the context parameters that have changed since the last step
+                for parameter, parameter_values in lambda_table.items():
+                    if current_parameter_values.get(parameter) != parameter_values[iteration]:
+                        context.setParameter(parameter, parameter_values[iteration])
+                        current_parameter_values[parameter] = parameter_values[iteration]
+
+                integrator.step(1)
+
+                #stream the configuration to the trajectory file at the save interval
+                if trajectory_writer is not None and (iteration + 1) % self._work_configuration_save_interval == 0:
+                    trajectory_writer.write_context_frame(context)
+
+                #in work-only mode, the work (which is accumulated by the integrator) is only retrieved at the save interval
+                if self._work_only:
+                    if (iteration + 1) % self._work_configuration_save_interval == 0:
+                        self._current_protocol_work = integrator.get_protocol_work(dimensionless=True)
+                        self._cumulative_work[(iteration + 1) // self._work_configuration_save_interval] = self._current_protocol_work
+                    continue
+
+                #retrieve the current amount of work and add it to the appropriate array
+                self._current_protocol_work = integrator.get_protocol_work(dimensionless=True)
+                self._cumulative_work[iteration + 1] = self._current_protocol_work
+
+                if trajectory_positions is None:
+                    continue
+
+                #update the sampler state from the context and retrieve positions and box vectors
+                sampler_state.update_from_context(context)
+                trajectory_positions[iteration, :, :] = sampler_state.positions[:, :].value_in_unit_system(unit.md_unit_system)
+                a, b, c, alpha, beta, gamma = mdtrajutils.unitcell.box_vectors_to_lengths_and_angles(
+                    *sampler_state.box_vectors)
+                box_lengths[iteration, :] = [a, b, c]
+                box_angles[iteration, :] = [alpha, beta, gamma]
+        finally:
+            if trajectory_writer is not None:
+                trajectory_writer.close()
 
         self._current_total_work = self._current_protocol_work
-        self._trajectory = trajectory_positions
-        self._box_lengths = box_lengths
-        self._box_angles = box_angles
+        if trajectory_positions is not None:
+            self._trajectory = trajectory_positions
+            self._box_lengths = box_lengths
+            self._box_angles = box_angles
 
         # Subclasses can read here info from the context to update internal statistics.
         self._after_integration(context, thermodynamic_state)
@@ -209,8 +380,15 @@ class ExternalNonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
     def cumulative_work(self):
         return self._cumulative_work
 
+    @property
+    def protocol_work(self):
+        #the integrator does not measure the shadow work, so the protocol work is the cumulative work
+        return self._cumulative_work
+
     @property
     def trajectory(self):
+        if self._trajectory is None:
+            raise NoTrajectoryException("Tried to access a trajectory that was not saved.")
         return self._trajectory
 
     @property
@@ -227,14 +405,19 @@ class ExternalNonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
 
 
 
-
 class NonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
     """
     This class represents an MCMove that runs a nonequilibrium switching protocol using the AlchemicalNonequilibriumLangevinIntegrator.
     It is simply a wrapper around the aforementioned integrator, which must be provided in the constructor.
 
+    The lambda schedule and the protocol work are handled entirely by the integrator, so that it is stepped from
+    Python once per work_save_interval steps.
+
     Parameters
     ----------
+    alchemical_functions : dict of str: str or Callable
+        The function of the master lambda for each context parameter, either as an OpenMM expression string or as one
+        of the RelativeAlchemicalState lambda functions (see RelativeAlchemicalState.compile_lambda_functions)
     integrator_options : dict
         The options used to create the integrator.
     work_save_interval : int, default None
@@ -243,6 +426,9 @@ class NonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
         The topology to use to write the positions along the protocol. If None, don't write anything.
     subset_atoms : np.array, default None
         The indices of the subset of atoms to write. If None, write all atoms (if writing is enabled)
+    trajectory_filename : str, default None
+        If specified, the configurations are streamed to this file (see TrajectoryWriter) rather than held in memory.
+        In that case, top must be the topology of the subset of atoms.
     context_cache : openmmtools.cache.ContextCache, optional
         The ContextCache to use for Context creation. If None, the global cache
         openmmtools.cache.global_context_cache is used (default is None).
@@ -253,20 +439,24 @@ class NonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
     """
 
     def __init__(self, alchemical_functions: dict, splitting: str, temperature: unit.Quantity, nsteps_neq: int, timestep: unit.Quantity,
-        work_save_interval: int=None, top: md.Topology=None, subset_atoms: np.array=None, save_configuration: bool=False, measure_shadow_work: bool=False, **kwargs):
+        work_save_interval: int=None, top: md.Topology=None, subset_atoms: np.array=None, save_configuration: bool=False, measure_shadow_work: bool=False,
+        trajectory_filename: str=None, **kwargs):
 
         super(NonequilibriumSwitchingMove, self).__init__(n_steps=nsteps_neq, **kwargs)
-        print(timestep)
         if measure_shadow_work:
             measure_heat = True
         else:
             measure_heat = False
 
+        #the integrator switches the parameters with OpenMM expressions of the master lambda
+        alchemical_functions = RelativeAlchemicalState.compile_lambda_functions(alchemical_functions)
         self._integrator = integrators.AlchemicalNonequilibriumLangevinIntegrator(alchemical_functions=alchemical_functions, nsteps_neq=nsteps_neq,
                                                                                   temperature=temperature, splitting=splitting, timestep=timestep, measure_heat=measure_heat)
         self._ncmc_nsteps = nsteps_neq
 
         self._beta = 1.0 / (kB*temperature)
+        if work_save_interval is None:
+            work_save_interval = nsteps_neq
         self._work_save_interval = work_save_interval
 
         self._save_configuration = save_configuration
@@ -287,14 +477,16 @@ class NonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
         self._topology = top
         self._subset_atoms = subset_atoms
         self._trajectory = None
+        self._trajectory_filename = trajectory_filename
 
-        #if we have a trajectory, set up some ancillary variables:
+        #if we have a trajectory, set up some ancillary variables (unless it is streamed to a file):
         if self._topology is not None:
-            n_atoms = self._topology.n_atoms
-            n_iterations = self._number_of_step_moves
-            self._trajectory_positions = np.zeros([n_iterations, n_atoms, 3])
-            self._trajectory_box_lengths = np.zeros([n_iterations, 3])
-            self._trajectory_box_angles = np.zeros([n_iterations, 3])
+            if self._trajectory_filename is None:
+                n_atoms = self._topology.n_atoms
+                n_iterations = self._number_of_step_moves
+                self._trajectory_positions = np.zeros([n_iterations, n_atoms, 3], dtype=np.float32)
+                self._trajectory_box_lengths = np.zeros([n_iterations, 3])
+                self._trajectory_box_angles = np.zeros([n_iterations, 3])
         else:
             self._save_configuration = False
 
@@ -365,13 +557,21 @@ class NonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
 
         if self._measure_shadow_work:
             initial_energy = self._beta * (sampler_state.potential_energy + sampler_state.kinetic_energy)
+
+        trajectory_writer = None
+        if self._save_configuration and self._trajectory_filename is not None:
+            trajectory_writer = TrajectoryWriter(self._trajectory_filename, self._topology, self._subset_atoms)
+
         #loop through the number of times we have to apply in order to collect the requested work and trajectory statistics.
         for iteration in range(self._number_of_step_moves):
 
             try:
                 integrator.step(self._work_save_interval)
             except Exception as e:
-                self._trajectory = md.Trajectory(self._trajectory_positions, self._topology, unitcell_lengths=self._trajectory_box_lengths, unitcell_angles=self._trajectory_box_angles)
+                if trajectory_writer is not None:
+                    trajectory_writer.close()
+                elif self._save_configuration:
+                    self._trajectory = md.Trajectory(self._trajectory_positions, self._topology, unitcell_lengths=self._trajectory_box_lengths, unitcell_angles=self._trajectory_box_angles)
                 raise e
             self._current_protocol_work = integrator.get_protocol_work(dimensionless=True)
             self._protocol_work[iteration+1] = self._current_protocol_work
@@ -380,8 +580,12 @@ class NonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
             #if iteration %100 ==0:
             #    print(self._current_protocol_work)
 
+            #if we have a trajectory file, stream the configuration to it
+            if trajectory_writer is not None:
+                trajectory_writer.write_context_frame(context)
+
             #if we have a trajectory, we'll also write to it
-            if self._save_configuration:
+            elif self._save_configuration:
                 sampler_state.update_from_context(context)
 
                 #record positions for writing to trajectory
@@ -397,11 +601,17 @@ class NonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
                 self._trajectory_box_lengths[iteration, :] = [a, b, c]
                 self._trajectory_box_angles[iteration, :] = [alpha, beta, gamma]
 
-        if self._save_configuration:
+        if trajectory_writer is not None:
+            trajectory_writer.close()
+        elif self._save_configuration:
             self._trajectory = md.Trajectory(self._trajectory_positions, self._topology, unitcell_lengths=self._trajectory_box_lengths, unitcell_angles=self._trajectory_box_angles)
 
         self._current_total_work = self._current_protocol_work
 
+        #the sampler state is only updated along the way when configurations are kept in memory, so update it here
+        #before its final energy is used
+        sampler_state.update_from_context(context)
+
         if self._measure_shadow_work:
             total_heat = integrator.get_heat(dimensionless=True)
             final_energy = self._beta * (sampler_state.potential_energy + sampler_state.kinetic_energy)
@@ -412,24 +622,13 @@ class NonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
         # Subclasses can read here info from the context to update internal statistics.
         self._after_integration(context, thermodynamic_state)
 
-        sampler_state.update_from_context(context)
-
     def reset(self):
         """
-        Reset the work statistics on the associated ContextCache integrator.
-
-        Parameters
-        ----------
-        thermodynamic_state : openmmtools.states.ThermodynamicState
-            the thermodynamic state for which this integrator is cached.
+        Reset the work statistics. The integrator associated with the context in the ContextCache (which need not be
+        self._integrator, and is the only one bound to a context) is reset at the start of apply().
         """
-        self._integrator.reset()
         self._current_protocol_work = 0.0
 
-    def _before_integration(self, context: openmm.Context, thermodynamic_state: states.ThermodynamicState):
-        """Execute code after Context creation and before integration."""
-        self._integrator.reset()
-
     @property
     def current_total_work(self):
         """
@@ -446,6 +645,8 @@ class NonequilibriumSwitchingMove(mcmc.BaseIntegratorMove):
     def trajectory(self):
         if self._save_configuration is None:
             raise NoTrajectoryException("Tried to access a trajectory without providing a topology.")
+        elif self._trajectory_filename is not None:
+            raise NoTrajectoryException("The trajectory was written to {}".format(self._trajectory_filename))
         elif self._trajectory is None:
             raise NoTrajectoryException("Tried to access a trajectory on a move that hasn't been used yet.")
         else:
@@ -513,14 +714,15 @@ def run_protocol(equilibrium_result: EquilibriumResult, thermodynamic_state: sta
     trajectory_filename : str, default None
         Full filepath of output trajectory, if desired. If None, no trajectory file is written.
     write_configuration : bool, default False
-        Whether to also write configurations of the trajectory at the requested interval.
+        Whether to also write configurations of the trajectory at the requested interval. They are written (in single
+        precision) to trajectory_filename as the protocol runs.
     timestep : unit.Quantity, default 1 fs
         The timestep to use in the integrator
     Returns
     -------
     nonequilibrium_result : NonequilibriumResult
-        result object containing the trajectory of the nonequilibrium calculation, as well as the cumulative work
-        for each frame.
+        result object containing the cumulative and protocol work of the nonequilibrium calculation at each saved
+        frame, and the total shadow work of the protocol (zero if it is not measured). The work is not written here; see perses.storage.NonequilibriumWorkStorage.
     """
     #get the sampler state needed for the simulation
     sampler_state = equilibrium_result.sampler_state
@@ -534,7 +736,9 @@ def run_protocol(equilibrium_result: EquilibriumResult, thermodynamic_state: sta
         subset_topology = topology.subset(atom_indices_to_save)
         atom_indices = atom_indices_to_save
 
-    ne_mc_move = NonequilibriumSwitchingMove(alchemical_functions, splitting, temperature, nstep_neq, timestep, work_save_interval, subset_topology, atom_indices, save_configuration=write_configuration, measure_shadow_work=measure_shadow_work)
+    #if configurations are requested, they are streamed to the trajectory file by the move
+    ne_mc_move = NonequilibriumSwitchingMove(alchemical_functions, splitting, temperature, nstep_neq, timestep, work_save_interval, subset_topology, atom_indices, save_configuration=write_configuration, measure_shadow_work=measure_shadow_work,
+                                             trajectory_filename=trajectory_filename if write_configuration else None)
 
     ne_mc_move.reset()
 
@@ -547,46 +751,15 @@ def run_protocol(equilibrium_result: EquilibriumResult, thermodynamic_state: sta
     #get the protocol work
     protocol_work = ne_mc_move.protocol_work
 
-    #if we're measuring shadow work, get that. Otherwise just fill in zeros:
+    #if we're measuring shadow work, get that (it is only measured over the whole protocol). Otherwise just fill in zero:
     if measure_shadow_work:
         shadow_work = ne_mc_move.shadow_work
     else:
-        shadow_work = np.zeros_like(protocol_work)
+        shadow_work = 0.0
 
     #create a result object and return that
     nonequilibrium_result = NonequilibriumResult(cumulative_work, protocol_work, shadow_work)
 
-    #if desired, write nonequilibrium trajectories:
-    if trajectory_filename is not None:
-        #to get the filename for cumulative work, replace the extension of the trajectory file with .cw.npy
-        filepath_parts = trajectory_filename.split(".")
-        cw_filepath_parts = copy.deepcopy(filepath_parts)
-        pw_filepath_parts = copy.deepcopy(filepath_parts)
-        if measure_shadow_work:
-            sw_filepath_parts = copy.deepcopy(filepath_parts)
-            sw_filepath_parts[-1] = "sw.npy"
-            shad_work_filepath = ".".join(sw_filepath_parts)
-
-        cw_filepath_parts[-1] = "cw.npy"
-        pw_filepath_parts[-1] = "pw.npy"
-
-        cum_work_filepath = ".".join(cw_filepath_parts)
-        prot_work_filepath = ".".join(pw_filepath_parts)
-
-        #if writing configurations was requested, get the trajectory
-        if write_configuration:
-            try:
-                trajectory = ne_mc_move.trajectory
-                write_nonequilibrium_trajectory(nonequilibrium_result, trajectory, trajectory_filename)
-            except NoTrajectoryException:
-                pass
-
-        np.save(cum_work_filepath, nonequilibrium_result.cumulative_work)
-        np.save(prot_work_filepath, nonequilibrium_result.protocol_work)
-
-        if measure_shadow_work:
-            np.save(shad_work_filepath, shadow_work)
-
     return nonequilibrium_result
 
 def run_equilibrium(equilibrium_result: EquilibriumResult, thermodynamic_state: states.ThermodynamicState,
@@ -616,14 +789,15 @@ def run_equilibrium(equilibrium_result: EquilibriumResult, thermodynamic_state:
     atom_indices_to_save : list of int, default None
         list of indices to save (when excluding waters, for instance). If None, all indices are saved.
     trajectory_filename : str, optional, default None
-        Full filepath of trajectory files. If none, trajectory files are not written.
+        Full filepath of trajectory files. If none, trajectory files are not written. The frames are appended to
+        the file (see TrajectoryWriter) in single precision.
     splitting: str, default "V R O H R V"
         The splitting string for the dynamics
     Returns
     -------
     equilibrium_result : EquilibriumResult
-        Container namedtuple that has the SamplerState for resuming, an MDTraj trajectory, and the reduced potential of the
-        final frame.
+        Container namedtuple that has the SamplerState for resuming, the reduced potential of the final frame, and the
+        (start, stop) indices of the frames written to trajectory_filename (None if no trajectory was written).
     """
     sampler_state = equilibrium_result.sampler_state
     #get the atom indices we need to subset the topology and positions
@@ -634,40 +808,35 @@ def run_equilibrium(equilibrium_result: EquilibriumResult, thermodynamic_state:
         subset_topology = topology.subset(atom_indices_to_save)
         atom_indices = atom_indices_to_save
 
-    n_atoms = subset_topology.n_atoms
-
     #construct the MCMove:
     mc_move = mcmc.LangevinSplittingDynamicsMove(n_steps=nsteps_equil, splitting=splitting)
     mc_move.n_restart_attempts = 10
 
-    #create a numpy array for the trajectory
-    trajectory_positions = np.zeros([n_iterations, n_atoms, 3])
-    trajectory_box_lengths = np.zeros([n_iterations, 3])
-    trajectory_box_angles = np.zeros([n_iterations, 3])
-
-    #loop through iterations and apply MCMove, then collect positions into numpy array
-    for iteration in range(n_iterations):
-        mc_move.apply(thermodynamic_state, sampler_state)
+    #if there is a trajectory filename passed, append each frame to it as it is generated, rather than reloading
+    #and rewriting the frames of the previous calls
+    if trajectory_filename is not None:
+        trajectory_writer = TrajectoryWriter(trajectory_filename, subset_topology, atom_indices=atom_indices, mode='a')
+    else:
+        trajectory_writer = None
 
-        trajectory_positions[iteration, :] = sampler_state.positions[atom_indices, :].value_in_unit_system(unit.md_unit_system)
+    #loop through iterations and apply MCMove, then write the positions
+    try:
+        for iteration in range(n_iterations):
+            mc_move.apply(thermodynamic_state, sampler_state)
 
-        #get the box lengths and angles
-        a, b, c, alpha, beta, gamma = mdtrajutils.unitcell.box_vectors_to_lengths_and_angles(*sampler_state.box_vectors)
-        trajectory_box_lengths[iteration, :] = [a, b, c]
-        trajectory_box_angles[iteration, :] = [alpha, beta, gamma]
+            if trajectory_writer is not None:
+                trajectory_writer.write_frame(sampler_state.positions, sampler_state.box_vectors)
+    finally:
+        if trajectory_writer is not None:
+            trajectory_writer.close()
 
-    #construct trajectory object:
-    trajectory = md.Trajectory(trajectory_positions, subset_topology, unitcell_lengths=trajectory_box_lengths, unitcell_angles=trajectory_box_angles)
+    trajectory_frames = trajectory_writer.frame_range if trajectory_writer is not None else None
 
     #get the reduced potential from the final frame for endpoint perturbations
     reduced_potential_final_frame = thermodynamic_state.reduced_potential(sampler_state)
 
     #construct equilibrium result object
-    equilibrium_result = EquilibriumResult(sampler_state, reduced_potential_final_frame)
-
-    #If there is a trajectory filename passed, write out the results here:
-    if trajectory_filename is not None:
-        write_equilibrium_trajectory(equilibrium_result, trajectory, trajectory_filename)
+    equilibrium_result = EquilibriumResult(sampler_state, reduced_potential_final_frame, trajectory_frames)
 
     return equilibrium_result
 
@@ -760,12 +929,9 @@ def write_equilibrium_trajectory(equilibrium_result: EquilibriumResult, trajecto
     reduced_potential_final_frame : float
         the reduced potential of the final frame
     """
-    if not os.path.exists(trajectory_filename):
-        trajectory.save_hdf5(trajectory_filename)
-    else:
-        written_traj = md.load_hdf5(trajectory_filename)
-        concatenated_traj = written_traj.join(trajectory)
-        concatenated_traj.save_hdf5(trajectory_filename)
+    #only the new frames are written; those already in the file are not reloaded
+    with TrajectoryWriter(trajectory_filename, trajectory.topology, mode='a') as trajectory_writer:
+        trajectory_writer.write_trajectory(trajectory)
 
     return equilibrium_result.reduced_potential
 
@@ -17,6 +17,7 @@ from perses.annihilation.lambda_protocol import RelativeAlchemicalState
 from perses.rjmc.topology_proposal import TopologyProposal, TwoMoleculeSetProposalEngine, SystemGenerator, \
     SmallMoleculeSetProposalEngine
 from perses.rjmc.geometry import FFAllAngleGeometryEngine
+from perses.storage import NonequilibriumWorkStorage
 import openeye.oechem as oechem
 from openmoltools import forcefield_generators
 import copy
@@ -408,7 +409,8 @@ class NonequilibriumSwitchingFEP(object):
     def __init__(self, topology_proposal, pos_old, new_positions, use_dispersion_correction=False,
                  forward_functions=None, n_equil_steps=1000, ncmc_nsteps=100, nsteps_per_iteration=1,
                  temperature=300.0 * unit.kelvin, trajectory_directory=None, trajectory_prefix=None,
-                 atom_selection="not water", scheduler_address=None, eq_splitting_string="V R O R V", neq_splitting_string="V R O H R V", measure_shadow_work=False, timestep=1.0*unit.femtoseconds):
+                 atom_selection="not water", scheduler_address=None, eq_splitting_string="V R O R V", neq_splitting_string="V R O H R V", measure_shadow_work=False, timestep=1.0*unit.femtoseconds,
+                 hybrid_cache_directory=None):
         """
         Create an instance of the NonequilibriumSwitchingFEP driver class
 
@@ -435,7 +437,9 @@ class NonequilibriumSwitchingFEP(object):
         trajectory_directory : str, default None
             Where to write out trajectories resulting from the calculation. If none, no writing is done.
         trajectory_prefix : str, default None
-            What prefix to use for this calculation's trajectory files. If none, no writing is done.
+            What prefix to use for this calculation's trajectory files. If none, no writing is done. The work and
+            reduced potentials of all iterations are appended to a single {trajectory_prefix}.work.nc file (see
+            perses.storage.NonequilibriumWorkStorage).
         atom_selection : str, default not water
             MDTraj selection syntax for which atomic coordinates to save in the trajectories. Default strips
             all water.
@@ -445,6 +449,9 @@ class NonequilibriumSwitchingFEP(object):
             The integrator splitting to use for equilibrium simulation
         neq_splitting_string : str, default V R O H R V
             The integrator splitting to use for the nonequilibrium simulation
+        hybrid_cache_directory : str, default None
+            If not None, the directory in which hybrid systems are cached, so that they are not rebuilt when the same
+            transformation is set up again
         """
         if scheduler_address is None:
             self._map = map
@@ -459,7 +466,11 @@ class NonequilibriumSwitchingFEP(object):
 
         # construct the hybrid topology factory object
         self._factory = HybridTopologyFactory(topology_proposal, pos_old, new_positions,
-                                              use_dispersion_correction=use_dispersion_correction)
+                                              use_dispersion_correction=use_dispersion_correction,
+                                              cache_directory=hybrid_cache_directory)
+
+        # only keep what is needed downstream, since the factory is sent to every nonequilibrium task
+        self._factory.freeze()
 
         # use default functions if none specified
         if forward_functions == None:
@@ -497,14 +508,20 @@ class NonequilibriumSwitchingFEP(object):
             self._neq_traj_filename = {lambda_state: os.path.join(os.getcwd(), self._trajectory_directory,
                                                                   trajectory_prefix + ".{iteration}.neq.lambda%d" % lambda_state + ".h5")
                                        for lambda_state in [0, 1]}
+            self._work_storage_filename = os.path.join(os.getcwd(), self._trajectory_directory, trajectory_prefix + ".work.nc")
         else:
             self._write_traj = False
             self._trajectory_filename = {0: None, 1: None}
             self._neq_traj_filename = {0: None, 1: None}
+            self._work_storage_filename = None
 
         # initialize lists for results
         self._total_work = {0: [], 1: []}
         self._reduced_potential_differences = {0: [], 1: []}
+        # the (start, stop) frames of each chunk appended to the equilibrium trajectory files
+        self._equilibrium_trajectory_frames = {0: [], 1: []}
+        # the number of rounds of equilibrium run at each endpoint, including those of equilibration
+        self._n_equilibrium_rounds = 0
 
         # Set the number of times that the nonequilbrium move will have to be run in order to complete a protocol:
         if self._ncmc_nsteps % self._nsteps_per_iteration != 0:
@@ -519,8 +536,9 @@ class NonequilibriumSwitchingFEP(object):
         lambda_zero_alchemical_state = RelativeAlchemicalState.from_system(self._hybrid_system)
         lambda_one_alchemical_state = copy.deepcopy(lambda_zero_alchemical_state)
 
-        lambda_zero_alchemical_state.set_alchemical_parameters(0.0)
-        lambda_one_alchemical_state.set_alchemical_parameters(1.0)
+        endpoint_lambda_table = RelativeAlchemicalState.compute_lambda_table([0.0, 1.0])
+        lambda_zero_alchemical_state.set_alchemical_parameters_from_table(endpoint_lambda_table, 0)
+        lambda_one_alchemical_state.set_alchemical_parameters_from_table(endpoint_lambda_table, 1)
 
         # ensure their states are set appropriately
         self._hybrid_alchemical_states = {0: lambda_zero_alchemical_state, 1: lambda_one_alchemical_state}
@@ -611,54 +629,106 @@ class NonequilibriumSwitchingFEP(object):
         timestep = [self._timestep, self._timestep]
         write_configuration = [self._write_traj, self._write_traj]
 
-        endpoint_perturbation_results_list = []
-        nonequilibrium_results_list = []
-        for i in range(n_iterations):
+        # this process is the only writer of the work storage; the workers return their results to it. The iterations
+        # are appended after those already in the storage (e.g. from a previous run, or another instance)
+        if self._work_storage_filename is not None:
+            work_storage = NonequilibriumWorkStorage(self._work_storage_filename, mode='a')
+            first_storage_iteration = work_storage.n_iterations
+        else:
+            work_storage = None
+            first_storage_iteration = 0
 
-            if self._write_traj:
-                equilibrium_trajectory_filenames = self._trajectory_filename.values()
-                noneq_trajectory_filenames = [
-                    self._neq_traj_filename[lambda_state].format(iteration=self._current_iteration) for lambda_state in
-                    endpoints]
-            else:
-                equilibrium_trajectory_filenames = [None, None]
-                noneq_trajectory_filenames = [None, None]
+        # the tasks of the iteration whose results have not been retrieved yet
+        pending_iteration = None
+        try:
+            for i in range(n_iterations):
 
-            # run a round of equilibrium
-            self._equilibrium_results = self._gather(self._map(feptasks.run_equilibrium, self._equilibrium_results,
-                                                               self._hybrid_thermodynamic_states.values(), nsteps_equil,
-                                                               hybrid_topology_list, n_eq_iterations_per_call_list,
-                                                               atom_indices_to_save_list,
-                                                               equilibrium_trajectory_filenames, eq_splitting, timestep))
-
-            # get the perturbations to nonalchemical states:
-            endpoint_perturbation_results_mapped = self._map(feptasks.compute_nonalchemical_perturbation,
-                                                             self._equilibrium_results, hybrid_factory_list,
-                                                             self._nonalchemical_thermodynamic_states.values(),
-                                                             endpoints)
-            endpoint_perturbation_results_list.append(list(endpoint_perturbation_results_mapped))
-
-            # run a round of nonequilibrium switching:
-            nonequilibrium_results_list.append(
-                self._map(feptasks.run_protocol, self._equilibrium_results, self._hybrid_thermodynamic_states.values(),
-                          alchemical_functions, nsteps_neq, hybrid_topology_list, write_interval_list, splitting,
-                          atom_indices_to_save_list, noneq_trajectory_filenames, write_configuration, timestep, measure_shadow_work))
-
-            self._current_iteration += 1
-            print(self._current_iteration)
-
-        # after all tasks have been requested, retrieve the results:
-        for i in range(n_iterations):
-            self._equilibrium_results = self._gather(self._equilibrium_results)
-            endpoint_perturbations = self._gather(endpoint_perturbation_results_list[i])
-            nonequilibrium_results = self._gather(nonequilibrium_results_list[i])
+                if self._write_traj:
+                    equilibrium_trajectory_filenames = self._trajectory_filename.values()
+                    noneq_trajectory_filenames = [
+                        self._neq_traj_filename[lambda_state].format(iteration=self._current_iteration) for lambda_state in
+                        endpoints]
+                else:
+                    equilibrium_trajectory_filenames = [None, None]
+                    noneq_trajectory_filenames = [None, None]
+
+                # run a round of equilibrium
+                self._equilibrium_results = self._gather(self._map(feptasks.run_equilibrium, self._equilibrium_results,
+                                                                   self._hybrid_thermodynamic_states.values(), nsteps_equil,
+                                                                   hybrid_topology_list, n_eq_iterations_per_call_list,
+                                                                   atom_indices_to_save_list,
+                                                                   equilibrium_trajectory_filenames, eq_splitting, timestep))
+                self._record_equilibrium_trajectory_frames()
+                equilibrium_index = self._n_equilibrium_rounds
+                self._n_equilibrium_rounds += 1
+
+                # while the previous protocols ran alongside this round of equilibrium, retrieve and write them out:
+                if pending_iteration is not None:
+                    self._write_iteration_results(work_storage, *pending_iteration)
+
+                # get the perturbations to nonalchemical states:
+                endpoint_perturbation_results_mapped = self._map(feptasks.compute_nonalchemical_perturbation,
+                                                                 self._equilibrium_results, hybrid_factory_list,
+                                                                 self._nonalchemical_thermodynamic_states.values(),
+                                                                 endpoints)
+
+                # run a round of nonequilibrium switching:
+                nonequilibrium_results_mapped = self._map(feptasks.run_protocol, self._equilibrium_results,
+                                                          self._hybrid_thermodynamic_states.values(), alchemical_functions,
+                                                          nsteps_neq, hybrid_topology_list, write_interval_list, splitting,
+                                                          atom_indices_to_save_list, noneq_trajectory_filenames,
+                                                          write_configuration, timestep, measure_shadow_work)
+
+                pending_iteration = (first_storage_iteration + i, self._equilibrium_results, equilibrium_index,
+                                     list(endpoint_perturbation_results_mapped), nonequilibrium_results_mapped)
+
+                self._current_iteration += 1
+                print(self._current_iteration)
+
+            if pending_iteration is not None:
+                self._write_iteration_results(work_storage, *pending_iteration)
+        finally:
+            if work_storage is not None:
+                work_storage.close()
+
+    def _write_iteration_results(self, work_storage, iteration, equilibrium_results, equilibrium_index,
+                                 endpoint_perturbation_results, nonequilibrium_results):
+        """
+        Retrieve the results of one iteration of run(), record them, and write them to the work storage (if any).
+
+        Parameters
+        ----------
+        work_storage : perses.storage.NonequilibriumWorkStorage
+            The storage to write to, or None
+        iteration : int
+            The iteration of the work storage to write the results to
+        equilibrium_results : list of feptasks.EquilibriumResult
+            The (gathered) equilibrium results from which the protocols were started, at lambda = 0 and 1
+        equilibrium_index : int
+            The number of rounds of equilibrium run at each endpoint before those results
+        endpoint_perturbation_results : list
+            The (possibly not yet gathered) reduced potential differences to the nonalchemical endpoints
+        nonequilibrium_results : list
+            The (possibly not yet gathered) feptasks.NonequilibriumResult of the forward and reverse protocols
+        """
+        endpoint_perturbations = self._gather(endpoint_perturbation_results)
+        nonequilibrium_results = self._gather(nonequilibrium_results)
+
+        for lambda_state in [0, 1]:
+            self._reduced_potential_differences[lambda_state].append(endpoint_perturbations[lambda_state])
+
+            # for the nonequilibrium results, we have to access the last element of the cumulative work, since that
+            # is the total work
+            self._total_work[lambda_state].append(nonequilibrium_results[lambda_state].cumulative_work[-1])
 
-            for lambda_state in [0, 1]:
-                self._reduced_potential_differences[lambda_state].append(endpoint_perturbations[lambda_state])
+            if work_storage is not None:
+                work_storage.write_equilibrium_result(iteration, lambda_state, equilibrium_results[lambda_state],
+                                                      endpoint_perturbations[lambda_state], equilibrium_index)
+                work_storage.write_nonequilibrium_result(iteration, lambda_state, nonequilibrium_results[lambda_state])
 
-                # for the nonequilibrium results, we have to access the last element of the cumulative work, since that
-                # is the total work
-                self._total_work[lambda_state].append(nonequilibrium_results[lambda_state].cumulative_work[-1])
+        # make the iteration readable from the file while the calculation goes on
+        if work_storage is not None:
+            work_storage.sync()
 
     def equilibrate(self, n_iterations=100):
         """
@@ -688,6 +758,18 @@ class NonequilibriumSwitchingFEP(object):
                                                   self._hybrid_thermodynamic_states.values(), nsteps_equil,
                                                   hybrid_topology_list, n_eq_iterations_per_call_list,
                                                   atom_indices_to_save_list, equilibrium_trajectory_filenames, eq_splitting, timestep)
+            self._n_equilibrium_rounds += 1
+            if self._write_traj:
+                self._equilibrium_results = self._gather(self._equilibrium_results)
+                self._record_equilibrium_trajectory_frames()
+
+    def _record_equilibrium_trajectory_frames(self):
+        """
+        Record the frames that the last (gathered) round of equilibrium appended to the equilibrium trajectory files.
+        """
+        for lambda_state, equilibrium_result in zip([0, 1], self._equilibrium_results):
+            if equilibrium_result.trajectory_frames is not None:
+                self._equilibrium_trajectory_frames[lambda_state].append(equilibrium_result.trajectory_frames)
 
     def _adjust_for_correlation(self, timeseries_array: np.array):
         """
@@ -772,6 +854,20 @@ class NonequilibriumSwitchingFEP(object):
 
         return df, ddf_corrected
 
+    @property
+    def work_storage_filename(self):
+        """
+        The file to which the work and reduced potentials are appended, or None if nothing is written
+        """
+        return self._work_storage_filename
+
+    @property
+    def equilibrium_trajectory_frames(self):
+        """
+        The (start, stop) frames of each chunk appended to the equilibrium trajectory file at each lambda endpoint
+        """
+        return self._equilibrium_trajectory_frames
+
     @property
     def current_free_energy_estimate(self):
         """
@@ -881,10 +977,12 @@ class HybridSAMSSampler(HybridCompatibilityMixin, sams.SAMSSampler):
 
         thermodynamic_state_list = [compound_thermodynamic_state]
 
+        # evaluate the lambda functions once for all the windows
         lambda_values = np.linspace(0.,1.,n_states)
-        for lambda_val in lambda_values:
+        lambda_table = RelativeAlchemicalState.compute_lambda_table(lambda_values)
+        for lambda_index in range(n_states):
             compound_thermodynamic_state_copy = copy.deepcopy(compound_thermodynamic_state)
-            compound_thermodynamic_state_copy.set_alchemical_parameters(lambda_val)
+            compound_thermodynamic_state_copy.set_alchemical_parameters_from_table(lambda_table, lambda_index)
             thermodynamic_state_list.append(compound_thermodynamic_state_copy)
 
         nonalchemical_thermodynamic_states = [
@@ -1031,6 +1129,11 @@ def run_setup(setup_options):
         phases = setup_options['phases']
     else:
         phases = ['complex', 'solvent']
+
+    if 'hybrid_cache_directory' in setup_options:
+        hybrid_cache_directory = setup_options['hybrid_cache_directory']
+    else:
+        hybrid_cache_directory = None
     if setup_options['fe_type'] == 'nonequilibrium':
         n_equilibrium_steps_per_iteration = setup_options['n_equilibrium_steps_per_iteration']
 
@@ -1052,7 +1155,8 @@ def run_setup(setup_options):
                                                        scheduler_address=scheduler_address, eq_splitting_string=eq_splitting,
                                                        neq_splitting_string=neq_splitting,
                                                        timestep=timestep,
-                                                       measure_shadow_work=measure_shadow_work)
+                                                       measure_shadow_work=measure_shadow_work,
+                                                       hybrid_cache_directory=hybrid_cache_directory)
 
         print("Nonequilibrium switching driver class constructed")
 
@@ -1066,7 +1170,8 @@ def run_setup(setup_options):
         for phase in phases:
             htf[phase] = HybridTopologyFactory(top_prop['%s_topology_proposal' % phase],
                                                top_prop['%s_old_positions' % phase],
-                                               top_prop['%s_new_positions' % phase])
+                                               top_prop['%s_new_positions' % phase],
+                                               cache_directory=hybrid_cache_directory)
             
             if atom_selection:
                 selection_indices = htf[phase].hybrid_topology.select(atom_selection)
@@ -9,6 +9,7 @@ import collections
 import functools
 
 from perses.storage import NetCDFStorage, NetCDFStorageView
+from perses.utils.openmm_utils import read_serialized_force_terms
 
 ################################################################################
 # Initialize logging
@@ -140,9 +141,54 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         This may significantly slow down the simulation, however.
     neglect_angles : bool, optional, default = True
         whether to ignore and report on theta angle potentials that add variance to the work
+    use_batched_torsion_scan : bool, optional, default=False
+        If True, the torsion PMF is computed from a single growth context energy evaluation plus a vectorized
+        evaluation (``GrowthSystemEnergyEvaluator``) of the terms involving the atom being placed for all torsion bins,
+        rather than from one context energy evaluation per torsion bin.
+    use_valence_energy_kernel : bool, optional, default=False
+        If True and use_sterics is False, all growth system energies (torsion scans and the energy accumulated as atoms
+        are placed) are computed with NumPy by ``GrowthSystemEnergyEvaluator`` and no growth Context is created.
+    pmf_cache_capacity : int or None, optional, default=1024
+        Maximum number of discretized bond and angle PMF tables to memoize, keyed by
+        (equilibrium value, force constant, beta, n_divisions, softening constant). If None, tables are not cached.
+    bond_angle_sampling : str, optional, default='quadrature'
+        How bond lengths and angles are drawn and scored. 'quadrature' uses discretized PMFs with
+        n_bond_divisions and n_angle_divisions bins; 'analytic' draws r and theta by rejection sampling from
+        their continuous densities (r^2 and sin(theta) times a Gaussian) and uses their exact log densities.
+    growth_cache_capacity : int, optional, default=0
+        Maximum number of transformations (direction, chemical states, atom map, and torsion proposal order) for which
+        the parmed structure, growth system, and OpenMM Contexts are kept for reuse. If 0, nothing is cached.
+    sterics_subsystem_radius : simtk.unit.Quantity with units compatible with nanometers, optional, default=None
+        If specified and use_sterics is True, the growth system (and its Context) is built only over the transforming
+        residue and the atoms within this distance of its positioned atoms, rather than over the whole system.
+        Atom indices are remapped so that proposed positions and logp are unchanged, provided the radius is at least
+        the nonbonded cutoff plus the distance from any placed atom to the nearest positioned atom of its residue.
+        No full-system growth system or Context is built in this mode, so the atoms_with_positions and final reduced
+        potentials (and the energy validation) are those of the subsystem.
+    use_unitless_positions : bool, optional, default=False
+        If True, positions are converted once per proposal to a contiguous float64 array in nanometers, the atom
+        placement loop operates on raw arrays (without per-atom copies of the full positions), and units are
+        reattached only to the returned positions. Proposed positions and logp are unchanged.
+    energy_validation_interval : int, optional, default=1
+        How often the energy bookkeeping of a proposal is validated against the energy of the full (valence-only, unless
+        use_sterics) system, counting forward proposals and reverse logp calculations separately: 1 validates every call,
+        N validates every Nth call (starting with the first), and 0 never validates. The final system Context and the
+        per-force energy breakdown are only created for validated calls; otherwise the final reduced potential is
+        taken to be the reduced potential before atom placement plus the reduced energy added by the growth system.
+
+    Attributes
+    ----------
+    pmf_cache_hits : int
+        Number of bond/angle PMF table lookups served from the cache
+    pmf_cache_misses : int
+        Number of bond/angle PMF tables that had to be computed
+    growth_cache_hits : int
+        Number of proposals that reused a cached growth system and Contexts
+    growth_cache_misses : int
+        Number of proposals that had to create a growth system and Contexts
 
     """
-    def __init__(self, metadata=None, use_sterics=False, n_bond_divisions=1000, n_angle_divisions=180, n_torsion_divisions=360, verbose=True, storage=None, bond_softening_constant=1.0, angle_softening_constant=1.0, neglect_angles = True):
+    def __init__(self, metadata=None, use_sterics=False, n_bond_divisions=1000, n_angle_divisions=180, n_torsion_divisions=360, verbose=True, storage=None, bond_softening_constant=1.0, angle_softening_constant=1.0, neglect_angles = True, use_batched_torsion_scan=False, use_valence_energy_kernel=False, pmf_cache_capacity=1024, bond_angle_sampling='quadrature', growth_cache_capacity=0, sterics_subsystem_radius=None, use_unitless_positions=False, energy_validation_interval=1):
         self._metadata = metadata
         self.write_proposal_pdb = False # if True, will write PDB for sequential atom placements
         self.pdb_filename_prefix = 'geometry-proposal' # PDB file prefix for writing sequential atom placements
@@ -162,6 +208,40 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         else:
             self._storage = None
         self.neglect_angles = neglect_angles
+        self.use_batched_torsion_scan = use_batched_torsion_scan
+        self.use_valence_energy_kernel = use_valence_energy_kernel
+
+        # Bounded cache of discretized bond and angle PMF tables
+        if pmf_cache_capacity is not None:
+            from openmmtools.cache import LRUCache
+            self._pmf_cache = LRUCache(capacity=pmf_cache_capacity)
+        else:
+            self._pmf_cache = None
+        self.pmf_cache_hits = 0
+        self.pmf_cache_misses = 0
+
+        if bond_angle_sampling not in ['quadrature', 'analytic']:
+            raise ValueError("bond_angle_sampling must be 'quadrature' or 'analytic', not '{}'".format(bond_angle_sampling))
+        self._bond_angle_sampling = bond_angle_sampling
+
+        # LRU cache of growth systems and Contexts, keyed by transformation
+        if growth_cache_capacity:
+            from openmmtools.cache import LRUCache
+            self._growth_cache = LRUCache(capacity=growth_cache_capacity)
+        else:
+            self._growth_cache = None
+        self.growth_cache_hits = 0
+        self.growth_cache_misses = 0
+
+        if sterics_subsystem_radius is not None:
+            check_dimensionality(sterics_subsystem_radius, unit.nanometers)
+        self.sterics_subsystem_radius = sterics_subsystem_radius
+        self.use_unitless_positions = use_unitless_positions
+
+        if energy_validation_interval < 0:
+            raise ValueError("energy_validation_interval must be non-negative, not {}".format(energy_validation_interval))
+        self.energy_validation_interval = energy_validation_interval
+        self._n_logp_propose_calls = {'forward': 0, 'reverse': 0}
 
     def propose(self, top_proposal, current_positions, beta):
         """
@@ -332,6 +412,14 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         if new_positions is not None:
             check_dimensionality(new_positions, unit.angstroms)
 
+        # In the unitless fast path, work on float64 copies implicitly in nanometers; units are reattached on return
+        use_unitless_positions = self.use_unitless_positions
+        if use_unitless_positions:
+            input_new_positions = new_positions
+            old_positions = np.array(old_positions.value_in_unit(unit.nanometers), dtype=np.float64)
+            if new_positions is not None:
+                new_positions = np.array(new_positions.value_in_unit(unit.nanometers), dtype=np.float64)
+
         # Determine order in which atoms (and the torsions they are involved in) will be proposed
         _logger.info("Computing proposal order with NetworkX...")
         proposal_order_tool = NetworkXProposalOrder(top_proposal, direction=direction)
@@ -340,41 +428,49 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         _logger.info(f"number of atoms to be placed: {len(atom_proposal_order)}")
         _logger.info(f"Atom index proposal order is {atom_proposal_order}")
 
-        growth_parameter_name = 'growth_stage'
-        if direction=="forward":
-            _logger.info("direction of proposal is forward; creating atoms_with_positions and new positions from old system/topology...")
-            # Find and copy known positions to match new topology
-            import parmed
-            structure = parmed.openmm.load_topology(top_proposal.new_topology, top_proposal.new_system)
-            atoms_with_positions = [structure.atoms[atom_idx] for atom_idx in top_proposal.new_to_old_atom_map.keys()]
-            new_positions = self._copy_positions(atoms_with_positions, top_proposal, old_positions)
-
-            # Create modified System object
-            _logger.info("creating growth system...")
-            growth_system_generator = GeometrySystemGenerator(top_proposal.new_system, torsion_proposal_order, global_parameter_name=growth_parameter_name, reference_topology=top_proposal.new_topology, use_sterics=self.use_sterics, neglect_angles = self.neglect_angles)
-            growth_system = growth_system_generator.get_modified_system()
+        if direction not in ['forward', 'reverse']:
+            raise ValueError("Parameter 'direction' must be forward or reverse")
+        if (direction == 'reverse') and (new_positions is None):
+            raise ValueError("For reverse proposals, new_positions must not be none.")
 
-        elif direction=='reverse':
-            _logger.info("direction of proposal is reverse; creating atoms_with_positions from old system/topology")
-            if new_positions is None:
-                raise ValueError("For reverse proposals, new_positions must not be none.")
+        # Decide whether the energy bookkeeping of this call will be validated against the final system
+        validate_energy = bool(self.energy_validation_interval) and (self._n_logp_propose_calls[direction] % self.energy_validation_interval == 0)
+        self._n_logp_propose_calls[direction] += 1
 
-            # Find and copy known positions to match old topology
-            import parmed
-            structure = parmed.openmm.load_topology(top_proposal.old_topology, top_proposal.old_system)
-            atoms_with_positions = [structure.atoms[atom_idx] for atom_idx in top_proposal.old_to_new_atom_map.keys()]
+        # Retrieve (or create) the parmed structure, growth system, and Contexts for this transformation
+        growth_cache_entry = self._get_growth_cache_entry(top_proposal, torsion_proposal_order, direction)
+        structure = growth_cache_entry['structure']
+        growth_system_generator = growth_cache_entry['growth_system_generator']
+        growth_energy_evaluator = growth_cache_entry['growth_energy_evaluator']
+        context = growth_cache_entry['context']
+        atoms_with_positions_context = growth_cache_entry['atoms_with_positions_context']
 
-            # Create modified System object
-            _logger.info("creating growth system...")
-            growth_system_generator = GeometrySystemGenerator(top_proposal.old_system, torsion_proposal_order, global_parameter_name=growth_parameter_name, reference_topology=top_proposal.old_topology, use_sterics=self.use_sterics, neglect_angles = self.neglect_angles)
-            growth_system = growth_system_generator.get_modified_system()
+        if direction == 'forward':
+            # Find and copy known positions to match new topology
+            atoms_with_positions = [structure.atoms[atom_idx] for atom_idx in top_proposal.new_to_old_atom_map.keys()]
+            new_positions = self._copy_positions(atoms_with_positions, top_proposal, old_positions)
         else:
-            raise ValueError("Parameter 'direction' must be forward or reverse")
-
-        # Define a system for the core atoms before new atoms are placed
-        atoms_with_positions_system = growth_system_generator._atoms_with_positions_system
+            # Find known positions in old topology
+            atoms_with_positions = [structure.atoms[atom_idx] for atom_idx in top_proposal.old_to_new_atom_map.keys()]
 
-        # Get the angle terms that are neglected from the growth system
+        # With sterics, the growth system may be restricted to the atoms surrounding the transforming residue. The
+        # periodic box is taken from the system of this proposal, rather than from the (cached) system of the entry
+        growth_subsystem = None
+        growth_torsion_proposal_order = torsion_proposal_order
+        if growth_cache_entry['use_growth_subsystem']:
+            proposal_system = top_proposal.new_system if direction == 'forward' else top_proposal.old_system
+            growth_subsystem = self._create_growth_subsystem(growth_cache_entry['system'], growth_cache_entry['topology'], torsion_proposal_order, new_positions if direction == 'forward' else old_positions,
+                                                             box_vectors=proposal_system.getDefaultPeriodicBoxVectors())
+            growth_system_generator = growth_subsystem['growth_system_generator']
+            growth_energy_evaluator = growth_subsystem['growth_energy_evaluator']
+            context = growth_subsystem['context']
+            atoms_with_positions_context = growth_subsystem['atoms_with_positions_context']
+            growth_torsion_proposal_order = growth_subsystem['torsion_proposal_order']
+            growth_positions = growth_subsystem['positions']
+        use_valence_energy_kernel = (context is None)
+
+        # Get the angle terms that are neglected from the growth system (there are none if sterics are used, so those
+        # of a growth subsystem need not be remapped)
         neglected_angle_terms = growth_system_generator.neglected_angle_terms
         _logger.info(f"neglected angle terms include {neglected_angle_terms}")
 
@@ -385,26 +481,15 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         if self._storage:
             self._storage.write_object("{}_proposal_order".format(direction), proposal_order_tool, iteration=self.nproposed)
 
-        if self.use_sterics:
-            platform_name = 'CPU' # faster when sterics are in use
-        else:
-            platform_name = 'Reference' # faster when only valence terms are in use
-
-        # Create an OpenMM context
-        from simtk import openmm
-        _logger.info("creating platform, integrators, and contexts; setting growth parameter")
-        platform = openmm.Platform.getPlatformByName(platform_name)
-        integrator = openmm.VerletIntegrator(1*unit.femtoseconds)
-        atoms_with_positions_system_integrator = openmm.VerletIntegrator(1*unit.femtoseconds)
-        final_system_integrator = openmm.VerletIntegrator(1*unit.femtoseconds)
-        context = openmm.Context(growth_system, integrator, platform)
         growth_system_generator.set_growth_parameter_index(len(atom_proposal_order)+1, context)
         growth_parameter_value = 1 # Initialize the growth_parameter value before the atom placement loop
 
         # In the forward direction, atoms_with_positions_system considers the atoms_with_positions
         # In the reverse direction, atoms_with_positions_system considers the old_positions of atoms in the
-        atoms_with_positions_context = openmm.Context(atoms_with_positions_system, atoms_with_positions_system_integrator, platform)
-        if direction == 'forward':
+        if growth_subsystem is not None:
+            _logger.info("setting atoms_with_positions context subsystem positions")
+            atoms_with_positions_context.setPositions(growth_positions)
+        elif direction == 'forward':
             _logger.info("setting atoms_with_positions context new positions")
             atoms_with_positions_context.setPositions(new_positions)
         else:
@@ -414,7 +499,6 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         #Print the energy of the system before unique_new/old atoms are placed...
         state = atoms_with_positions_context.getState(getEnergy=True)
         atoms_with_positions_reduced_potential = beta*state.getPotentialEnergy()
-        atoms_with_positions_reduced_potential_components = [(force, energy*beta) for force, energy in compute_potential_components(atoms_with_positions_context)]
 
         # Place each atom in predetermined order
         _logger.info("There are {} new atoms".format(len(atom_proposal_order)))
@@ -422,7 +506,7 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         rjmc_info = list()
         energy_logger = [] #for bookkeeping per_atom energy reduced potentials
 
-        for torsion_atom_indices, proposal_prob in zip(torsion_proposal_order, logp_choice):
+        for torsion_atom_indices, growth_torsion_atom_indices, proposal_prob in zip(torsion_proposal_order, growth_torsion_proposal_order, logp_choice):
 
             _logger.info(f"Proposing torsion {torsion_atom_indices} with proposal probability {proposal_prob}")
 
@@ -431,6 +515,8 @@ class FFAllAngleGeometryEngine(GeometryEngine):
 
             # Activate the new atom interactions
             growth_system_generator.set_growth_parameter_index(growth_parameter_value, context=context)
+            if growth_energy_evaluator is not None:
+                growth_energy_evaluator.set_growth_parameter_index(growth_parameter_value)
 
             # Get internal coordinates if direction is reverse
             if direction == 'reverse':
@@ -486,24 +572,38 @@ class FFAllAngleGeometryEngine(GeometryEngine):
             # Propose a torsion angle and calcualate its log probability
             if direction=='forward':
                 # Note that (r, theta) are dimensionless here
-                phi, logp_phi = self._propose_torsion(context, torsion_atom_indices, new_positions, r, theta, beta, self._n_torsion_divisions, bond, angle)
+                phi, logp_phi = self._propose_torsion(context, growth_torsion_atom_indices, new_positions if growth_subsystem is None else growth_positions, r, theta, beta, self._n_torsion_divisions, bond, angle, energy_evaluator=growth_energy_evaluator)
                 xyz, detJ = self._internal_to_cartesian(new_positions[bond_atom.idx], new_positions[angle_atom.idx], new_positions[torsion_atom.idx], r, theta, phi)
                 new_positions[atom.idx] = xyz
+                if growth_subsystem is not None:
+                    growth_positions[growth_torsion_atom_indices[0]] = xyz
                 _logger.info(f"\tproposing forward torsion of {phi}.")
+            elif use_unitless_positions:
+                # The torsion scan moves the placed atom in place, so only its row needs to be restored afterwards
+                old_positions_for_torsion = old_positions if growth_subsystem is None else growth_positions
+                placed_atom_position = old_positions_for_torsion[growth_torsion_atom_indices[0]].copy()
+                logp_phi = self._torsion_logp(context, growth_torsion_atom_indices, old_positions_for_torsion, r, theta, phi, beta, self._n_torsion_divisions, bond, angle, energy_evaluator=growth_energy_evaluator)
+                old_positions_for_torsion[growth_torsion_atom_indices[0]] = placed_atom_position
             else:
-                old_positions_for_torsion = copy.deepcopy(old_positions)
+                old_positions_for_torsion = copy.deepcopy(old_positions if growth_subsystem is None else growth_positions)
                 # Note that (r, theta, phi) are dimensionless here
-                logp_phi = self._torsion_logp(context, torsion_atom_indices, old_positions_for_torsion, r, theta, phi, beta, self._n_torsion_divisions, bond, angle)
+                logp_phi = self._torsion_logp(context, growth_torsion_atom_indices, old_positions_for_torsion, r, theta, phi, beta, self._n_torsion_divisions, bond, angle, energy_evaluator=growth_energy_evaluator)
             _logger.info(f"\tlogp_phi = {logp_phi}")
 
             # Compute potential energy
-            if direction == 'forward':
-                context.setPositions(new_positions)
+            if growth_subsystem is not None:
+                positions_with_atom = growth_positions
             else:
-                context.setPositions(old_positions)
-
-            state = context.getState(getEnergy=True)
-            reduced_potential_energy = beta*state.getPotentialEnergy()
+                positions_with_atom = new_positions if direction == 'forward' else old_positions
+            if use_valence_energy_kernel:
+                if not use_unitless_positions:
+                    positions_with_atom = positions_with_atom.value_in_unit_system(unit.md_unit_system)
+                potential_energy = growth_energy_evaluator.compute_energy(positions_with_atom) * unit.kilojoules_per_mole
+            else:
+                context.setPositions(positions_with_atom)
+                state = context.getState(getEnergy=True)
+                potential_energy = state.getPotentialEnergy()
+            reduced_potential_energy = beta*potential_energy
             _logger.info(f"\taccumulated growth context reduced energy = {reduced_potential_energy}")
 
             #Compute change in energy from previous reduced potential
@@ -535,64 +635,358 @@ class FFAllAngleGeometryEngine(GeometryEngine):
             atoms_with_positions.append(atom)
             _logger.info(f"\tatom placed, rjmc_info list updated, and growth_parameter_value incremented.")
 
-        # assert that the energy of the new positions is ~= atoms_with_positions_reduced_potential + reduced_potential_energy
-        # The final context is treated in the same way as the atoms_with_positions_context
-        if direction == 'forward': #if the direction is forward, the final system for comparison is top_proposal's new system
-            if not self.use_sterics:
-                final_system = self._define_no_nb_system(top_proposal._new_system, neglected_angle_terms)
-                _logger.info(f"forward final system (new system) defined with {len(neglected_angle_terms)} neglected angles.")
-            else:
-                final_system = copy.deepcopy(top_proposal._new_system)
-                _logger.info("forward final system (new system) defined with nonbonded interactions.")
-            final_context = openmm.Context(final_system, final_system_integrator, platform)
-            final_context.setPositions(new_positions)
-        else: #otherwise (i.e. if the direction is reverse) the final system target is top_proposal's old system
-            if not self.use_sterics:
-                final_system = self._define_no_nb_system(top_proposal._old_system, neglected_angle_terms)
-                _logger.info(f"reverse final system (old system) defined with {len(neglected_angle_terms)} neglected angles.")
-            else:
-                final_system = copy.deepcopy(top_proposal._old_system)
-                _logger.info("reverse final system (old system) defined with nonbonded interactions.")
-            final_context = openmm.Context(final_system, final_system_integrator, platform)
-            final_context.setPositions(old_positions)
-
-        state = final_context.getState(getEnergy=True)
-        final_context_reduced_potential = beta*state.getPotentialEnergy()
-        final_context_components = [(force, energy*beta) for force, energy in compute_potential_components(final_context)]
-        atoms_with_positions_reduced_potential_components = [(force, energy*beta) for force, energy in compute_potential_components(atoms_with_positions_context)]
-        _logger.info(f"reduced potential components before atom placement:")
-        for item in atoms_with_positions_reduced_potential_components:
-            _logger.info(f"\t{item[0]}: {item[1]}")
-        _logger.info(f"reduced energy before atom placement: {atoms_with_positions_reduced_potential}")
-
-        _logger.info(f"reduced potential of final system:")
-        for item in final_context_components:
-            _logger.info(f"\t{item[0]}: {item[1]}")
-        _logger.info(f"final reduced energy {final_context_reduced_potential}")
-
-        _logger.info(f"reduced potential components added:")
-        added_energy_components = [(force, energy*beta) for force, energy in compute_potential_components(context)]
-        for item in added_energy_components:
-            _logger.info(f"\t{item[0]}: {item[1]}")
-        _logger.info(f"total reduced energy added from growth system: {reduced_potential_energy}")
-
-        _logger.info(f"sum of energies: {atoms_with_positions_reduced_potential + reduced_potential_energy}")
-        _logger.info(f"magnitude of difference in the energies: {abs(final_context_reduced_potential - atoms_with_positions_reduced_potential - reduced_potential_energy)}")
-
-        energy_mismatch_ratio = (atoms_with_positions_reduced_potential + reduced_potential_energy) / (final_context_reduced_potential)
-        assert (energy_mismatch_ratio < ENERGY_MISMATCH_RATIO_THRESHOLD + 1) and (energy_mismatch_ratio > 1 - ENERGY_MISMATCH_RATIO_THRESHOLD)  , f"The ratio of the calculated final energy to the true final energy is {energy_mismatch_ratio}"
+        if validate_energy:
+            # assert that the energy of the new positions is ~= atoms_with_positions_reduced_potential + reduced_potential_energy
+            # The final context is treated in the same way as the atoms_with_positions_context
+            if growth_subsystem is not None: #the final system for comparison is the subsystem, with all of its atoms placed
+                from simtk import openmm
+                final_context = openmm.Context(growth_subsystem['system'], growth_subsystem['integrators'][2], growth_subsystem['platform'])
+                final_context.setPositions(growth_positions)
+            elif direction == 'forward': #if the direction is forward, the final system for comparison is top_proposal's new system
+                final_context = self._get_final_context(growth_cache_entry, direction)
+                final_context.setPositions(new_positions)
+            else: #otherwise (i.e. if the direction is reverse) the final system target is top_proposal's old system
+                final_context = self._get_final_context(growth_cache_entry, direction)
+                final_context.setPositions(old_positions)
+
+            state = final_context.getState(getEnergy=True)
+            final_context_reduced_potential = beta*state.getPotentialEnergy()
+            final_context_components = [(force, energy*beta) for force, energy in compute_potential_components(final_context)]
+            atoms_with_positions_reduced_potential_components = [(force, energy*beta) for force, energy in compute_potential_components(atoms_with_positions_context)]
+            _logger.info(f"reduced potential components before atom placement:")
+            for item in atoms_with_positions_reduced_potential_components:
+                _logger.info(f"\t{item[0]}: {item[1]}")
+            _logger.info(f"reduced energy before atom placement: {atoms_with_positions_reduced_potential}")
+
+            _logger.info(f"reduced potential of final system:")
+            for item in final_context_components:
+                _logger.info(f"\t{item[0]}: {item[1]}")
+            _logger.info(f"final reduced energy {final_context_reduced_potential}")
+
+            if context is not None:
+                _logger.info(f"reduced potential components added:")
+                added_energy_components = [(force, energy*beta) for force, energy in compute_potential_components(context)]
+                for item in added_energy_components:
+                    _logger.info(f"\t{item[0]}: {item[1]}")
+            _logger.info(f"total reduced energy added from growth system: {reduced_potential_energy}")
+
+            _logger.info(f"sum of energies: {atoms_with_positions_reduced_potential + reduced_potential_energy}")
+            _logger.info(f"magnitude of difference in the energies: {abs(final_context_reduced_potential - atoms_with_positions_reduced_potential - reduced_potential_energy)}")
+
+            energy_mismatch_ratio = (atoms_with_positions_reduced_potential + reduced_potential_energy) / (final_context_reduced_potential)
+            assert (energy_mismatch_ratio < ENERGY_MISMATCH_RATIO_THRESHOLD + 1) and (energy_mismatch_ratio > 1 - ENERGY_MISMATCH_RATIO_THRESHOLD)  , f"The ratio of the calculated final energy to the true final energy is {energy_mismatch_ratio}"
+        else:
+            # Without validation, the final reduced potential is given by the energy bookkeeping
+            final_context = None
+            final_context_reduced_potential = atoms_with_positions_reduced_potential + reduced_potential_energy
 
         # Final log proposal:
         _logger.info("Final logp_proposal: {}".format(logp_proposal))
-        # Clean up OpenMM Context since garbage collector is sometimes slow
+        # Clean up OpenMM Context since garbage collector is sometimes slow (cached Contexts are kept alive by the cache)
         del context; del atoms_with_positions_context; del final_context
-        del integrator; del atoms_with_positions_system_integrator; del final_system_integrator
+        del growth_cache_entry; del growth_subsystem
+
+        if use_unitless_positions:
+            new_positions = unit.Quantity(new_positions, unit=unit.nanometers) if direction == 'forward' else input_new_positions
 
         check_dimensionality(logp_proposal, float)
         check_dimensionality(new_positions, unit.nanometers)
 
         return logp_proposal, new_positions, rjmc_info, atoms_with_positions_reduced_potential, final_context_reduced_potential, neglected_angle_terms
 
+    def _get_growth_cache_entry(self, top_proposal, torsion_proposal_order, direction):
+        """
+        Retrieve the parmed structure, growth system, and OpenMM Contexts needed to propose atoms for a transformation,
+        creating them if they are not in the growth cache.
+
+        Entries are keyed by the direction, the chemical state keys, the system sizes, the atom map, and the torsion
+        proposal order, so that a proposal that recurs (as in expanded ensemble simulations) only needs to update
+        positions and the growth parameter of existing Contexts.
+
+        Parameters
+        ----------
+        top_proposal : topology_proposal.TopologyProposal object
+            topology proposal containing the relevant information
+        torsion_proposal_order : list of list of 4-int
+            The order in which the torsion indices will be proposed
+        direction : str
+            'forward' (grow the new system) or 'reverse' (grow the old system)
+
+        Returns
+        -------
+        growth_cache_entry : dict
+            Contains 'structure', 'topology', 'system', 'platform', 'use_growth_subsystem', 'growth_system_generator', 'growth_energy_evaluator',
+            'context' (None if the valence energy kernel or a growth subsystem is used), 'atoms_with_positions_context', and 'final_context'
+            (None until it is first needed for energy validation, see _get_final_context). If a growth subsystem is used,
+            'growth_system_generator' and 'atoms_with_positions_context' are None, since they are created with the subsystem
+            of each proposal
+        """
+        key = (direction, top_proposal.old_chemical_state_key, top_proposal.new_chemical_state_key,
+               top_proposal.n_atoms_old, top_proposal.n_atoms_new,
+               tuple(sorted(top_proposal.new_to_old_atom_map.items())),
+               tuple(tuple(torsion) for torsion in torsion_proposal_order))
+        if self._growth_cache is not None:
+            try:
+                growth_cache_entry = self._growth_cache[key]
+                self.growth_cache_hits += 1
+                _logger.info("reusing cached growth system and contexts")
+                return growth_cache_entry
+            except KeyError:
+                pass
+        self.growth_cache_misses += 1
+
+        if direction == 'forward':
+            _logger.info("direction of proposal is forward; creating structure and growth system from new system/topology...")
+            topology, system = top_proposal.new_topology, top_proposal.new_system
+        else:
+            _logger.info("direction of proposal is reverse; creating structure and growth system from old system/topology...")
+            topology, system = top_proposal.old_topology, top_proposal.old_system
+
+        import parmed
+        structure = parmed.openmm.load_topology(topology, system)
+
+        # If the growth system is restricted to a subsystem, it and its Contexts are instead created for each proposal,
+        # so no full-system growth system is built
+        use_growth_subsystem = self.use_sterics and (self.sterics_subsystem_radius is not None)
+        use_valence_energy_kernel = self.use_valence_energy_kernel and (not self.use_sterics)
+        if use_growth_subsystem:
+            growth_system_generator, growth_system, atoms_with_positions_system = None, None, None
+        else:
+            # Create modified System object
+            _logger.info("creating growth system...")
+            growth_system_generator = GeometrySystemGenerator(system, torsion_proposal_order, global_parameter_name='growth_stage', reference_topology=topology, use_sterics=self.use_sterics, neglect_angles = self.neglect_angles)
+            growth_system = growth_system_generator.get_modified_system()
+
+            # Define a system for the core atoms before new atoms are placed
+            atoms_with_positions_system = growth_system_generator._atoms_with_positions_system
+
+        # Parse the growth system once if torsion scans are to be evaluated in batch or without a Context
+        if (self.use_batched_torsion_scan or use_valence_energy_kernel) and (not use_growth_subsystem):
+            growth_energy_evaluator = GrowthSystemEnergyEvaluator(growth_system)
+        else:
+            growth_energy_evaluator = None
+
+        if self.use_sterics:
+            platform_name = 'CPU' # faster when sterics are in use
+        else:
+            platform_name = 'Reference' # faster when only valence terms are in use
+
+        # Create OpenMM contexts
+        from simtk import openmm
+        _logger.info("creating platform, integrators, and contexts")
+        platform = openmm.Platform.getPlatformByName(platform_name)
+        growth_cache_entry = dict()
+        growth_cache_entry['structure'] = structure
+        growth_cache_entry['topology'] = topology
+        growth_cache_entry['system'] = system
+        growth_cache_entry['use_growth_subsystem'] = use_growth_subsystem
+        growth_cache_entry['growth_system_generator'] = growth_system_generator
+        growth_cache_entry['growth_energy_evaluator'] = growth_energy_evaluator
+        growth_cache_entry['integrators'] = [openmm.VerletIntegrator(1*unit.femtoseconds) for index in range(3)]
+        if use_valence_energy_kernel or use_growth_subsystem:
+            growth_cache_entry['context'] = None # growth system energies are computed by growth_energy_evaluator or a subsystem Context
+        else:
+            growth_cache_entry['context'] = openmm.Context(growth_system, growth_cache_entry['integrators'][0], platform)
+        if use_growth_subsystem:
+            growth_cache_entry['atoms_with_positions_context'] = None # the subsystem provides its own
+        else:
+            growth_cache_entry['atoms_with_positions_context'] = openmm.Context(atoms_with_positions_system, growth_cache_entry['integrators'][1], platform)
+        growth_cache_entry['platform'] = platform
+        growth_cache_entry['final_context'] = None # created on first use by _get_final_context
+
+        if self._growth_cache is not None:
+            self._growth_cache[key] = growth_cache_entry
+        return growth_cache_entry
+
+    def _get_final_context(self, growth_cache_entry, direction):
+        """
+        Retrieve the Context of the final system used to check the energy bookkeeping of a proposal, creating it
+        (and storing it in ``growth_cache_entry``) on first use.
+
+        Parameters
+        ----------
+        growth_cache_entry : dict
+            The growth cache entry of the transformation, as returned by _get_growth_cache_entry
+        direction : str
+            'forward' (grow the new system) or 'reverse' (grow the old system)
+
+        Returns
+        -------
+        final_context : simtk.openmm.Context
+            Context of the valence-only system without neglected angles (or of a copy of the full system if use_sterics)
+        """
+        if growth_cache_entry['final_context'] is not None:
+            return growth_cache_entry['final_context']
+
+        system = growth_cache_entry['system']
+        if not self.use_sterics:
+            neglected_angle_terms = growth_cache_entry['growth_system_generator'].neglected_angle_terms
+            final_system = self._define_no_nb_system(system, neglected_angle_terms)
+            _logger.info(f"{direction} final system defined with {len(neglected_angle_terms)} neglected angles.")
+        else:
+            import copy
+            final_system = copy.deepcopy(system)
+            _logger.info(f"{direction} final system defined with nonbonded interactions.")
+
+        from simtk import openmm
+        growth_cache_entry['final_context'] = openmm.Context(final_system, growth_cache_entry['integrators'][2], growth_cache_entry['platform'])
+        return growth_cache_entry['final_context']
+
+    def _create_growth_subsystem(self, system, topology, torsion_proposal_order, positions, box_vectors=None):
+        """
+        Create a growth system and Context over the transforming residue and its surroundings only.
+
+        The subsystem contains every atom of the residues containing atoms to be placed, every atom in the torsion
+        proposal order, and every atom within ``self.sterics_subsystem_radius`` (minimum image) of the residue atoms
+        that already have positions. Atoms keep their relative order, so the local index of an atom is its rank in
+        the (sorted) subsystem atom indices.
+
+        Parameters
+        ----------
+        system : simtk.openmm.System
+            The system in which atoms are being placed
+        topology : simtk.openmm.app.Topology
+            The topology corresponding to ``system``
+        torsion_proposal_order : list of list of 4-int
+            The order in which the torsion indices will be proposed, with system atom indices
+        positions : simtk.unit.Quantity with shape (n_atoms, 3) with units compatible with nanometers, or np.ndarray implicitly in nanometers
+            Positions of the atoms in ``system``; those of atoms that are yet to be placed are ignored
+        box_vectors : list of 3 simtk.unit.Quantity, optional, default=None
+            The current periodic box vectors. If None, the default periodic box vectors of ``system`` are used.
+
+        Returns
+        -------
+        growth_subsystem : dict
+            Contains 'atom_indices' (the system indices of subsystem atoms), 'torsion_proposal_order' (with subsystem
+            indices), 'positions' (a copy of the subsystem positions, in the same form as ``positions``), 'growth_system_generator',
+            'growth_energy_evaluator' (None unless batched torsion scans are used), 'integrators', 'platform', 'context',
+            'atoms_with_positions_context', and 'system' (the subsystem itself, i.e. the final system for energy validation)
+        """
+        from simtk import openmm
+        atoms = list(topology.atoms())
+        growth_indices = [torsion[0] for torsion in torsion_proposal_order]
+        residues = set(atoms[index].residue for index in growth_indices)
+        residue_indices = [atom.index for residue in residues for atom in residue.atoms()]
+        torsion_indices = [index for torsion in torsion_proposal_order for index in torsion]
+        anchor_indices = sorted(set(residue_indices + torsion_indices) - set(growth_indices))
+
+        # Select atoms within the cutoff radius of any positioned residue atom
+        xyz = np.array(positions.value_in_unit_system(unit.md_unit_system) if unit.is_quantity(positions) else positions)
+        radius = self.sterics_subsystem_radius.value_in_unit_system(unit.md_unit_system)
+        if box_vectors is None:
+            box_vectors = system.getDefaultPeriodicBoxVectors()
+        periodic_box_vectors = None
+        if system.usesPeriodicBoundaryConditions():
+            periodic_box_vectors = np.array([vector.value_in_unit_system(unit.md_unit_system) for vector in box_vectors])
+        is_selected = np.zeros(len(xyz), dtype=bool)
+        is_selected[residue_indices + torsion_indices] = True
+        for anchor_index in anchor_indices:
+            delta = xyz - xyz[anchor_index]
+            if periodic_box_vectors is not None:
+                # Minimum image convention for (possibly triclinic) reduced-form box vectors, as in OpenMM
+                for axis in [2, 1, 0]:
+                    delta -= periodic_box_vectors[axis] * np.round(delta[:, axis:axis+1] / periodic_box_vectors[axis][axis])
+            is_selected |= np.sum(delta**2, axis=1) <= radius**2
+        atom_indices = np.flatnonzero(is_selected)
+        _logger.info(f"growth subsystem contains {len(atom_indices)} of {len(xyz)} atoms")
+
+        global_to_local = -np.ones(len(xyz), dtype=int)
+        global_to_local[atom_indices] = np.arange(len(atom_indices))
+        local_torsion_proposal_order = [[int(global_to_local[index]) for index in torsion] for torsion in torsion_proposal_order]
+
+        subsystem = self._extract_subsystem(system, atom_indices)
+        subsystem.setDefaultPeriodicBoxVectors(*box_vectors)
+        growth_system_generator = GeometrySystemGenerator(subsystem, local_torsion_proposal_order, global_parameter_name='growth_stage', use_sterics=self.use_sterics, neglect_angles=self.neglect_angles)
+        growth_system = growth_system_generator.get_modified_system()
+
+        growth_subsystem = dict()
+        growth_subsystem['atom_indices'] = atom_indices
+        growth_subsystem['torsion_proposal_order'] = local_torsion_proposal_order
+        growth_subsystem['positions'] = unit.Quantity(xyz[atom_indices], unit=unit.nanometers) if unit.is_quantity(positions) else xyz[atom_indices]
+        growth_subsystem['growth_system_generator'] = growth_system_generator
+        growth_subsystem['growth_energy_evaluator'] = GrowthSystemEnergyEvaluator(growth_system) if self.use_batched_torsion_scan else None
+        growth_subsystem['integrators'] = [openmm.VerletIntegrator(1*unit.femtoseconds) for index in range(3)]
+        platform = openmm.Platform.getPlatformByName('CPU')
+        growth_subsystem['context'] = openmm.Context(growth_system, growth_subsystem['integrators'][0], platform)
+        growth_subsystem['atoms_with_positions_context'] = openmm.Context(growth_system_generator._atoms_with_positions_system, growth_subsystem['integrators'][1], platform)
+        growth_subsystem['system'] = subsystem
+        growth_subsystem['platform'] = platform
+        return growth_subsystem
+
+    def _extract_subsystem(self, system, atom_indices):
+        """
+        Extract the valence and nonbonded interactions among a subset of atoms into a new System.
+
+        Only the forces used by GeometrySystemGenerator (HarmonicBondForce, HarmonicAngleForce, PeriodicTorsionForce,
+        and NonbondedForce) are copied; terms involving any atom outside the subset are dropped.
+
+        Parameters
+        ----------
+        system : simtk.openmm.System
+            The full system
+        atom_indices : np.ndarray of int
+            Sorted indices of the atoms in the subset
+
+        Returns
+        -------
+        subsystem : simtk.openmm.System
+            System whose particle i corresponds to particle atom_indices[i] of ``system``
+        """
+        from simtk import openmm
+        global_to_local = -np.ones(system.getNumParticles(), dtype=int)
+        global_to_local[atom_indices] = np.arange(len(atom_indices))
+        def local(particles):
+            # Local indices of the particles, or None if any lies outside the subset
+            indices = [int(global_to_local[particle]) for particle in particles]
+            return None if min(indices) < 0 else indices
+
+        subsystem = openmm.System()
+        subsystem.setDefaultPeriodicBoxVectors(*system.getDefaultPeriodicBoxVectors())
+        for index in atom_indices:
+            subsystem.addParticle(system.getParticleMass(int(index)))
+
+        for force in system.getForces():
+            force_name = force.__class__.__name__
+            if force_name == 'HarmonicBondForce':
+                subsystem_force = openmm.HarmonicBondForce()
+                for bond_index in range(force.getNumBonds()):
+                    p1, p2, r0, K = force.getBondParameters(bond_index)
+                    particles = local([p1, p2])
+                    if particles is not None:
+                        subsystem_force.addBond(*particles, r0, K)
+            elif force_name == 'HarmonicAngleForce':
+                subsystem_force = openmm.HarmonicAngleForce()
+                for angle_index in range(force.getNumAngles()):
+                    p1, p2, p3, theta0, K = force.getAngleParameters(angle_index)
+                    particles = local([p1, p2, p3])
+                    if particles is not None:
+                        subsystem_force.addAngle(*particles, theta0, K)
+            elif force_name == 'PeriodicTorsionForce':
+                subsystem_force = openmm.PeriodicTorsionForce()
+                for torsion_index in range(force.getNumTorsions()):
+                    p1, p2, p3, p4, periodicity, phase, k = force.getTorsionParameters(torsion_index)
+                    particles = local([p1, p2, p3, p4])
+                    if particles is not None:
+                        subsystem_force.addTorsion(*particles, periodicity, phase, k)
+            elif force_name == 'NonbondedForce':
+                subsystem_force = openmm.NonbondedForce()
+                subsystem_force.setNonbondedMethod(force.getNonbondedMethod())
+                subsystem_force.setCutoffDistance(force.getCutoffDistance())
+                subsystem_force.setUseSwitchingFunction(force.getUseSwitchingFunction())
+                subsystem_force.setSwitchingDistance(force.getSwitchingDistance())
+                for index in atom_indices:
+                    subsystem_force.addParticle(*force.getParticleParameters(int(index)))
+                for exception_index in range(force.getNumExceptions()):
+                    p1, p2, chargeprod, sigma, epsilon = force.getExceptionParameters(exception_index)
+                    particles = local([p1, p2])
+                    if particles is not None:
+                        subsystem_force.addException(*particles, chargeprod, sigma, epsilon)
+            else:
+                continue
+            subsystem.addForce(subsystem_force)
+
+        return subsystem
+
     @staticmethod
     def _oemol_from_residue(res, verbose=True):
         """
@@ -722,19 +1116,25 @@ class FFAllAngleGeometryEngine(GeometryEngine):
             parmed Atom objects denoting atoms that currently have positions
         top_proposal : topology_proposal.TopologyProposal
             topology proposal object
-        current_positions : simtk.unit.Quantity with shape (n_atoms, 3) with units compatible with nanometers
+        current_positions : simtk.unit.Quantity with shape (n_atoms, 3) with units compatible with nanometers, or np.ndarray implicitly in nanometers
             Positions of the current system
 
         Returns
         -------
         new_positions : simtk.unit.Quantity with shape (n_atoms, 3) with units compatible with nanometers
             New positions for new topology object with known positions filled in
+            (an np.ndarray implicitly in nanometers if current_positions is an np.ndarray)
         """
-        check_dimensionality(current_positions, unit.nanometers)
-
         # Create new positions
         new_shape = [top_proposal.n_atoms_new, 3]
         # Workaround for CustomAngleForce NaNs: Create random non-zero positions for new atoms.
+        if not unit.is_quantity(current_positions):
+            new_positions = np.random.random(new_shape)
+            new_indices = [atom.idx for atom in atoms_with_positions]
+            new_positions[new_indices] = current_positions[[top_proposal.new_to_old_atom_map[index] for index in new_indices]]
+            return new_positions
+
+        check_dimensionality(current_positions, unit.nanometers)
         new_positions = unit.Quantity(np.random.random(new_shape), unit=unit.nanometers)
 
         # Copy positions for atoms that have them defined
@@ -972,6 +1372,8 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         """
         Cartesian to internal coordinate conversion
 
+        Positions may also be given as plain numpy arrays, in which case they are assumed to be in nanometers.
+
         Parameters
         ----------
         atom_position : simtk.unit.Quantity wrapped numpy array of shape (natoms,) with units compatible with nanometers
@@ -1000,19 +1402,16 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         """
         # TODO: _cartesian_to_internal and _internal_to_cartesian should accept/return units and have matched APIs
 
-        check_dimensionality(atom_position, unit.nanometers)
-        check_dimensionality(bond_position, unit.nanometers)
-        check_dimensionality(angle_position, unit.nanometers)
-        check_dimensionality(torsion_position, unit.nanometers)
+        positions = [atom_position, bond_position, angle_position, torsion_position]
+        if unit.is_quantity(atom_position):
+            for position in positions:
+                check_dimensionality(position, unit.nanometers)
+            positions = [position.value_in_unit(unit.nanometers) for position in positions]
 
         # Convert to internal coordinates once everything is dimensionless
         # Make sure positions are float64 arrays implicitly in units of nanometers for numba
         from perses.rjmc import coordinate_numba
-        internal_coords = coordinate_numba.cartesian_to_internal(
-            atom_position.value_in_unit(unit.nanometers).astype(np.float64),
-            bond_position.value_in_unit(unit.nanometers).astype(np.float64),
-            angle_position.value_in_unit(unit.nanometers).astype(np.float64),
-            torsion_position.value_in_unit(unit.nanometers).astype(np.float64))
+        internal_coords = coordinate_numba.cartesian_to_internal(*[np.asarray(position, dtype=np.float64) for position in positions])
         # Return values are also in floating point implicitly in nanometers and radians
         r, theta, phi = internal_coords
 
@@ -1031,6 +1430,8 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         Calculate the cartesian coordinates of a newly placed atom in terms of internal coordinates,
         along with the absolute value of the determinant of the Jacobian.
 
+        If the positions are given as plain numpy arrays (implicitly in nanometers), xyz is returned as a plain numpy array as well.
+
         Parameters
         ----------
         bond_position : simtk.unit.Quantity wrapped numpy array of shape (natoms,) with units compatible with nanometers
@@ -1057,9 +1458,12 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         """
         # TODO: _cartesian_to_internal and _internal_to_cartesian should accept/return units and have matched APIs
 
-        check_dimensionality(bond_position, unit.nanometers)
-        check_dimensionality(angle_position, unit.nanometers)
-        check_dimensionality(torsion_position, unit.nanometers)
+        positions = [bond_position, angle_position, torsion_position]
+        has_units = unit.is_quantity(bond_position)
+        if has_units:
+            for position in positions:
+                check_dimensionality(position, unit.nanometers)
+            positions = [position.value_in_unit(unit.nanometers) for position in positions]
         check_dimensionality(r, float)
         check_dimensionality(theta, float)
         check_dimensionality(phi, float)
@@ -1067,18 +1471,15 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         # Compute Cartesian coordinates from internal coordinates using all-dimensionless quantities
         # All inputs to numba must be in float64 arrays implicitly in md_unit_syste units of nanometers and radians
         from perses.rjmc import coordinate_numba
-        xyz = coordinate_numba.internal_to_cartesian(
-            bond_position.value_in_unit(unit.nanometers).astype(np.float64),
-            angle_position.value_in_unit(unit.nanometers).astype(np.float64),
-            torsion_position.value_in_unit(unit.nanometers).astype(np.float64),
-            np.array([r, theta, phi], np.float64))
-        # Transform position of new atom back into unit-bearing Quantity
-        xyz = unit.Quantity(xyz, unit=unit.nanometers)
+        xyz = coordinate_numba.internal_to_cartesian(*[np.asarray(position, dtype=np.float64) for position in positions], np.array([r, theta, phi], np.float64))
 
         # Compute abs det Jacobian using unitless values
         detJ = np.abs(r**2*np.sin(theta))
 
-        check_dimensionality(xyz, unit.nanometers)
+        if has_units:
+            # Transform position of new atom back into unit-bearing Quantity
+            xyz = unit.Quantity(xyz, unit=unit.nanometers)
+            check_dimensionality(xyz, unit.nanometers)
         check_dimensionality(detJ, float)
         return xyz, detJ
 
@@ -1113,23 +1514,52 @@ class FFAllAngleGeometryEngine(GeometryEngine):
 
         """
         # TODO: Overhaul this method to accept and return unit-bearing quantities
-        # TODO: We end up computing the discretized PMF over and over again; we can speed this up by caching
         # TODO: Switch from simple discrete quadrature to more sophisticated computation of pdf
 
+        r_i, log_p_i, bin_width, cdf_i = self._bond_pmf_table(bond, beta, n_divisions)
+        return r_i, log_p_i, bin_width
+
+    def _bond_pmf_table(self, bond, beta, n_divisions):
+        """
+        Retrieve the (memoized) discretized bond PMF table, including the cumulative distribution.
+
+        Parameters
+        ----------
+        bond : parmed.Structure.Bond modified to use simtk.unit.Quantity
+            Valence bond parameters
+        beta : simtk.unit.Quantity with units compatible with 1/kilojoules_per_mole
+            Inverse thermal energy
+        n_divisions : int
+            Number of quandrature points for drawing bond length
+
+        Returns
+        -------
+        r_i : np.ndarray of shape (n_divisions,) implicitly in units of nanometers
+            Bond length leftmost bin edges
+        log_p_i : np.ndarray of shape (n_divisions,)
+            Log probability mass of each bin
+        bin_width : float implicitly in units of nanometers
+            The bin width for individual PMF bins
+        cdf_i : np.ndarray of shape (n_divisions,)
+            Normalized cumulative probability mass, with cdf_i[-1] == 1
+        """
         # Check input argument dimensions
         assert check_dimensionality(bond.type.req, unit.angstroms)
         assert check_dimensionality(bond.type.k, unit.kilojoules_per_mole/unit.nanometers**2)
         assert check_dimensionality(beta, unit.kilojoules_per_mole**(-1))
 
-        # Retrieve relevant quantities for valence bond
-        r0 = bond.type.req # equilibrium bond distance, unit-bearing quantity
-        k = bond.type.k * self._bond_softening_constant # force constant, unit-bearing quantity
-        sigma_r = unit.sqrt((1.0/(beta*k))) # standard deviation, unit-bearing quantity
-
         # Convert to dimensionless quantities in MD unit system
-        r0 = r0.value_in_unit_system(unit.md_unit_system)
-        k = k.value_in_unit_system(unit.md_unit_system)
-        sigma_r = sigma_r.value_in_unit_system(unit.md_unit_system)
+        r0 = bond.type.req.value_in_unit_system(unit.md_unit_system) # equilibrium bond distance
+        k = bond.type.k.value_in_unit_system(unit.md_unit_system) # unsoftened force constant
+        beta = beta.value_in_unit_system(unit.md_unit_system)
+
+        key = ('bond', r0, k, beta, n_divisions, self._bond_softening_constant)
+        table = self._get_cached_pmf_table(key)
+        if table is not None:
+            return table
+
+        k = k * self._bond_softening_constant # force constant
+        sigma_r = np.sqrt(1.0/(beta*k)) # standard deviation
 
         # Determine integration bounds
         lower_bound, upper_bound = max(0., r0 - 6*sigma_r), (r0 + 6*sigma_r)
@@ -1146,7 +1576,38 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         check_dimensionality(log_p_i, float)
         check_dimensionality(bin_width, float)
 
-        return r_i, log_p_i, bin_width
+        return self._store_pmf_table(key, r_i, log_p_i, bin_width)
+
+    def _get_cached_pmf_table(self, key):
+        """
+        Return the cached PMF table for ``key`` (or None), updating the hit/miss counters.
+        """
+        if self._pmf_cache is not None:
+            try:
+                table = self._pmf_cache[key]
+                self.pmf_cache_hits += 1
+                return table
+            except KeyError:
+                pass
+        self.pmf_cache_misses += 1
+        return None
+
+    def _store_pmf_table(self, key, x_i, log_p_i, bin_width):
+        """
+        Compute the cumulative distribution for a discretized PMF and store the (read-only) table in the cache.
+
+        Returns
+        -------
+        table : tuple of (x_i, log_p_i, bin_width, cdf_i)
+        """
+        cdf_i = np.cumsum(np.exp(log_p_i))
+        cdf_i /= cdf_i[-1]
+        for array in (x_i, log_p_i, cdf_i):
+            array.setflags(write=False)
+        table = (x_i, log_p_i, bin_width, cdf_i)
+        if self._pmf_cache is not None:
+            self._pmf_cache[key] = table
+        return table
 
     def _bond_logp(self, r, bond, beta, n_divisions):
         """
@@ -1178,6 +1639,9 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         check_dimensionality(r, float)
         check_dimensionality(beta, 1/unit.kilojoules_per_mole)
 
+        if self._bond_angle_sampling == 'analytic':
+            return self._bond_logp_analytic(r, bond, beta)
+
         r_i, log_p_i, bin_width = self._bond_log_pmf(bond, beta, n_divisions)
 
         if (r < r_i[0]) or (r >= r_i[-1] + bin_width):
@@ -1222,10 +1686,13 @@ class FFAllAngleGeometryEngine(GeometryEngine):
 
         check_dimensionality(beta, 1/unit.kilojoules_per_mole)
 
-        r_i, log_p_i, bin_width = self._bond_log_pmf(bond, beta, n_divisions)
+        if self._bond_angle_sampling == 'analytic':
+            return self._propose_bond_analytic(bond, beta)
+
+        r_i, log_p_i, bin_width, cdf_i = self._bond_pmf_table(bond, beta, n_divisions)
 
-        # Draw an index
-        index = np.random.choice(range(n_divisions), p=np.exp(log_p_i))
+        # Draw an index by inverting the tabulated cumulative distribution
+        index = int(np.searchsorted(cdf_i, np.random.random_sample(), side='right'))
         r = r_i[index]
 
         # Draw uniformly in that bin
@@ -1268,22 +1735,50 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         # TODO: Overhaul this method to accept unit-bearing quantities
         # TODO: Switch from simple discrete quadrature to more sophisticated computation of pdf
 
-        # TODO: We end up computing the discretized PMF over and over again; we can speed this up by caching
+        theta_i, log_p_i, bin_width, cdf_i = self._angle_pmf_table(angle, beta, n_divisions)
+        return theta_i, log_p_i, bin_width
+
+    def _angle_pmf_table(self, angle, beta, n_divisions):
+        """
+        Retrieve the (memoized) discretized angle PMF table, including the cumulative distribution.
+
+        Parameters
+        ----------
+        angle : parmed.Structure.Angle modified to use simtk.unit.Quantity
+            Valence angle parameters
+        beta : simtk.unit.Quantity with units compatible with 1/kilojoules_per_mole
+            Inverse thermal energy
+        n_divisions : int
+            Number of quandrature points for drawing angle
 
+        Returns
+        -------
+        theta_i : np.ndarray of shape (n_divisions,) implicitly in units of radians
+            Angle leftmost bin edges
+        log_p_i : np.ndarray of shape (n_divisions,)
+            Log probability mass of each bin
+        bin_width : float implicitly in units of radians
+            The bin width for individual PMF bins
+        cdf_i : np.ndarray of shape (n_divisions,)
+            Normalized cumulative probability mass, with cdf_i[-1] == 1
+        """
         # Check input argument dimensions
         assert check_dimensionality(angle.type.theteq, unit.radians)
         assert check_dimensionality(angle.type.k, unit.kilojoules_per_mole/unit.radians**2)
         assert check_dimensionality(beta, unit.kilojoules_per_mole**(-1))
 
-        # Retrieve relevant quantities for valence angle
-        theta0 = angle.type.theteq
-        k = angle.type.k * self._angle_softening_constant
-        sigma_theta = unit.sqrt(1.0/(beta * k)) # standard deviation, unit-bearing quantity
-
         # Convert to dimensionless quantities in MD unit system
-        theta0 = theta0.value_in_unit_system(unit.md_unit_system)
-        k = k.value_in_unit_system(unit.md_unit_system)
-        sigma_theta = sigma_theta.value_in_unit_system(unit.md_unit_system)
+        theta0 = angle.type.theteq.value_in_unit_system(unit.md_unit_system)
+        k = angle.type.k.value_in_unit_system(unit.md_unit_system) # unsoftened force constant
+        beta = beta.value_in_unit_system(unit.md_unit_system)
+
+        key = ('angle', theta0, k, beta, n_divisions, self._angle_softening_constant)
+        table = self._get_cached_pmf_table(key)
+        if table is not None:
+            return table
+
+        k = k * self._angle_softening_constant
+        sigma_theta = np.sqrt(1.0/(beta * k)) # standard deviation
 
         # Determine integration bounds
         # We can't compute log(0) so we have to avoid sin(theta) = 0 near theta = {0, pi}
@@ -1302,7 +1797,7 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         check_dimensionality(log_p_i, float)
         check_dimensionality(bin_width, float)
 
-        return theta_i, log_p_i, bin_width
+        return self._store_pmf_table(key, theta_i, log_p_i, bin_width)
 
     def _angle_logp(self, theta, angle, beta, n_divisions):
         """
@@ -1334,6 +1829,9 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         check_dimensionality(theta, float)
         check_dimensionality(beta, 1/unit.kilojoules_per_mole)
 
+        if self._bond_angle_sampling == 'analytic':
+            return self._angle_logp_analytic(theta, angle, beta)
+
         theta_i, log_p_i, bin_width = self._angle_log_pmf(angle, beta, n_divisions)
 
         if (theta < theta_i[0]) or (theta >= theta_i[-1] + bin_width):
@@ -1378,10 +1876,13 @@ class FFAllAngleGeometryEngine(GeometryEngine):
 
         check_dimensionality(beta, 1/unit.kilojoules_per_mole)
 
-        theta_i, log_p_i, bin_width = self._angle_log_pmf(angle, beta, n_divisions)
+        if self._bond_angle_sampling == 'analytic':
+            return self._propose_angle_analytic(angle, beta)
+
+        theta_i, log_p_i, bin_width, cdf_i = self._angle_pmf_table(angle, beta, n_divisions)
 
-        # Draw an index
-        index = np.random.choice(range(n_divisions), p=np.exp(log_p_i))
+        # Draw an index by inverting the tabulated cumulative distribution
+        index = int(np.searchsorted(cdf_i, np.random.random_sample(), side='right'))
         theta = theta_i[index]
 
         # Draw uniformly in that bin
@@ -1391,6 +1892,142 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         assert check_dimensionality(theta, float)
         return theta
 
+    def _bond_density_parameters(self, bond, beta):
+        """
+        Retrieve the (memoized) parameters of the continuous bond length density
+
+        .. math ::
+
+            p(r; \beta, K_r, r_0) = Z^{-1} r^2 e^{-\frac{\beta K_r}{2} (r - r_0)^2 }, \quad r > 0
+
+        Returns
+        -------
+        r0 : float
+            Equilibrium bond length, implicitly in nanometers
+        sigma_r : float
+            Standard deviation of the Gaussian factor, implicitly in nanometers
+        r_mode : float
+            Mode of the density, implicitly in nanometers
+        log_Z : float
+            Log normalizing constant of the density
+        """
+        assert check_dimensionality(bond.type.req, unit.angstroms)
+        assert check_dimensionality(bond.type.k, unit.kilojoules_per_mole/unit.nanometers**2)
+        assert check_dimensionality(beta, unit.kilojoules_per_mole**(-1))
+
+        r0 = bond.type.req.value_in_unit_system(unit.md_unit_system)
+        k = bond.type.k.value_in_unit_system(unit.md_unit_system)
+        beta = beta.value_in_unit_system(unit.md_unit_system)
+
+        key = ('bond_density', r0, k, beta, self._bond_softening_constant)
+        parameters = self._get_cached_pmf_table(key)
+        if parameters is not None:
+            return parameters
+
+        sigma_r = np.sqrt(1.0/(beta * k * self._bond_softening_constant))
+
+        # Z = \int_0^\infty r^2 N(r; r0, sigma_r) dr * sqrt(2 pi) sigma_r, using the second moment of a truncated Gaussian
+        from scipy.special import ndtr
+        a = r0 / sigma_r
+        Z = np.sqrt(2*np.pi) * sigma_r * ((r0**2 + sigma_r**2)*ndtr(a) + r0*sigma_r*np.exp(-0.5*a**2)/np.sqrt(2*np.pi))
+        r_mode = 0.5*(r0 + np.sqrt(r0**2 + 8*sigma_r**2))
+
+        parameters = (r0, sigma_r, r_mode, np.log(Z))
+        if self._pmf_cache is not None:
+            self._pmf_cache[key] = parameters
+        return parameters
+
+    def _bond_logp_analytic(self, r, bond, beta):
+        """
+        Calculate the exact log probability density of bond length r (implicitly in nanometers).
+        """
+        r0, sigma_r, r_mode, log_Z = self._bond_density_parameters(bond, beta)
+        if r <= 0.0:
+            return LOG_ZERO
+        return 2*np.log(r) - 0.5*((r - r0)/sigma_r)**2 - log_Z
+
+    def _propose_bond_analytic(self, bond, beta):
+        """
+        Draw a dimensionless bond length r (implicitly in nanometers) from its continuous density by rejection sampling.
+
+        The proposal is a Gaussian with width sigma_r centered at the mode of the density, for which the
+        ratio of target to proposal is maximal at the mode; the acceptance rate approaches 1 when sigma_r << r0.
+        """
+        r0, sigma_r, r_mode, log_Z = self._bond_density_parameters(bond, beta)
+        while True:
+            r = np.random.normal(r_mode, sigma_r)
+            if r <= 0.0:
+                continue
+            log_acceptance = 2*np.log(r/r_mode) + (r0 - r_mode)*(2*r - r0 - r_mode)/(2*sigma_r**2) + (r_mode - r0)**2/(2*sigma_r**2)
+            if np.log(np.random.random_sample()) < log_acceptance:
+                return r
+
+    def _angle_density_parameters(self, angle, beta):
+        """
+        Retrieve the (memoized) parameters of the continuous angle density
+
+        .. math ::
+
+            p(\theta; \beta, K_\theta, \theta_0) = Z^{-1} \sin(\theta) e^{-\frac{\beta K_\theta}{2} (\theta - \theta_0)^2 }, \quad 0 < \theta < \pi
+
+        Returns
+        -------
+        theta0 : float
+            Equilibrium angle, implicitly in radians
+        sigma_theta : float
+            Standard deviation of the Gaussian factor, implicitly in radians
+        log_Z : float
+            Log normalizing constant of the density
+        """
+        assert check_dimensionality(angle.type.theteq, unit.radians)
+        assert check_dimensionality(angle.type.k, unit.kilojoules_per_mole/unit.radians**2)
+        assert check_dimensionality(beta, unit.kilojoules_per_mole**(-1))
+
+        theta0 = angle.type.theteq.value_in_unit_system(unit.md_unit_system)
+        k = angle.type.k.value_in_unit_system(unit.md_unit_system)
+        beta = beta.value_in_unit_system(unit.md_unit_system)
+
+        key = ('angle_density', theta0, k, beta, self._angle_softening_constant)
+        parameters = self._get_cached_pmf_table(key)
+        if parameters is not None:
+            return parameters
+
+        sigma_theta = np.sqrt(1.0/(beta * k * self._angle_softening_constant))
+
+        # Z = Im \int_0^\pi e^{i theta} e^{-(theta - theta0)^2 / (2 sigma^2)} dtheta, evaluated with the complex error function
+        from scipy.special import erf
+        def Phi(z):
+            return 0.5*(1.0 + erf(z/np.sqrt(2.0)))
+        lower, upper = -theta0/sigma_theta, (np.pi - theta0)/sigma_theta
+        Z = np.sqrt(2*np.pi) * sigma_theta * np.exp(-0.5*sigma_theta**2) * np.imag(np.exp(1j*theta0) * (Phi(upper - 1j*sigma_theta) - Phi(lower - 1j*sigma_theta)))
+
+        parameters = (theta0, sigma_theta, np.log(Z))
+        if self._pmf_cache is not None:
+            self._pmf_cache[key] = parameters
+        return parameters
+
+    def _angle_logp_analytic(self, theta, angle, beta):
+        """
+        Calculate the exact log probability density of angle theta (implicitly in radians).
+        """
+        theta0, sigma_theta, log_Z = self._angle_density_parameters(angle, beta)
+        if (theta <= 0.0) or (theta >= np.pi):
+            return LOG_ZERO
+        return np.log(np.sin(theta)) - 0.5*((theta - theta0)/sigma_theta)**2 - log_Z
+
+    def _propose_angle_analytic(self, angle, beta):
+        """
+        Draw a dimensionless angle theta (implicitly in radians) from its continuous density by rejection sampling,
+        using a Gaussian proposal truncated to (0, pi) and accepting with probability sin(theta).
+        """
+        theta0, sigma_theta, log_Z = self._angle_density_parameters(angle, beta)
+        while True:
+            theta = np.random.normal(theta0, sigma_theta)
+            if (theta <= 0.0) or (theta >= np.pi):
+                continue
+            if np.random.random_sample() < np.sin(theta):
+                return theta
+
     def _torsion_scan(self, torsion_atom_indices, positions, r, theta, n_divisions):
         """
         Compute unit-bearing Carteisan positions and torsions (dimensionless, in md_unit_system) for a torsion scan
@@ -1399,7 +2036,7 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         ----------
         torsion_atom_indices : int tuple of shape (4,)
             Atom indices defining torsion, where torsion_atom_indices[0] is the atom to be driven
-        positions : simtk.unit.Quantity of shape (natoms,3) with units compatible with nanometers
+        positions : simtk.unit.Quantity of shape (natoms,3) with units compatible with nanometers, or np.ndarray implicitly in nanometers
             Positions of the atoms in the system
         r : float (implicitly in md_unit_system)
             Dimensionless bond length (must be in nanometers)
@@ -1421,16 +2058,14 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         # TODO: Overhaul this method to accept and return unit-bearing quantities
         # TODO: Switch from simple discrete quadrature to more sophisticated computation of pdf
 
-        assert check_dimensionality(positions, unit.angstroms)
+        if unit.is_quantity(positions):
+            assert check_dimensionality(positions, unit.angstroms)
+            positions = positions.value_in_unit(unit.nanometers)
         assert check_dimensionality(r, float)
         assert check_dimensionality(theta, float)
 
-        # Compute dimensionless positions in md_unit_system as numba-friendly float64
-        length_unit = unit.nanometers
-        import copy
-        positions_copy = copy.deepcopy(positions)
-        positions_copy = positions_copy.value_in_unit(length_unit).astype(np.float64)
-        atom_positions, bond_positions, angle_positions, torsion_positions = [ positions_copy[index] for index in torsion_atom_indices ]
+        # Compute dimensionless positions in md_unit_system as numba-friendly float64 (only the torsion atoms are needed)
+        atom_positions, bond_positions, angle_positions, torsion_positions = [ np.array(positions[index], dtype=np.float64) for index in torsion_atom_indices ]
 
         # Compute dimensionless torsion values for torsion scan
         phis, bin_width = np.linspace(-np.pi, +np.pi, num=n_divisions, retstep=True, endpoint=False)
@@ -1448,7 +2083,7 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         check_dimensionality(phis, float)
         return xyzs_quantity, phis, bin_width
 
-    def _torsion_log_pmf(self, growth_context, torsion_atom_indices, positions, r, theta, beta, n_divisions, bond, angle):
+    def _torsion_log_pmf(self, growth_context, torsion_atom_indices, positions, r, theta, beta, n_divisions, bond, angle, energy_evaluator=None):
         """
         Calculate the torsion log probability using OpenMM, including all energetic contributions for the atom being driven
 
@@ -1457,11 +2092,11 @@ class FFAllAngleGeometryEngine(GeometryEngine):
 
         Parameters
         ----------
-        growth_context : simtk.openmm.Context
-            Context containing the modified system
+        growth_context : simtk.openmm.Context or None
+            Context containing the modified system, or None if ``energy_evaluator`` is used without a Context
         torsion_atom_indices : int tuple of shape (4,)
             Atom indices defining torsion, where torsion_atom_indices[0] is the atom to be driven
-        positions : simtk.unit.Quantity with shape (natoms,3) with units compatible with nanometers
+        positions : simtk.unit.Quantity with shape (natoms,3) with units compatible with nanometers, or np.ndarray implicitly in nanometers
             Positions of the atoms in the system
         r : float (implicitly in nanometers)
             Dimensionless bond length (must be in nanometers)
@@ -1471,6 +2106,8 @@ class FFAllAngleGeometryEngine(GeometryEngine):
             Inverse thermal energy
         n_divisions : int
             Number of divisions for the torsion scan
+        energy_evaluator : GrowthSystemEnergyEvaluator, optional, default=None
+            If specified, all torsion bins are scored in a single vectorized pass (see ``_torsion_log_pmf``)
 
         Returns
         -------
@@ -1490,7 +2127,8 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         # TODO: Overhaul this method to accept and return unit-bearing quantities
         # TODO: Switch from simple discrete quadrature to more sophisticated computation of pdf
 
-        check_dimensionality(positions, unit.angstroms)
+        if unit.is_quantity(positions):
+            check_dimensionality(positions, unit.angstroms)
         check_dimensionality(r, float)
         check_dimensionality(theta, float)
         check_dimensionality(beta, 1.0 / unit.kilojoules_per_mole)
@@ -1500,20 +2138,40 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         atom_idx = torsion_atom_indices[0]
         xyzs, phis, bin_width = self._torsion_scan(torsion_atom_indices, positions, r, theta, n_divisions)
         xyzs = xyzs.value_in_unit_system(unit.md_unit_system) # make positions dimensionless again
-        positions = positions.value_in_unit_system(unit.md_unit_system)
-
-        for i, xyz in enumerate(xyzs):
-            # Set positions
-            positions[atom_idx,:] = xyz
-            growth_context.setPositions(positions)
+        if unit.is_quantity(positions):
+            positions = positions.value_in_unit_system(unit.md_unit_system)
+
+        if energy_evaluator is not None:
+            # Evaluate the full growth system energy once, with the atom placed in the first torsion bin
+            positions[atom_idx,:] = xyzs[0]
+            if growth_context is not None:
+                growth_context.setPositions(positions)
+                state = growth_context.getState(getEnergy=True)
+                potential_energy = state.getPotentialEnergy().value_in_unit_system(unit.md_unit_system)
+                growth_index = growth_context.getParameter(energy_evaluator.growth_parameter_name)
+                box_vectors = state.getPeriodicBoxVectors(asNumpy=True).value_in_unit_system(unit.md_unit_system)
+            else:
+                # Valence-only growth systems can be evaluated entirely without a Context
+                growth_index, box_vectors = energy_evaluator.current_growth_index, None
+                potential_energy = energy_evaluator.compute_energy(positions, growth_index)
+
+            # Only the terms involving the driven atom change between bins; evaluate them for all bins at once
+            atom_energies = energy_evaluator.compute_atom_energies(atom_idx, growth_index, positions, xyzs, box_vectors=box_vectors)
+            potential_energies = potential_energy + (atom_energies - atom_energies[0])
+            logq = -beta.value_in_unit_system(unit.md_unit_system) * potential_energies
+        else:
+            for i, xyz in enumerate(xyzs):
+                # Set positions
+                positions[atom_idx,:] = xyz
+                growth_context.setPositions(positions)
 
-            # Compute potential energy
-            state = growth_context.getState(getEnergy=True)
-            potential_energy = state.getPotentialEnergy()
+                # Compute potential energy
+                state = growth_context.getState(getEnergy=True)
+                potential_energy = state.getPotentialEnergy()
 
-            # Store unnormalized log probabilities
-            logq_i = -beta*potential_energy
-            logq[i] = logq_i
+                # Store unnormalized log probabilities
+                logq_i = -beta*potential_energy
+                logq[i] = logq_i
 
         # It's OK to have a few torsions with NaN energies,
         # but we need at least _some_ torsions to have finite energies
@@ -1548,17 +2206,17 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         assert check_dimensionality(bin_width, float)
         return logp_torsions, phis, bin_width, logq
 
-    def _propose_torsion(self, growth_context, torsion_atom_indices, positions, r, theta, beta, n_divisions, bond, angle):
+    def _propose_torsion(self, growth_context, torsion_atom_indices, positions, r, theta, beta, n_divisions, bond, angle, energy_evaluator=None):
         """
         Propose a torsion angle using OpenMM
 
         Parameters
         ----------
-        growth_context : simtk.openmm.Context
-            Context containing the modified system
+        growth_context : simtk.openmm.Context or None
+            Context containing the modified system, or None if ``energy_evaluator`` is used without a Context
         torsion_atom_indices : int tuple of shape (4,)
             Atom indices defining torsion, where torsion_atom_indices[0] is the atom to be driven
-        positions : simtk.unit.Quantity with shape (natoms,3) with units compatible with nanometers
+        positions : simtk.unit.Quantity with shape (natoms,3) with units compatible with nanometers, or np.ndarray implicitly in nanometers
             Positions of the atoms in the system
         r : float (implicitly in nanometers)
             Dimensionless bond length (must be in nanometers)
@@ -1568,6 +2226,8 @@ class FFAllAngleGeometryEngine(GeometryEngine):
             Inverse thermal energy
         n_divisions : int
             Number of divisions for the torsion scan
+        energy_evaluator : GrowthSystemEnergyEvaluator, optional, default=None
+            If specified, all torsion bins are scored in a single vectorized pass (see ``_torsion_log_pmf``)
 
         Returns
         -------
@@ -1582,13 +2242,14 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         # TODO: Overhaul this method to accept and return unit-bearing quantities
         # TODO: Switch from simple discrete quadrature to more sophisticated computation of pdf
 
-        check_dimensionality(positions, unit.angstroms)
+        if unit.is_quantity(positions):
+            check_dimensionality(positions, unit.angstroms)
         check_dimensionality(r, float)
         check_dimensionality(theta, float)
         check_dimensionality(beta, 1.0 / unit.kilojoules_per_mole)
 
         # Compute probability mass function for all possible proposed torsions
-        logp_torsions, phis, bin_width, logq = self._torsion_log_pmf(growth_context, torsion_atom_indices, positions, r, theta, beta, n_divisions, bond, angle)
+        logp_torsions, phis, bin_width, logq = self._torsion_log_pmf(growth_context, torsion_atom_indices, positions, r, theta, beta, n_divisions, bond, angle, energy_evaluator=energy_evaluator)
 
         # Draw a torsion bin and a torsion uniformly within that bin
         index = np.random.choice(range(len(phis)), p=np.exp(logp_torsions))
@@ -1603,17 +2264,17 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         assert check_dimensionality(logp, float)
         return phi, logp
 
-    def _torsion_logp(self, growth_context, torsion_atom_indices, positions, r, theta, phi, beta, n_divisions, bond, angle):
+    def _torsion_logp(self, growth_context, torsion_atom_indices, positions, r, theta, phi, beta, n_divisions, bond, angle, energy_evaluator=None):
         """
         Calculate the logp of a torsion using OpenMM
 
         Parameters
         ----------
-        growth_context : simtk.openmm.Context
-            Context containing the modified system
+        growth_context : simtk.openmm.Context or None
+            Context containing the modified system, or None if ``energy_evaluator`` is used without a Context
         torsion_atom_indices : int tuple of shape (4,)
             Atom indices defining torsion, where torsion_atom_indices[0] is the atom to be driven
-        positions : simtk.unit.Quantity with shape (natoms,3) with units compatible with nanometers
+        positions : simtk.unit.Quantity with shape (natoms,3) with units compatible with nanometers, or np.ndarray implicitly in nanometers
             Positions of the atoms in the system
         r : float (implicitly in nanometers)
             Dimensionless bond length (must be in nanometers)
@@ -1625,6 +2286,8 @@ class FFAllAngleGeometryEngine(GeometryEngine):
             Inverse thermal energy
         n_divisions : int
             Number of divisions for the torsion scan
+        energy_evaluator : GrowthSystemEnergyEvaluator, optional, default=None
+            If specified, all torsion bins are scored in a single vectorized pass (see ``_torsion_log_pmf``)
 
         Returns
         -------
@@ -1634,14 +2297,15 @@ class FFAllAngleGeometryEngine(GeometryEngine):
         # TODO: Overhaul this method to accept and return unit-bearing quantities
 
         # Check that quantities are unitless
-        check_dimensionality(positions, unit.angstroms)
+        if unit.is_quantity(positions):
+            check_dimensionality(positions, unit.angstroms)
         check_dimensionality(r, float)
         check_dimensionality(theta, float)
         check_dimensionality(phi, float)
         check_dimensionality(beta, 1.0 / unit.kilojoules_per_mole)
 
         # Compute torsion probability mass function
-        logp_torsions, phis, bin_width, logq = self._torsion_log_pmf(growth_context, torsion_atom_indices, positions, r, theta, beta, n_divisions, bond, angle)
+        logp_torsions, phis, bin_width, logq = self._torsion_log_pmf(growth_context, torsion_atom_indices, positions, r, theta, beta, n_divisions, bond, angle, energy_evaluator=energy_evaluator)
 
         # Determine which bin the torsion falls within
         index = np.argmin(np.abs(phi-phis)) # WARNING: This assumes both phi and phis have domain of [-pi,+pi)
@@ -1737,7 +2401,11 @@ class GeometrySystemGenerator(object):
 
         # Get list of particle indices for new and old atoms.
         new_particle_indices = growth_indices
-        old_particle_indices = [idx for idx in range(reference_system.getNumParticles()) if idx not in new_particle_indices]
+        old_particle_indices = np.setdiff1d(np.arange(reference_system.getNumParticles()), new_particle_indices).tolist()
+
+        # Lookup table of the growth_idx of each particle (0 for atoms with positions)
+        particle_growth_idx = np.zeros(reference_system.getNumParticles(), dtype=int)
+        particle_growth_idx[growth_indices] = np.arange(1, len(growth_indices) + 1)
 
         # Compile index of reference forces
         reference_forces = dict()
@@ -1749,98 +2417,93 @@ class GeometrySystemGenerator(object):
                 reference_forces[force_name] = force
 
         # Create new System
+        import copy
         from simtk import openmm
         growth_system = openmm.System()
         atoms_with_positions_system = openmm.System()
 
-        # Copy particles
-        for i in range(reference_system.getNumParticles()):
-            growth_system.addParticle(reference_system.getParticleMass(i))
-            atoms_with_positions_system.addParticle(reference_system.getParticleMass(i))
+        # Copy particles (converting masses to plain floats once, rather than once per System)
+        masses = [reference_system.getParticleMass(i).value_in_unit(unit.dalton) for i in range(reference_system.getNumParticles())]
+        for mass in masses:
+            growth_system.addParticle(mass)
+            atoms_with_positions_system.addParticle(mass)
+
+        # Copy the periodic box, which periodic nonbonded interactions depend on
+        growth_system.setDefaultPeriodicBoxVectors(*reference_system.getDefaultPeriodicBoxVectors())
+        atoms_with_positions_system.setDefaultPeriodicBoxVectors(*reference_system.getDefaultPeriodicBoxVectors())
 
         # We don't need to copy constraints, since we will not be running dynamics with this system
 
         # Virtual sites are, in principle, automatically supported
 
+        # Terms involving new atoms are added to the growth system one at a time; the (far more numerous) terms among
+        # atoms with positions are never visited individually, since the atoms_with_positions_system forces are copies
+        # of the reference forces in which only the terms involving new atoms are switched off.
+
         # Create bond force
         _logger.info("\tcreating bond force...")
         modified_bond_force = openmm.CustomBondForce(self._HarmonicBondForceEnergy.format(global_parameter_name))
-        atoms_with_positions_bond_force = openmm.HarmonicBondForce()
-        atoms_with_positions_system.addForce(atoms_with_positions_bond_force)
         modified_bond_force.addGlobalParameter(global_parameter_name, default_growth_index)
         for parameter_name in ['r0', 'K', 'growth_idx']:
             modified_bond_force.addPerBondParameter(parameter_name)
         growth_system.addForce(modified_bond_force)
         reference_bond_force = reference_forces['HarmonicBondForce']
-        _logger.info(f"\tthere are {reference_bond_force.getNumBonds()} bonds in reference force.")
-        for bond_index in range(reference_bond_force.getNumBonds()):
-            p1, p2, r0, K = reference_bond_force.getBondParameters(bond_index)
-            growth_idx = self._calculate_growth_idx([p1, p2], growth_indices)
-            _logger.info(f"\t\tfor bond {bond_index} (i.e. partices {p1} and {p2}), the growth_index is {growth_idx}")
-            if growth_idx > 0:
-                modified_bond_force.addBond(p1, p2, [r0, K, growth_idx])
-                _logger.info(f"\t\t\tadding to the growth system")
-            else:
-                atoms_with_positions_bond_force.addBond(p1, p2, r0, K)
-                _logger.info(f"\t\t\tadding to the the atoms with positions system.")
+        atoms_with_positions_bond_force = copy.deepcopy(reference_bond_force)
+        atoms_with_positions_system.addForce(atoms_with_positions_bond_force)
+        bond_terms = read_serialized_force_terms(openmm.XmlSerializer.serialize(reference_bond_force), 'Bond', ['p1', 'p2', 'd', 'k'])
+        bond_particles, bond_parameters = bond_terms[:, :2].astype(int), bond_terms[:, 2:]
+        bond_growth_idx = self._calculate_growth_idx_array(bond_particles, particle_growth_idx)
+        for bond_index in np.flatnonzero(bond_growth_idx):
+            (p1, p2), (r0, K) = bond_particles[bond_index].tolist(), bond_parameters[bond_index].tolist()
+            modified_bond_force.addBond(p1, p2, [r0, K, int(bond_growth_idx[bond_index])])
+            atoms_with_positions_bond_force.setBondParameters(int(bond_index), p1, p2, r0, 0.0)
+        _logger.info(f"\tadded {modified_bond_force.getNumBonds()} of {len(bond_particles)} bonds to the growth system.")
 
         # Create angle force
         # NOTE: here, we are implementing an angle exclusion scheme for angle terms that are coupled to lnZ_phi
         _logger.info("\tcreating angle force...")
         modified_angle_force = openmm.CustomAngleForce(self._HarmonicAngleForceEnergy.format(global_parameter_name))
-        atoms_with_positions_angle_force = openmm.HarmonicAngleForce()
-        atoms_with_positions_system.addForce(atoms_with_positions_angle_force)
         modified_angle_force.addGlobalParameter(global_parameter_name, default_growth_index)
         for parameter_name in ['theta0', 'K', 'growth_idx']:
             modified_angle_force.addPerAngleParameter(parameter_name)
         growth_system.addForce(modified_angle_force)
         reference_angle_force = reference_forces['HarmonicAngleForce']
+        atoms_with_positions_angle_force = copy.deepcopy(reference_angle_force)
+        atoms_with_positions_system.addForce(atoms_with_positions_angle_force)
+        angle_terms = read_serialized_force_terms(openmm.XmlSerializer.serialize(reference_angle_force), 'Angle', ['p1', 'p2', 'p3', 'a', 'k'])
+        angle_particles, angle_parameters = angle_terms[:, :3].astype(int), angle_terms[:, 3:]
+        angle_growth_idx = self._calculate_growth_idx_array(angle_particles, particle_growth_idx)
+        # Angles that are part of a proposed torsion (in either direction) are necessary
+        torsion_angles = set(tuple(torsion[:3]) for torsion in torsion_proposal_order) | set(tuple(torsion[2::-1]) for torsion in torsion_proposal_order)
         neglected_angle_term_indices = [] #initialize the index list of neglected angle forces
-        _logger.info(f"\tthere are {reference_angle_force.getNumAngles()} angles in reference force.")
-        for angle in range(reference_angle_force.getNumAngles()):
-            p1, p2, p3, theta0, K = reference_angle_force.getAngleParameters(angle)
-            growth_idx = self._calculate_growth_idx([p1, p2, p3], growth_indices)
-            _logger.info(f"\t\tfor angle {angle} (i.e. partices {p1}, {p2}, and {p3}), the growth_index is {growth_idx}")
-
-            if growth_idx > 0:
-                if neglect_angles and (not use_sterics):
-                    if any( [p1, p2, p3] == torsion[:3] or [p3,p2,p1] == torsion[:3] for torsion in torsion_proposal_order):
-                        #then there is a new atom in the angle term and the angle is part of a torsion and is necessary
-                        _logger.info(f"\t\t\tadding to the growth system since it is part of a torsion")
-                        modified_angle_force.addAngle(p1, p2, p3, [theta0, K, growth_idx])
-                    else:
-                        #then it is a neglected angle force, so it must be tallied
-                        _logger.info(f"\t\t\ttallying to neglected term indices")
-                        neglected_angle_term_indices.append(angle)
-                else:
-                    _logger.info(f"\t\t\tadding to the growth system")
-                    modified_angle_force.addAngle(p1, p2, p3, [theta0, K, growth_idx])
+        for angle_index in np.flatnonzero(angle_growth_idx):
+            (p1, p2, p3), (theta0, K) = angle_particles[angle_index].tolist(), angle_parameters[angle_index].tolist()
+            atoms_with_positions_angle_force.setAngleParameters(int(angle_index), p1, p2, p3, theta0, 0.0)
+            if neglect_angles and (not use_sterics) and ((p1, p2, p3) not in torsion_angles):
+                #then it is a neglected angle force, so it must be tallied
+                neglected_angle_term_indices.append(int(angle_index))
             else:
-                #then it is an angle term of core atoms and should be added to the atoms_with_positions_angle_force
-                _logger.info(f"\t\t\tadding to the the atoms with positions system.")
-                atoms_with_positions_angle_force.addAngle(p1, p2, p3, theta0, K)
+                modified_angle_force.addAngle(p1, p2, p3, [theta0, K, int(angle_growth_idx[angle_index])])
+        _logger.info(f"\tadded {modified_angle_force.getNumAngles()} of {len(angle_particles)} angles to the growth system; {len(neglected_angle_term_indices)} are neglected.")
 
         # Create torsion force
         _logger.info("\tcreating torsion force...")
         modified_torsion_force = openmm.CustomTorsionForce(self._PeriodicTorsionForceEnergy.format(global_parameter_name))
-        atoms_with_positions_torsion_force = openmm.PeriodicTorsionForce()
-        atoms_with_positions_system.addForce(atoms_with_positions_torsion_force)
         modified_torsion_force.addGlobalParameter(global_parameter_name, default_growth_index)
         for parameter_name in ['periodicity', 'phase', 'k', 'growth_idx']:
             modified_torsion_force.addPerTorsionParameter(parameter_name)
         growth_system.addForce(modified_torsion_force)
         reference_torsion_force = reference_forces['PeriodicTorsionForce']
-        _logger.info(f"\tthere are {reference_torsion_force.getNumTorsions()} torsions in reference force.")
-        for torsion in range(reference_torsion_force.getNumTorsions()):
-            p1, p2, p3, p4, periodicity, phase, k = reference_torsion_force.getTorsionParameters(torsion)
-            growth_idx = self._calculate_growth_idx([p1, p2, p3, p4], growth_indices)
-            _logger.info(f"\t\tfor torsion {torsion} (i.e. partices {p1}, {p2}, {p3}, and {p4}), the growth_index is {growth_idx}")
-            if growth_idx > 0:
-                modified_torsion_force.addTorsion(p1, p2, p3, p4, [periodicity, phase, k, growth_idx])
-                _logger.info(f"\t\t\tadding to the growth system")
-            else:
-                atoms_with_positions_torsion_force.addTorsion(p1, p2, p3, p4, periodicity, phase, k)
-                _logger.info(f"\t\t\tadding to the the atoms with positions system.")
+        atoms_with_positions_torsion_force = copy.deepcopy(reference_torsion_force)
+        atoms_with_positions_system.addForce(atoms_with_positions_torsion_force)
+        torsion_terms = read_serialized_force_terms(openmm.XmlSerializer.serialize(reference_torsion_force), 'Torsion', ['p1', 'p2', 'p3', 'p4', 'periodicity', 'phase', 'k'])
+        torsion_particles, torsion_parameters = torsion_terms[:, :4].astype(int), torsion_terms[:, 4:]
+        torsion_growth_idx = self._calculate_growth_idx_array(torsion_particles, particle_growth_idx)
+        for torsion_index in np.flatnonzero(torsion_growth_idx):
+            (p1, p2, p3, p4), (periodicity, phase, k) = torsion_particles[torsion_index].tolist(), torsion_parameters[torsion_index].tolist()
+            modified_torsion_force.addTorsion(p1, p2, p3, p4, [periodicity, phase, k, int(torsion_growth_idx[torsion_index])])
+            atoms_with_positions_torsion_force.setTorsionParameters(int(torsion_index), p1, p2, p3, p4, int(periodicity), phase, 0.0)
+        _logger.info(f"\tadded {modified_torsion_force.getNumTorsions()} of {len(torsion_particles)} torsions to the growth system.")
 
         # TODO: check this for bugs by turning on sterics
         if use_sterics and 'NonbondedForce' in reference_forces.keys():
@@ -1859,8 +2522,14 @@ class GeometrySystemGenerator(object):
             reference_nonbonded_force_switching_distance = reference_nonbonded_force.getSwitchingDistance()
             _logger.info(f"\t\t\tnonbonded switching distance: {reference_nonbonded_force_switching_distance}")
 
+            serialized_nonbonded_force = openmm.XmlSerializer.serialize(reference_nonbonded_force)
+            particle_parameters = read_serialized_force_terms(serialized_nonbonded_force, 'Particle', ['q', 'sig', 'eps'])
+            exception_terms = read_serialized_force_terms(serialized_nonbonded_force, 'Exception', ['p1', 'p2', 'q', 'sig', 'eps'])
+            exception_particles, exception_parameters = exception_terms[:, :2].astype(int), exception_terms[:, 2:]
+            exception_growth_idx = self._calculate_growth_idx_array(exception_particles, particle_growth_idx)
+
             #now we add the 1,4 interaction force
-            if reference_nonbonded_force.getNumExceptions() > 0:
+            if len(exception_particles) > 0:
                 _logger.info("\t\tcreating nonbonded exception force (i.e. custom bond for 1,4s)...")
                 custom_bond_force = openmm.CustomBondForce(self._nonbondedExceptionEnergy.format(global_parameter_name))
                 custom_bond_force.addGlobalParameter(global_parameter_name, default_growth_index)
@@ -1868,17 +2537,12 @@ class GeometrySystemGenerator(object):
                     custom_bond_force.addPerBondParameter(parameter_name)
                 growth_system.addForce(custom_bond_force)
 
-                #Now we iterate through the exceptions and add custom bond forces if the growth intex for that bond > 0
-                _logger.info("\t\tlooping through exceptions calculating growth indices, and adding appropriate interactions to custom bond force.")
-                _logger.info(f"\t\tthere are {reference_nonbonded_force.getNumExceptions()} in the reference Nonbonded force")
-                for exception_index in range(reference_nonbonded_force.getNumExceptions()):
-                    p1, p2, chargeprod, sigma, epsilon = reference_nonbonded_force.getExceptionParameters(exception_index)
-                    #_logger.info(f"\t\t\texception params for particles {p1} and {p2}: (chargeprod, sigma, epsilon) = ({chargeprod}, {sigma}, {epsilon})")
-                    growth_idx = self._calculate_growth_idx([p1, p2], growth_indices)
-                    # Only need to add terms that are nonzero and involve newly added atoms.
-                    if (growth_idx > 0) and ((chargeprod.value_in_unit_system(unit.md_unit_system) != 0.0) or (epsilon.value_in_unit_system(unit.md_unit_system) != 0.0)):
-                        custom_bond_force.addBond(p1, p2, [chargeprod, sigma, epsilon, growth_idx])
-                        _logger.info(f"\t\t\tadding particles {p1} and {p2} (growth_idx = {growth_idx}) to custom bond force.")
+                # Only need to add terms that are nonzero and involve newly added atoms.
+                is_nonzero = (exception_parameters[:, 0] != 0.0) | (exception_parameters[:, 2] != 0.0)
+                for exception_index in np.flatnonzero((exception_growth_idx > 0) & is_nonzero):
+                    (p1, p2), (chargeprod, sigma, epsilon) = exception_particles[exception_index].tolist(), exception_parameters[exception_index].tolist()
+                    custom_bond_force.addBond(p1, p2, [chargeprod, sigma, epsilon, int(exception_growth_idx[exception_index])])
+                _logger.info(f"\t\tadded {custom_bond_force.getNumBonds()} of {len(exception_particles)} exceptions to the custom bond force.")
             else:
                 _logger.info("\t\tthere are no Exceptions in the reference system.")
 
@@ -1891,7 +2555,6 @@ class GeometrySystemGenerator(object):
             growth_system.addForce(modified_sterics_force)
 
             # Translate nonbonded method to the custom nonbonded force
-            import simtk.openmm.app as app
             _logger.info("\t\tsetting nonbonded method, cutoff, switching function, and switching distance to custom nonbonded force...")
             if reference_nonbonded_force_method in [0,1]: #if Nonbonded method is NoCutoff or CutoffNonPeriodic
                 modified_sterics_force.setNonbondedMethod(reference_nonbonded_force_method)
@@ -1904,41 +2567,26 @@ class GeometrySystemGenerator(object):
             modified_sterics_force.setUseSwitchingFunction(reference_nonbonded_force_switching_function)
             modified_sterics_force.setSwitchingDistance(reference_nonbonded_force_switching_distance)
 
-
-            # define atoms_with_positions_Nonbonded_Force
-            atoms_with_positions_nonbonded_force = openmm.NonbondedForce()
-
-            atoms_with_positions_nonbonded_force.setNonbondedMethod(reference_nonbonded_force_method)
-            atoms_with_positions_nonbonded_force.setCutoffDistance(reference_nonbonded_force_cutoff)
-            atoms_with_positions_nonbonded_force.setUseSwitchingFunction(reference_nonbonded_force_switching_function)
-            atoms_with_positions_nonbonded_force.setSwitchingDistance(reference_nonbonded_force_switching_distance)
+            # The atoms_with_positions_nonbonded_force is the reference force with new atoms (and their exceptions) switched off
+            atoms_with_positions_nonbonded_force = copy.deepcopy(reference_nonbonded_force)
             atoms_with_positions_system.addForce(atoms_with_positions_nonbonded_force)
 
-            # Add particle parameters to the custom nonbonded force...and add interactions to the atoms_with_positions_nonbonded_force if growth_index == 0
+            # Add particle parameters to the custom nonbonded force
             _logger.info("\t\tlooping through reference nonbonded force to add particle params to custom nonbonded force")
-            for particle_index in range(reference_nonbonded_force.getNumParticles()):
-                [charge, sigma, epsilon] = reference_nonbonded_force.getParticleParameters(particle_index)
-                growth_idx = self._calculate_growth_idx([particle_index], growth_indices)
-                modified_sterics_force.addParticle([charge, sigma, epsilon, growth_idx])
-                if (growth_idx > 0): # add particle to the atoms_with_positions_nonbonded_force if it is old
-                    atoms_with_positions_nonbonded_force.addParticle(charge * 0.0, sigma, epsilon * 0.0)
-                else: #if the particle is old
-                    atoms_with_positions_nonbonded_force.addParticle(charge, sigma, epsilon)
-
-
+            for particle_index, (charge, sigma, epsilon) in enumerate(particle_parameters.tolist()):
+                modified_sterics_force.addParticle([charge, sigma, epsilon, int(particle_growth_idx[particle_index])])
+            for particle_index in new_particle_indices:
+                charge, sigma, epsilon = particle_parameters[particle_index].tolist()
+                atoms_with_positions_nonbonded_force.setParticleParameters(particle_index, charge * 0.0, sigma, epsilon * 0.0)
 
             # Add exclusions, which are active at all times.
             # (1,4) exceptions are always included, since they are part of the valence terms.
             _logger.info("\t\tlooping through reference nonbonded force exceptions to add exclusions to custom nonbonded force")
-            for exception_index in range(reference_nonbonded_force.getNumExceptions()):
-                [p1, p2, chargeprod, sigma, epsilon] = reference_nonbonded_force.getExceptionParameters(exception_index)
+            for p1, p2 in exception_particles.tolist():
                 modified_sterics_force.addExclusion(p1, p2)
-
-                #we also have to add the exceptions to the atoms_with_positions_nonbonded_force
-                if len(set([p1, p2]).intersection(set(old_particle_indices))) == 2:
-                    #then both particles are old, so we can add the exception to the atoms_with_positions_nonbonded_force
-                    atoms_with_positions_nonbonded_force.addException(p1, p2, chargeprod, sigma, epsilon)
-
+            for exception_index in np.flatnonzero(exception_growth_idx):
+                (p1, p2), sigma = exception_particles[exception_index].tolist(), exception_parameters[exception_index, 1]
+                atoms_with_positions_nonbonded_force.setExceptionParameters(int(exception_index), p1, p2, 0.0, sigma, 0.0)
 
             # Only compute interactions of new particles with all other particles
             # TODO: Allow inteactions to be resticted to only the residue being grown.
@@ -2172,6 +2820,320 @@ class GeometrySystemGenerator(object):
         new_atom_growth_order = [growth_indices.index(atom_idx)+1 for atom_idx in new_atoms_in_force]
         return max(new_atom_growth_order)
 
+    def _calculate_growth_idx_array(self, particle_indices, particle_growth_idx):
+        """
+        Vectorized version of _calculate_growth_idx for many terms at once.
+
+        Parameters
+        ----------
+        particle_indices : np.ndarray of shape (n_terms, n_particles_per_term) of int
+            The indices of particles involved in each term
+        particle_growth_idx : np.ndarray of shape (n_particles,) of int
+            The growth_idx of each particle (its 1-based position in the atom proposal order, or 0 if it has a position)
+
+        Returns
+        -------
+        growth_idx : np.ndarray of shape (n_terms,) of int
+            The growth_idx parameter of each term
+        """
+        if len(particle_indices) == 0:
+            return np.zeros(0, dtype=int)
+        return particle_growth_idx[particle_indices].max(axis=1)
+
+class GrowthSystemEnergyEvaluator(object):
+    """
+    Internal utility class to evaluate growth system energies with NumPy, without an OpenMM Context.
+
+    The growth system created by ``GeometrySystemGenerator`` is parsed once into NumPy arrays of particle indices,
+    per-term parameters and ``growth_idx`` values.  The energy expressions mirror those of ``GeometrySystemGenerator``,
+    so that for a torsion scan the energy of every torsion bin can be obtained from array operations rather than from
+    one ``Context.setPositions`` / ``Context.getState`` round trip per bin.
+
+    Like ``GeometrySystemGenerator``, the evaluator tracks the current value of the growth parameter, which
+    ``compute_energy`` uses to select the active terms.
+    """
+
+    def __init__(self, growth_system):
+        """
+        Parameters
+        ----------
+        growth_system : simtk.openmm.System object
+            The growth system created by ``GeometrySystemGenerator.get_modified_system()``
+
+        Raises
+        ------
+        ValueError
+            If the growth system contains a force that cannot be evaluated by this class
+        """
+        from simtk import openmm
+
+        self.growth_parameter_name = None
+        self.current_growth_index = None
+        self._terms = collections.OrderedDict() # _terms[kind] = (particle_indices, parameters, growth_idx)
+        self._nonbonded = None
+
+        for force in growth_system.getForces():
+            if force.getNumGlobalParameters() > 0:
+                self.growth_parameter_name = force.getGlobalParameterName(0)
+                self.current_growth_index = force.getGlobalParameterDefaultValue(0)
+
+            if isinstance(force, openmm.CustomBondForce):
+                parameter_names = [force.getPerBondParameterName(index) for index in range(force.getNumPerBondParameters())]
+                terms = [force.getBondParameters(index) for index in range(force.getNumBonds())]
+                particle_indices, parameters, growth_idx = self._terms_to_arrays(terms, 2)
+                if parameter_names == ['r0', 'K', 'growth_idx']:
+                    self._terms['bond'] = (particle_indices, parameters, growth_idx)
+                elif parameter_names == ['chargeprod', 'sigma', 'epsilon', 'growth_idx']:
+                    self._terms['exception'] = (particle_indices, parameters, growth_idx)
+                    self._exception_coulomb_constant = self._get_coulomb_constant(force.getEnergyFunction())
+                else:
+                    raise ValueError("Unrecognized CustomBondForce with per-bond parameters {}".format(parameter_names))
+            elif isinstance(force, openmm.CustomAngleForce):
+                terms = [force.getAngleParameters(index) for index in range(force.getNumAngles())]
+                self._terms['angle'] = self._terms_to_arrays(terms, 3)
+            elif isinstance(force, openmm.CustomTorsionForce):
+                terms = [force.getTorsionParameters(index) for index in range(force.getNumTorsions())]
+                self._terms['torsion'] = self._terms_to_arrays(terms, 4)
+            elif isinstance(force, openmm.CustomNonbondedForce):
+                self._nonbonded = self._parse_nonbonded_force(force)
+            else:
+                raise ValueError("Growth system force {} is not supported by {}".format(force.__class__.__name__, self.__class__.__name__))
+
+    @staticmethod
+    def _terms_to_arrays(terms, n_particles):
+        """
+        Convert a list of custom force terms of the form ``[p1, ..., pn, [param1, ..., growth_idx]]`` into arrays.
+
+        Returns
+        -------
+        particle_indices : np.ndarray of int with shape (n_terms, n_particles)
+        parameters : np.ndarray of float with shape (n_terms, n_parameters - 1)
+        growth_idx : np.ndarray of float with shape (n_terms,)
+        """
+        if len(terms) == 0:
+            return np.zeros([0, n_particles], np.int64), np.zeros([0, 0]), np.zeros([0])
+        particle_indices = np.array([term[:n_particles] for term in terms], np.int64)
+        parameters = np.array([term[n_particles] for term in terms], np.float64)
+        return particle_indices, parameters[:, :-1], parameters[:, -1]
+
+    @staticmethod
+    def _get_coulomb_constant(energy_function):
+        """
+        Retrieve the (formatted) value of ONE_4PI_EPS0 used in a custom energy expression, so energies match OpenMM exactly.
+        """
+        import re
+        match = re.search(r'ONE_4PI_EPS0\s*=\s*([-+0-9.eE]+)\s*;', energy_function)
+        if match is None:
+            raise ValueError("Could not determine ONE_4PI_EPS0 from energy expression '{}'".format(energy_function))
+        return float(match.group(1))
+
+    def _parse_nonbonded_force(self, force):
+        """
+        Extract per-particle parameters, exclusions and cutoff treatment from the growth system CustomNonbondedForce.
+        """
+        from simtk import openmm
+        nonbonded_method = force.getNonbondedMethod()
+        if nonbonded_method not in [openmm.CustomNonbondedForce.NoCutoff, openmm.CustomNonbondedForce.CutoffNonPeriodic, openmm.CustomNonbondedForce.CutoffPeriodic]:
+            raise ValueError("CustomNonbondedForce nonbonded method {} is not supported".format(nonbonded_method))
+
+        parameters = np.array([force.getParticleParameters(index) for index in range(force.getNumParticles())], np.float64)
+        exclusions = collections.defaultdict(set)
+        for index in range(force.getNumExclusions()):
+            p1, p2 = force.getExclusionParticles(index)
+            exclusions[p1].add(p2)
+            exclusions[p2].add(p1)
+
+        nonbonded = dict()
+        nonbonded['charge'], nonbonded['sigma'], nonbonded['epsilon'], nonbonded['growth_idx'] = parameters.T
+        nonbonded['exclusions'] = exclusions
+        nonbonded['method'] = nonbonded_method
+        nonbonded['cutoff'] = force.getCutoffDistance().value_in_unit_system(unit.md_unit_system)
+        nonbonded['use_switching'] = force.getUseSwitchingFunction()
+        nonbonded['switching_distance'] = force.getSwitchingDistance().value_in_unit_system(unit.md_unit_system)
+        nonbonded['coulomb_constant'] = self._get_coulomb_constant(force.getEnergyFunction())
+        return nonbonded
+
+    @staticmethod
+    def _select_terms(particle_indices, growth_idx, atom_index, growth_index):
+        """
+        Return a boolean mask of the terms that involve ``atom_index`` and are active at ``growth_index``.
+        """
+        # The growth system uses select(step(growth_index + 0.1 - growth_idx), U, 0)
+        return np.any(particle_indices == atom_index, axis=1) & (growth_idx <= growth_index + 0.1)
+
+    @staticmethod
+    def _candidate_coordinates(particle_indices, atom_index, positions, xyzs):
+        """
+        Gather term coordinates for every candidate position of the driven atom.
+
+        Returns
+        -------
+        coordinates : np.ndarray of shape (n_candidates, n_terms, n_particles, 3)
+        """
+        coordinates = np.repeat(positions[particle_indices][np.newaxis], len(xyzs), axis=0)
+        coordinates[:, particle_indices == atom_index] = xyzs[:, np.newaxis, :]
+        return coordinates
+
+    def compute_atom_energies(self, atom_index, growth_index, positions, xyzs, box_vectors=None):
+        """
+        Compute the energy of all active growth system terms involving ``atom_index`` for each candidate position.
+
+        Parameters
+        ----------
+        atom_index : int
+            The index of the atom being driven
+        growth_index : int or float
+            The current value of the growth parameter
+        positions : np.ndarray of shape (n_atoms, 3), implicitly in nanometers
+            The positions of all atoms
+        xyzs : np.ndarray of shape (n_candidates, 3), implicitly in nanometers
+            The candidate positions of the driven atom
+        box_vectors : np.ndarray of shape (3, 3), implicitly in nanometers, optional, default=None
+            Periodic box vectors; required only if the growth system has a periodic CustomNonbondedForce
+
+        Returns
+        -------
+        energies : np.ndarray of shape (n_candidates,), implicitly in kJ/mol
+            energies[i] is the energy of the terms involving ``atom_index`` with that atom placed at xyzs[i]
+        """
+        positions = np.asarray(positions, np.float64)
+        xyzs = np.asarray(xyzs, np.float64)
+        energies = np.zeros(len(xyzs))
+
+        for kind, (particle_indices, parameters, growth_idx) in self._terms.items():
+            mask = self._select_terms(particle_indices, growth_idx, atom_index, growth_index)
+            if mask.any():
+                coordinates = self._candidate_coordinates(particle_indices[mask], atom_index, positions, xyzs)
+                energies += np.sum(self._compute_term_energies(kind, parameters[mask], coordinates), axis=-1)
+
+        if self._nonbonded is not None:
+            energies += self._compute_nonbonded_energies(atom_index, growth_index, positions, xyzs, box_vectors)
+
+        return energies
+
+    def compute_energy(self, positions, growth_index=None, box_vectors=None):
+        """
+        Compute the total growth system energy, equivalent to the potential energy of a growth system Context.
+
+        Parameters
+        ----------
+        positions : np.ndarray of shape (n_atoms, 3), implicitly in nanometers
+            The positions of all atoms
+        growth_index : int or float, optional, default=None
+            The value of the growth parameter; if None, ``current_growth_index`` is used
+        box_vectors : np.ndarray of shape (3, 3), implicitly in nanometers, optional, default=None
+            Periodic box vectors; required only if the growth system has a periodic CustomNonbondedForce
+
+        Returns
+        -------
+        energy : float, implicitly in kJ/mol
+            The potential energy of all active growth system terms
+        """
+        if growth_index is None:
+            growth_index = self.current_growth_index
+        positions = np.asarray(positions, np.float64)
+        energy = 0.0
+
+        for kind, (particle_indices, parameters, growth_idx) in self._terms.items():
+            mask = (growth_idx <= growth_index + 0.1)
+            if mask.any():
+                energy += np.sum(self._compute_term_energies(kind, parameters[mask], positions[particle_indices[mask]]))
+
+        if self._nonbonded is not None:
+            # Each active new atom interacts with the old atoms and with the new atoms placed before it
+            particle_growth_idx = self._nonbonded['growth_idx']
+            for atom_index in np.flatnonzero((particle_growth_idx > 0) & (particle_growth_idx <= growth_index + 0.1)):
+                energy += self._compute_nonbonded_energies(atom_index, particle_growth_idx[atom_index], positions, positions[[atom_index]], box_vectors)[0]
+
+        return energy
+
+    def set_growth_parameter_index(self, growth_parameter_index):
+        """
+        Set the growth parameter index used by ``compute_energy``
+        """
+        self.current_growth_index = growth_parameter_index
+
+    def _compute_term_energies(self, kind, parameters, coordinates):
+        """
+        Compute per-term energies for coordinates of shape (..., n_terms, n_particles, 3), implicitly in kJ/mol.
+        """
+        if kind == 'bond':
+            r0, K = parameters.T
+            return 0.5*K*(self._distances(coordinates) - r0)**2
+        elif kind == 'angle':
+            theta0, K = parameters.T
+            return 0.5*K*(self._angles(coordinates) - theta0)**2
+        elif kind == 'torsion':
+            periodicity, phase, k = parameters.T
+            return k*(1.0 + np.cos(periodicity*self._dihedrals(coordinates) - phase))
+        elif kind == 'exception':
+            chargeprod, sigma, epsilon = parameters.T
+            r = self._distances(coordinates)
+            x = (sigma/r)**6
+            return self._exception_coulomb_constant*chargeprod/r + 4.0*epsilon*x*(x-1.0)
+        else:
+            raise ValueError("Unknown term kind {}".format(kind))
+
+    def _compute_nonbonded_energies(self, atom_index, growth_index, positions, xyzs, box_vectors):
+        """
+        Compute the CustomNonbondedForce interaction energy of the driven atom with all interacting partners.
+        """
+        from simtk import openmm
+        nonbonded = self._nonbonded
+        partners = np.flatnonzero(nonbonded['growth_idx'] <= growth_index + 0.1)
+        excluded = list(nonbonded['exclusions'][atom_index]) + [atom_index]
+        partners = partners[~np.isin(partners, excluded)]
+        if len(partners) == 0:
+            return np.zeros(len(xyzs))
+
+        delta = positions[partners][np.newaxis, :, :] - xyzs[:, np.newaxis, :]
+        if nonbonded['method'] == openmm.CustomNonbondedForce.CutoffPeriodic:
+            if box_vectors is None:
+                raise ValueError("box_vectors must be specified for periodic nonbonded interactions")
+            # Minimum image convention for (possibly triclinic) reduced-form box vectors, as in OpenMM
+            for axis in [2, 1, 0]:
+                delta -= box_vectors[axis] * np.round(delta[..., axis:axis+1] / box_vectors[axis][axis])
+        r = np.sqrt(np.sum(delta**2, axis=-1))
+
+        epsilon = np.sqrt(nonbonded['epsilon'][atom_index] * nonbonded['epsilon'][partners])
+        sigma = 0.5 * (nonbonded['sigma'][atom_index] + nonbonded['sigma'][partners])
+        chargeprod = nonbonded['charge'][atom_index] * nonbonded['charge'][partners]
+        x = (sigma/r)**6
+        pair_energies = 4.0*epsilon*x*(x-1.0) + nonbonded['coulomb_constant']*chargeprod/r
+
+        if nonbonded['method'] != openmm.CustomNonbondedForce.NoCutoff:
+            cutoff = nonbonded['cutoff']
+            if nonbonded['use_switching']:
+                switching_distance = nonbonded['switching_distance']
+                t = np.clip((r - switching_distance) / (cutoff - switching_distance), 0.0, 1.0)
+                pair_energies *= 1.0 + t**3*(-10.0 + t*(15.0 - 6.0*t))
+            pair_energies[r >= cutoff] = 0.0
+
+        return np.sum(pair_energies, axis=1)
+
+    @staticmethod
+    def _distances(coordinates):
+        return np.sqrt(np.sum((coordinates[..., 1, :] - coordinates[..., 0, :])**2, axis=-1))
+
+    @staticmethod
+    def _angles(coordinates):
+        v1 = coordinates[..., 0, :] - coordinates[..., 1, :]
+        v2 = coordinates[..., 2, :] - coordinates[..., 1, :]
+        cos_theta = np.sum(v1*v2, axis=-1) / np.sqrt(np.sum(v1**2, axis=-1) * np.sum(v2**2, axis=-1))
+        return np.arccos(np.clip(cos_theta, -1.0, 1.0))
+
+    @staticmethod
+    def _dihedrals(coordinates):
+        b1 = coordinates[..., 1, :] - coordinates[..., 0, :]
+        b2 = coordinates[..., 2, :] - coordinates[..., 1, :]
+        b3 = coordinates[..., 3, :] - coordinates[..., 2, :]
+        n1 = np.cross(b1, b2)
+        n2 = np.cross(b2, b3)
+        m1 = np.cross(n1, b2 / np.sqrt(np.sum(b2**2, axis=-1))[..., np.newaxis])
+        x = np.sum(n1*n2, axis=-1)
+        y = np.sum(m1*n2, axis=-1)
+        return np.arctan2(-y, x)
+
 class NetworkXProposalOrder(object):
     """
     This is a proposal order generating object that uses just networkx and graph traversal for simplicity.
@@ -2288,32 +3250,19 @@ class NetworkXProposalOrder(object):
             The contribution to the overall proposal log probability as a list of sequential logps
 
         """
-        import networkx as nx
-        from scipy import special
+        import bisect
         atom_torsions= []
         logp = []
         assert len(atom_group) == len(set(atom_group)), "There are duplicate atom indices in the list of atom proposal indices"
-        while len(atom_group) > 0:
-                #initialise an eligible_torsions_list
-                eligible_torsions_list = list()
-
-                for atom_index in atom_group:
 
-                    # Find the shortest path up to length four from the atom in question:
-                    shortest_paths = nx.algorithms.single_source_shortest_path(self._residue_graph, atom_index, cutoff=4)
+        # Enumerate the candidate torsions of each atom once; they only become eligible as atoms gain positions
+        candidate_torsions, n_missing_positions, waiting_torsions = self._build_torsion_candidate_index(atom_group)
+        eligible_torsion_indices = {atom_index: [candidate_index for candidate_index, n_missing in enumerate(n_missing_positions[atom_index]) if n_missing == 0]
+                                    for atom_index in atom_group}
 
-                    # Loop through the destination and path of each path and append to eligible_torsions_list
-                    # if destination has a position and path[1:3] is a subset of atoms with positions
-                    for destination, path in shortest_paths.items():
-
-                        # Check if the path is length 4 (a torsion) and that the destination has a position. Continue if not.
-                        if len(path) != 4 or destination not in self._atoms_with_positions_set:
-                            continue
-
-                        # If the last atom is in atoms with positions, check to see if the others are also.
-                        # If they are, append the torsion to the list of possible torsions to propose
-                        if set(path[1:3]).issubset(self._atoms_with_positions_set):
-                            eligible_torsions_list.append(path)
+        while len(atom_group) > 0:
+                # Gather the eligible torsions in the order in which the atoms and their shortest paths are traversed
+                eligible_torsions_list = [candidate_torsions[atom_index][candidate_index] for atom_index in atom_group for candidate_index in eligible_torsion_indices[atom_index]]
 
                 assert len(eligible_torsions_list) != 0, "There is a connectivity issue; there are no torsions from which to choose"
                 #now we have to randomly choose a single torsion
@@ -2329,6 +3278,12 @@ class NetworkXProposalOrder(object):
                 #add atom to atoms with positions and corresponding set
                 self._atoms_with_positions_set.add(chosen_atom_index)
 
+                # Update the torsions that were waiting on a position for the chosen atom
+                for atom_index, candidate_index in waiting_torsions.pop(chosen_atom_index, []):
+                    n_missing_positions[atom_index][candidate_index] -= 1
+                    if n_missing_positions[atom_index][candidate_index] == 0:
+                        bisect.insort(eligible_torsion_indices[atom_index], candidate_index)
+
                 #add the log probability of the choice to logp
                 logp.append(np.log(1./ntorsions))
 
@@ -2337,6 +3292,43 @@ class NetworkXProposalOrder(object):
 
         return atom_torsions, logp
 
+    def _build_torsion_candidate_index(self, atom_group):
+        """
+        Enumerate the candidate torsions of each atom in a group and index them by the atoms whose positions they still require.
+
+        The candidate torsions of an atom are the shortest paths of four atoms starting at it, in the order in which
+        ``networkx.single_source_shortest_path`` returns them. A torsion is eligible once its last three atoms have positions.
+
+        Parameters
+        ----------
+        atom_group : list of int
+            The atoms to propose
+
+        Returns
+        -------
+        candidate_torsions : dict of int : list of list of int
+            The candidate torsions of each atom in atom_group
+        n_missing_positions : dict of int : list of int
+            For each atom in atom_group, the number of atoms without positions among the last three atoms of each candidate torsion
+        waiting_torsions : dict of int : list of (int, int)
+            For each atom without a position, the (atom index, candidate index) of the candidate torsions that require it
+        """
+        import networkx as nx
+        candidate_torsions = dict()
+        n_missing_positions = dict()
+        waiting_torsions = collections.defaultdict(list)
+        for atom_index in atom_group:
+            # Find the shortest path up to length four from the atom in question:
+            shortest_paths = nx.algorithms.single_source_shortest_path(self._residue_graph, atom_index, cutoff=4)
+            candidate_torsions[atom_index] = [path for path in shortest_paths.values() if len(path) == 4]
+            n_missing_positions[atom_index] = list()
+            for candidate_index, torsion in enumerate(candidate_torsions[atom_index]):
+                missing_atoms = [index for index in torsion[1:] if index not in self._atoms_with_positions_set]
+                n_missing_positions[atom_index].append(len(missing_atoms))
+                for index in missing_atoms:
+                    waiting_torsions[index].append((atom_index, candidate_index))
+        return candidate_torsions, n_missing_positions, waiting_torsions
+
 
     def _residue_to_graph(self, residue):
         """
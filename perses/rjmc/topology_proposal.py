@@ -723,18 +723,22 @@ class TopologyProposal(object):
         {new_atom_idx : old_atom_idx} map for the two systems
     old_to_new_atom_map : dict
         {old_atom_idx : new_atom_idx} map for the two systems
-    new_alchemical_atoms : list
-        List of all atoms in new system that are being transformed
-    new_environment_atoms : list
-        List of all atoms in new system that are not transformed, just mapped
-    old_alchemical_atoms : list
-        List of all atoms in old system that are being transformed
-    old_environment_atoms : list
-        List of all atoms in old system that are not transformed, just mapped
-    unique_new_atoms : list of int
-        List of indices of the unique new atoms
-    unique_old_atoms : list of int
-        List of indices of the unique old atoms
+    new_alchemical_atoms : tuple of int
+        Sorted indices of all atoms in new system that are being transformed
+    new_environment_atoms : tuple of int
+        Sorted indices of all atoms in new system that are not transformed, just mapped
+    old_alchemical_atoms : tuple of int
+        Sorted indices of all atoms in old system that are being transformed
+    old_environment_atoms : tuple of int
+        Sorted indices of all atoms in old system that are not transformed, just mapped
+    unique_new_atoms : tuple of int
+        Sorted indices of the unique new atoms
+    unique_old_atoms : tuple of int
+        Sorted indices of the unique old atoms
+    new_alchemical_atoms_mask, old_alchemical_atoms_mask : np.ndarray of bool
+        Read-only masks of the alchemical atoms of the new and old systems
+    unique_new_atoms_mask, unique_old_atoms_mask : np.ndarray of bool
+        Read-only masks of the unique atoms of the new and old systems
     natoms_new : int
         Number of atoms in the new system
     natoms_old : int
@@ -766,14 +770,59 @@ class TopologyProposal(object):
         self._old_chemical_state_key = old_chemical_state_key
         self._new_to_old_atom_map = new_to_old_atom_map
         self._old_to_new_atom_map = {old_atom : new_atom for new_atom, old_atom in new_to_old_atom_map.items()}
-        self._unique_new_atoms = list(set(range(self._new_topology.getNumAtoms()))-set(self._new_to_old_atom_map.keys()))
-        self._unique_old_atoms = list(set(range(self._old_topology.getNumAtoms()))-set(self._new_to_old_atom_map.values()))
-        self._old_alchemical_atoms = set(old_alchemical_atoms) if (old_alchemical_atoms is not None) else {atom for atom in range(old_system.getNumParticles())}
-        self._new_alchemical_atoms = set(self._old_to_new_atom_map.values()).union(self._unique_new_atoms)
-        self._old_environment_atoms = set(range(old_system.getNumParticles())) - self._old_alchemical_atoms
-        self._new_environment_atoms = set(range(new_system.getNumParticles())) - self._new_alchemical_atoms
         self._metadata = metadata
 
+        # atom classes are stored as boolean masks over the atoms of each system; the index tuples returned by the
+        # properties are only generated (once) when first accessed
+        mapped_new_atoms = np.fromiter(self._new_to_old_atom_map.keys(), dtype=np.int64, count=len(self._new_to_old_atom_map))
+        mapped_old_atoms = np.fromiter(self._new_to_old_atom_map.values(), dtype=np.int64, count=len(self._new_to_old_atom_map))
+        self._unique_new_atoms_mask = self._atom_mask(self._new_topology.getNumAtoms(), mapped_new_atoms, invert=True)
+        self._unique_old_atoms_mask = self._atom_mask(self._old_topology.getNumAtoms(), mapped_old_atoms, invert=True)
+        if old_alchemical_atoms is not None:
+            old_alchemical_atoms = np.fromiter(old_alchemical_atoms, dtype=np.int64)
+            self._old_alchemical_atoms_mask = self._atom_mask(old_system.getNumParticles(), old_alchemical_atoms)
+        else:
+            self._old_alchemical_atoms_mask = self._atom_mask(old_system.getNumParticles(), invert=True)
+        self._new_alchemical_atoms_mask = self._atom_mask(new_system.getNumParticles(), mapped_new_atoms)
+        self._new_alchemical_atoms_mask[np.flatnonzero(self._unique_new_atoms_mask)] = True
+        for mask in [self._unique_new_atoms_mask, self._unique_old_atoms_mask, self._old_alchemical_atoms_mask, self._new_alchemical_atoms_mask]:
+            mask.setflags(write=False)
+        self._atom_indices = dict()
+
+    @staticmethod
+    def _atom_mask(n_atoms, atom_indices=None, invert=False):
+        """
+        Generate a boolean mask over the atoms of a system.
+
+        Parameters
+        ----------
+        n_atoms : int
+            The number of atoms in the system
+        atom_indices : np.ndarray of int, optional, default=None
+            The indices of the atoms that are selected (if None, no atom is selected)
+        invert : bool, optional, default=False
+            If True, select all the atoms except atom_indices
+
+        Returns
+        -------
+        mask : [n_atoms] np.ndarray of bool
+            The mask of the selected atoms
+        """
+        mask = np.zeros(n_atoms, dtype=bool)
+        if atom_indices is not None:
+            mask[atom_indices] = True
+        if invert:
+            np.logical_not(mask, out=mask)
+        return mask
+
+    def _cached_atom_indices(self, name, mask):
+        """
+        Get the (cached) sorted tuple of the indices of the atoms selected by a mask.
+        """
+        if name not in self._atom_indices:
+            self._atom_indices[name] = tuple(np.flatnonzero(mask).tolist())
+        return self._atom_indices[name]
+
     @property
     def new_topology(self):
         return self._new_topology
@@ -797,22 +846,34 @@ class TopologyProposal(object):
         return self._old_to_new_atom_map
     @property
     def unique_new_atoms(self):
-        return self._unique_new_atoms
+        return self._cached_atom_indices('unique_new_atoms', self._unique_new_atoms_mask)
     @property
     def unique_old_atoms(self):
-        return self._unique_old_atoms
+        return self._cached_atom_indices('unique_old_atoms', self._unique_old_atoms_mask)
     @property
     def new_alchemical_atoms(self):
-        return list(self._new_alchemical_atoms)
+        return self._cached_atom_indices('new_alchemical_atoms', self._new_alchemical_atoms_mask)
     @property
     def old_alchemical_atoms(self):
-        return list(self._old_alchemical_atoms)
+        return self._cached_atom_indices('old_alchemical_atoms', self._old_alchemical_atoms_mask)
     @property
     def new_environment_atoms(self):
-        return list(self._new_environment_atoms)
+        return self._cached_atom_indices('new_environment_atoms', ~self._new_alchemical_atoms_mask)
     @property
     def old_environment_atoms(self):
-        return list(self._old_environment_atoms)
+        return self._cached_atom_indices('old_environment_atoms', ~self._old_alchemical_atoms_mask)
+    @property
+    def unique_new_atoms_mask(self):
+        return self._unique_new_atoms_mask
+    @property
+    def unique_old_atoms_mask(self):
+        return self._unique_old_atoms_mask
+    @property
+    def new_alchemical_atoms_mask(self):
+        return self._new_alchemical_atoms_mask
+    @property
+    def old_alchemical_atoms_mask(self):
+        return self._old_alchemical_atoms_mask
     @property
     def n_atoms_new(self):
         return self._new_system.getNumParticles()
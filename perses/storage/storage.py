@@ -319,3 +319,195 @@ class NetCDFStorageView(NetCDFStorage):
 
         if envname: self._envname = envname
         if modname: self._modname = modname
+
+################################################################################
+# NONEQUILIBRIUM WORK STORAGE
+################################################################################
+
+class NonequilibriumWorkStorage(object):
+    """Appendable NetCDF storage of the results of the nonequilibrium switching calculation of one phase.
+
+    The work of each protocol is stored in a single table indexed by (iteration, direction, replicate, work value),
+    where direction 0 is the forward protocol (started from lambda = 0) and direction 1 the reverse one (started from
+    lambda = 1). The shadow work, which is only measured over the whole protocol, is stored by (iteration, direction,
+    replicate). The reduced potential of the equilibrium sample at each endpoint, the reduced potential difference to
+    the nonalchemical endpoint, the equilibrium index of that sample (the number of rounds of equilibrium run at the
+    endpoint before it, including those of equilibration), and the frames that each round of equilibrium appended to
+    its trajectory are stored by (iteration, direction). Entries that have not been written are NaN (or -1 for the
+    equilibrium indices and frames).
+
+    NetCDF files cannot be safely written by several processes at once, so only one process (e.g. the process that
+    submits the tasks and gathers their results) should open the storage for writing; the workers return their
+    results to it.
+    """
+
+    work_types = ['cumulative_work', 'protocol_work']
+
+    def __init__(self, filename, mode='a'):
+        """Create the storage, or open an existing one.
+
+        Parameters
+        ----------
+        filename : str
+           Name of storage file to bind to.
+        mode : str, optional, default='a'
+           File open mode, 'w' for (over)write, 'a' to append to the file (which is created if it does not exist),
+           or 'r' to read it.
+        """
+        if mode == 'a' and not os.path.exists(filename):
+            mode = 'w'
+        self._filename = filename
+        self._ncfile = netcdf.Dataset(self._filename, mode=mode)
+
+        if mode == 'w':
+            self._ncfile.createDimension('iteration', size=None)
+            self._ncfile.createDimension('replicate', size=None)
+            self._ncfile.createDimension('direction', size=2)
+            self._ncfile.createDimension('frame_range', size=2)
+            for varname in ['equilibrium_reduced_potential', 'reduced_potential_difference']:
+                self._ncfile.createVariable(varname, 'f8', dimensions=('iteration', 'direction'), fill_value=np.nan)
+            self._ncfile.createVariable('shadow_work', 'f8', dimensions=('iteration', 'direction', 'replicate'), fill_value=np.nan)
+            self._ncfile.createVariable('equilibrium_index', 'i8', dimensions=('iteration', 'direction'), fill_value=-1)
+            self._ncfile.createVariable('equilibrium_trajectory_frames', 'i8', dimensions=('iteration', 'direction', 'frame_range'),
+                                        fill_value=-1)
+
+        # unwritten entries are read as NaN rather than masked (this only applies to the variables that exist when it
+        # is called, so it is repeated whenever a variable is created)
+        self._ncfile.set_auto_mask(False)
+
+    def _work_variable(self, work_type, n_work_values):
+        """Retrieve the variable of the given work type, creating it if it does not exist.
+        """
+        if work_type not in self.work_types:
+            raise ValueError("Unknown work type %s; must be one of %s" % (work_type, str(self.work_types)))
+
+        if 'work_value' not in self._ncfile.dimensions:
+            self._ncfile.createDimension('work_value', size=n_work_values)
+        elif self._ncfile.dimensions['work_value'].size != n_work_values:
+            raise ValueError("%s has %d work values, but the storage holds %d per protocol" % (work_type, n_work_values,
+                             self._ncfile.dimensions['work_value'].size))
+
+        if work_type not in self._ncfile.variables:
+            self._ncfile.createVariable(work_type, 'f8', dimensions=('iteration', 'direction', 'replicate', 'work_value'),
+                                        chunksizes=(1, 1, 1, n_work_values), fill_value=np.nan)
+            self._ncfile.set_auto_mask(False)
+        return self._ncfile.variables[work_type]
+
+    def write_nonequilibrium_result(self, iteration, direction, nonequilibrium_result, replicate=0):
+        """Write the work of a nonequilibrium switching protocol.
+
+        Parameters
+        ----------
+        iteration : int
+            The iteration of the calculation
+        direction : int
+            0 for the forward protocol (from lambda = 0), 1 for the reverse protocol (from lambda = 1)
+        nonequilibrium_result : perses.dispersed.feptasks.NonequilibriumResult
+            The cumulative, protocol and shadow work of the protocol
+        replicate : int, optional, default=0
+            The index of the protocol among those run from the same iteration and direction
+        """
+        for work_type in self.work_types:
+            work = np.asarray(getattr(nonequilibrium_result, work_type))
+            self._work_variable(work_type, len(work))[iteration, direction, replicate, :] = work
+        self._ncfile.variables['shadow_work'][iteration, direction, replicate] = nonequilibrium_result.shadow_work
+
+    def write_equilibrium_result(self, iteration, direction, equilibrium_result, reduced_potential_difference=None,
+                                 equilibrium_index=None):
+        """Write the result of a round of equilibrium sampling at one of the endpoints.
+
+        Parameters
+        ----------
+        iteration : int
+            The iteration of the calculation
+        direction : int
+            0 for the equilibrium at lambda = 0, from which the forward protocol is started, 1 for lambda = 1
+        equilibrium_result : perses.dispersed.feptasks.EquilibriumResult
+            The reduced potential of the final sample, and the frames written to the equilibrium trajectory (if any)
+        reduced_potential_difference : float, optional, default=None
+            The reduced potential difference from the hybrid endpoint to the nonalchemical endpoint
+        equilibrium_index : int, optional, default=None
+            The number of rounds of equilibrium run at the endpoint before this one, so that the samples of the
+            initial (unequilibrated) part of the endpoint's chain can be discarded
+        """
+        self._ncfile.variables['equilibrium_reduced_potential'][iteration, direction] = equilibrium_result.reduced_potential
+        if reduced_potential_difference is not None:
+            self._ncfile.variables['reduced_potential_difference'][iteration, direction] = reduced_potential_difference
+        if equilibrium_index is not None:
+            self._ncfile.variables['equilibrium_index'][iteration, direction] = equilibrium_index
+        if equilibrium_result.trajectory_frames is not None:
+            self._ncfile.variables['equilibrium_trajectory_frames'][iteration, direction, :] = equilibrium_result.trajectory_frames
+
+    def read_work(self, work_type='cumulative_work'):
+        """Read the work of all the protocols.
+
+        Parameters
+        ----------
+        work_type : str, optional, default='cumulative_work'
+            One of 'cumulative_work' or 'protocol_work'
+
+        Returns
+        -------
+        work : numpy.array of shape [n_iterations, 2, n_replicates, n_work_values]
+            The work (in kT), indexed by (iteration, direction, replicate, work value)
+        """
+        if work_type not in self.work_types:
+            raise ValueError("Unknown work type %s; must be one of %s" % (work_type, str(self.work_types)))
+        if work_type not in self._ncfile.variables:
+            raise ValueError("No %s has been written to %s" % (work_type, self._filename))
+        return self._ncfile.variables[work_type][:]
+
+    def read_total_work(self):
+        """Read the total work of all the protocols.
+
+        Returns
+        -------
+        total_work : numpy.array of shape [n_iterations, 2, n_replicates]
+            The final cumulative work (in kT), indexed by (iteration, direction, replicate)
+        """
+        return self.read_work('cumulative_work')[:, :, :, -1]
+
+    def read_shadow_work(self):
+        """Read the shadow work (in kT) of all the protocols, indexed by (iteration, direction, replicate).
+        """
+        return self._ncfile.variables['shadow_work'][:]
+
+    def read_equilibrium_reduced_potentials(self):
+        """Read the reduced potentials of the equilibrium samples, indexed by (iteration, direction).
+        """
+        return self._ncfile.variables['equilibrium_reduced_potential'][:]
+
+    def read_reduced_potential_differences(self):
+        """Read the reduced potential differences to the nonalchemical endpoints, indexed by (iteration, direction).
+        """
+        return self._ncfile.variables['reduced_potential_difference'][:]
+
+    def read_equilibrium_indices(self):
+        """Read the equilibrium indices of the equilibrium samples, indexed by (iteration, direction).
+        """
+        return self._ncfile.variables['equilibrium_index'][:]
+
+    def read_equilibrium_trajectory_frames(self):
+        """Read the (start, stop) frames written to the equilibrium trajectories, indexed by (iteration, direction).
+        """
+        return self._ncfile.variables['equilibrium_trajectory_frames'][:]
+
+    @property
+    def n_iterations(self):
+        """The number of iterations in the storage.
+        """
+        return self._ncfile.dimensions['iteration'].size
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def sync(self):
+        """Flush write buffer.
+        """
+        self._ncfile.sync()
+
+    def close(self):
+        """Close the storage layer.
+        """
+        self._ncfile.close()
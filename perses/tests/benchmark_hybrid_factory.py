@@ -0,0 +1,217 @@
+"""
+Benchmark the construction of HybridTopologyFactory objects for systems of increasing size.
+
+Each construction stage (each of the handle_* methods and the other steps of HybridTopologyFactory.__init__) is timed
+separately, and the results are written as JSON so that regressions in build time and memory can be tracked.
+Each case runs in its own process, so that the memory of one case does not hide that of the next. The memory is measured
+around the construction of the factory only, not the generation of the transformation.
+
+The systems grow in three families: small molecule pairs in vacuum, small molecule pairs in water, and a small molecule
+pair in increasingly large water boxes.
+
+Usage:
+
+    python -m perses.tests.benchmark_hybrid_factory [output.json]
+
+"""
+
+################################################################################
+# IMPORTS
+################################################################################
+
+from simtk import openmm, unit
+import collections
+import functools
+import gc
+import json
+import multiprocessing
+import resource
+import sys
+import time
+
+from perses.annihilation.new_relative import HybridTopologyFactory
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+# pairs of molecules (by IUPAC name) for small molecule transformations, in increasing size
+vacuum_pairs = [('propane', 'butane'), ('pentane', 'butane'), ('benzene', 'toluene'), ('naphthalene', 'benzene'), ('biphenyl', 'benzene')]
+solvated_pairs = [('propane', 'butane'), ('naphthalene', 'benzene')]
+# solvent padding of the boxes in which the box scaling pair is transformed
+box_scaling_pair = ('naphthalene', 'benzene')
+box_scaling_paddings = [0.9, 1.2, 1.6, 2.0, 2.5] * unit.nanometers
+
+# the stages of HybridTopologyFactory.__init__ that are timed
+factory_stages = ['_determine_atom_classes', '_generate_dict_from_exceptions', '_handle_constraints', '_handle_virtual_sites',
+                  '_add_bond_force_terms', '_add_angle_force_terms', '_add_torsion_force_terms', '_add_nonbonded_force_terms',
+                  'handle_harmonic_bonds', 'handle_harmonic_angles', 'handle_periodic_torsion_force', 'handle_nonbonded',
+                  '_compute_hybrid_positions', '_create_topology']
+
+################################################################################
+# UTILITIES
+################################################################################
+
+def _timed_stage(method):
+    """
+    Wrap a stage of the factory construction to accumulate its wall clock time in self.stage_timings.
+    """
+    @functools.wraps(method)
+    def timed_method(self, *args, **kwargs):
+        initial_time = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.stage_timings[method.__name__] += time.perf_counter() - initial_time
+    return timed_method
+
+class _TimedHybridTopologyFactory(HybridTopologyFactory):
+    """
+    HybridTopologyFactory which records the time spent in each construction stage in stage_timings.
+    """
+    def __init__(self, *args, **kwargs):
+        self.stage_timings = collections.OrderedDict((stage, 0.0) for stage in factory_stages)
+        super(_TimedHybridTopologyFactory, self).__init__(*args, **kwargs)
+
+for _stage in factory_stages:
+    setattr(_TimedHybridTopologyFactory, _stage, _timed_stage(getattr(HybridTopologyFactory, _stage)))
+
+def _peak_rss_megabytes():
+    """
+    The peak resident set size of this process in MB.
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, and in kB elsewhere
+    return peak_rss / 1024.0**2 if sys.platform == 'darwin' else peak_rss / 1024.0
+
+def _current_rss_megabytes():
+    """
+    The current resident set size of this process in MB, or None if it is not available (it is read from /proc).
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (IOError, OSError):
+        return None
+    return resident_pages * resource.getpagesize() / 1024.0**2
+
+def measure_factory_construction(topology_proposal, old_positions, new_positions, **factory_kwargs):
+    """
+    Build a HybridTopologyFactory, and measure the time spent in each stage and the memory used.
+
+    Parameters
+    ----------
+    topology_proposal : perses.rjmc.topology_proposal.TopologyProposal
+        The transformation
+    old_positions : [n, 3] np.ndarray of float with units
+        The positions of the old system
+    new_positions : [m, 3] np.ndarray of float with units
+        The positions of the new system
+    factory_kwargs : dict
+        Additional arguments to HybridTopologyFactory
+
+    Returns
+    -------
+    measurement : dict
+        The number of old, new and hybrid atoms, the total construction time (s), the time of each stage (s), the
+        time spent outside of the timed stages (s), the resident memory retained by the factory (MB, None if it cannot
+        be measured), and the increase of the peak resident memory of the process during construction (MB, zero if
+        construction stays below the peak reached while generating the transformation)
+    """
+    # take the memory baseline just before construction, so that the transformation is not counted
+    gc.collect()
+    initial_rss = _current_rss_megabytes()
+    initial_peak_rss = _peak_rss_megabytes()
+
+    initial_time = time.perf_counter()
+    factory = _TimedHybridTopologyFactory(topology_proposal, old_positions, new_positions, **factory_kwargs)
+    total_time = time.perf_counter() - initial_time
+
+    final_rss = _current_rss_megabytes()
+    retained_rss = final_rss - initial_rss if initial_rss is not None and final_rss is not None else None
+
+    return {'n_atoms_old': topology_proposal.n_atoms_old, 'n_atoms_new': topology_proposal.n_atoms_new,
+            'n_atoms_hybrid': factory.hybrid_system.getNumParticles(),
+            'total_time': total_time, 'stage_times': dict(factory.stage_timings),
+            'other_time': total_time - sum(factory.stage_timings.values()),
+            'retained_rss_mb': retained_rss, 'peak_rss_increase_mb': _peak_rss_megabytes() - initial_peak_rss}
+
+################################################################################
+# CASES
+################################################################################
+
+def _run_case(case):
+    """
+    Generate the transformation of a benchmark case, and measure the construction of its hybrid factory.
+
+    Parameters
+    ----------
+    case : dict
+        The 'kind' of the case ('vacuum' or 'solvated'), the molecule names and, for solvated cases, optionally the
+        solvent padding in nm
+
+    Returns
+    -------
+    result : dict
+        The case, and the measurement of measure_factory_construction
+    """
+    from perses.tests import utils
+    result = dict(case)
+    if case['kind'] == 'vacuum':
+        proposal = utils.generate_vacuum_topology_proposal(current_mol_name=case['old'], proposed_mol_name=case['new'])
+    elif case['kind'] == 'solvated':
+        solvation_kwargs = {'padding': case['padding_nm'] * unit.nanometers} if 'padding_nm' in case else {}
+        proposal = utils.generate_solvated_hybrid_test_topology(current_mol_name=case['old'], proposed_mol_name=case['new'], **solvation_kwargs)
+    else:
+        raise ValueError("Unknown benchmark case kind {}".format(case['kind']))
+    result.update(measure_factory_construction(*proposal))
+    return result
+
+################################################################################
+# BENCHMARKS
+################################################################################
+
+def benchmark_hybrid_factory_construction(output_filename='hybrid_factory_benchmark.json', cases=None):
+    """
+    Benchmark the construction of hybrid topology factories for vacuum small molecule pairs, solvated small molecule
+    pairs and a small molecule pair in increasingly large water boxes, and write the results as JSON.
+
+    Parameters
+    ----------
+    output_filename : str, optional, default='hybrid_factory_benchmark.json'
+        The JSON file to which the results are written
+    cases : list of dict, optional, default=None
+        The cases to run (see _run_case). If None, all the vacuum, solvated and box scaling cases are run.
+
+    Returns
+    -------
+    results : list of dict
+        The result of each case
+    """
+    if cases is None:
+        cases = [{'kind': 'vacuum', 'old': old, 'new': new} for old, new in vacuum_pairs]
+        cases += [{'kind': 'solvated', 'old': old, 'new': new} for old, new in solvated_pairs]
+        cases += [{'kind': 'solvated', 'old': box_scaling_pair[0], 'new': box_scaling_pair[1], 'padding_nm': padding}
+                  for padding in box_scaling_paddings.value_in_unit(unit.nanometers)]
+
+    # run each case in a fresh process, so that the peak memory is that of the case
+    results = []
+    pool = multiprocessing.get_context('spawn').Pool(processes=1, maxtasksperchild=1)
+    try:
+        for case in cases:
+            results.append(pool.apply(_run_case, (case,)))
+    finally:
+        pool.close()
+        pool.join()
+
+    benchmark = {'openmm_version': openmm.version.version, 'python_version': sys.version, 'results': results}
+    with open(output_filename, 'w') as outfile:
+        json.dump(benchmark, outfile, indent=2)
+
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        benchmark_hybrid_factory_construction(sys.argv[1])
+    else:
+        benchmark_hybrid_factory_construction()
@@ -691,3 +691,60 @@ def test_alchemical_elimination_peptide():
         f = partial(check_alchemical_null_elimination, topology_proposal, testsystem.positions, ncmc_nsteps=ncmc_nsteps)
         f.description = "Testing alchemical elimination using alanine dipeptide with %d NCMC steps" % ncmc_nsteps
         yield f
+
+def test_ncmc_hybrid_cache():
+    """
+    Test that the NCMCEngine hybrid factory cache is hit by new proposal objects for the same transformation, that
+    the positions of a cached factory are updated, and that the reverse transformation is derived from the cache.
+    """
+    from openmmtools import testsystems
+    from perses.rjmc.topology_proposal import TopologyProposal
+    from perses.annihilation.ncmc_switching import NCMCEngine
+    testsystem = testsystems.AlanineDipeptideVacuum()
+    # Remove the CMMotionRemover, which the hybrid topology factory does not handle
+    for force_index in reversed(range(testsystem.system.getNumForces())):
+        if testsystem.system.getForce(force_index).__class__.__name__ == 'CMMotionRemover':
+            testsystem.system.removeForce(force_index)
+
+    def make_topology_proposal(new_chemical_state_key='AA', old_chemical_state_key='AA'):
+        new_to_old_atom_map = { index : index for index in range(testsystem.system.getNumParticles()) if (index > 3) } # all atoms but N-methyl
+        return TopologyProposal(
+            old_system=testsystem.system, old_topology=testsystem.topology,
+            old_chemical_state_key=old_chemical_state_key, new_chemical_state_key=new_chemical_state_key,
+            new_system=testsystem.system, new_topology=testsystem.topology,
+            logp_proposal=0.0, new_to_old_atom_map=new_to_old_atom_map, metadata=dict())
+
+    functions = {
+        'lambda_sterics' : 'lambda',
+        'lambda_electrostatics' : 'lambda',
+        'lambda_bonds' : 'lambda',
+        'lambda_angles' : 'lambda',
+        'lambda_torsions' : 'lambda'
+    }
+    ncmc_engine = NCMCEngine(temperature=temperature, functions=functions, nsteps=1)
+    positions = testsystem.positions
+    factory = ncmc_engine.make_alchemical_system(make_topology_proposal(), positions, positions)
+    assert ncmc_engine.hybrid_cache_statistics == {'hits': 0, 'misses': 1, 'hit_rate': 0.0, 'reversals': 0}
+
+    displaced_positions = positions + 0.1 * unit.nanometers
+    cached_factory = ncmc_engine.make_alchemical_system(make_topology_proposal(), displaced_positions, displaced_positions)
+    assert cached_factory is factory
+    assert ncmc_engine.hybrid_cache_statistics == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'reversals': 0}
+    # The cached factory has the hybrid positions of a factory built from scratch for the displaced positions
+    from perses.annihilation.new_relative import HybridTopologyFactory
+    fresh_factory = HybridTopologyFactory(make_topology_proposal(), displaced_positions, displaced_positions)
+    assert np.allclose(cached_factory.hybrid_positions.value_in_unit(unit.nanometers), fresh_factory.hybrid_positions.value_in_unit(unit.nanometers))
+    assert np.allclose(cached_factory.old_positions(cached_factory.hybrid_positions).value_in_unit(unit.nanometers),
+                       np.array(displaced_positions.value_in_unit(unit.nanometers)))
+
+    # A different transformation is not a hit
+    forward_factory = ncmc_engine.make_alchemical_system(make_topology_proposal(new_chemical_state_key='AB'), positions, positions)
+    assert ncmc_engine.hybrid_cache_statistics['misses'] == 2
+
+    # The reverse transformation is derived from the cached forward factory, and has the new positions
+    reverse_factory = ncmc_engine.make_alchemical_system(make_topology_proposal(new_chemical_state_key='AA', old_chemical_state_key='AB'),
+                                                         displaced_positions, displaced_positions)
+    assert ncmc_engine.hybrid_cache_statistics['reversals'] == 1
+    assert reverse_factory.new_to_hybrid_atom_map == forward_factory.old_to_hybrid_atom_map
+    assert np.allclose(reverse_factory.old_positions(reverse_factory.hybrid_positions).value_in_unit(unit.nanometers),
+                       np.array(displaced_positions.value_in_unit(unit.nanometers)))
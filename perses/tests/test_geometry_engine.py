@@ -465,6 +465,67 @@ def test_angle_logp():
         # Raise exception
         raise Exception(msg)
 
+def test_pmf_cache():
+    """
+    Test that memoized bond and angle PMF tables match freshly computed ones and that the cache is bounded.
+    """
+    from perses.rjmc.geometry import FFAllAngleGeometryEngine
+    cached_engine = FFAllAngleGeometryEngine(pmf_cache_capacity=2)
+    uncached_engine = FFAllAngleGeometryEngine(pmf_cache_capacity=None)
+
+    testsystem = FourAtomValenceTestSystem(bond=True, angle=True, torsion=False)
+    bond_with_units = cached_engine._add_bond_units(testsystem.structure.bonds[0])
+    angle_with_units = cached_engine._add_angle_units(testsystem.structure.angles[0])
+
+    for repeat in range(3):
+        r_i, log_p_i, bin_width = cached_engine._bond_log_pmf(bond_with_units, beta, 1000)
+        theta_i, log_q_i, angle_bin_width = cached_engine._angle_log_pmf(angle_with_units, beta, 180)
+    assert (cached_engine.pmf_cache_misses == 2) and (cached_engine.pmf_cache_hits == 4)
+
+    reference_r_i, reference_log_p_i, reference_bin_width = uncached_engine._bond_log_pmf(bond_with_units, beta, 1000)
+    reference_theta_i, reference_log_q_i, reference_angle_bin_width = uncached_engine._angle_log_pmf(angle_with_units, beta, 180)
+    assert np.allclose(r_i, reference_r_i) and np.allclose(log_p_i, reference_log_p_i) and np.isclose(bin_width, reference_bin_width)
+    assert np.allclose(theta_i, reference_theta_i) and np.allclose(log_q_i, reference_log_q_i) and np.isclose(angle_bin_width, reference_angle_bin_width)
+
+    # A table with a different number of divisions is a different entry, evicting the least recently used one
+    cached_engine._bond_log_pmf(bond_with_units, beta, 500)
+    assert cached_engine.pmf_cache_misses == 3
+    assert len(cached_engine._pmf_cache) == 2
+
+def test_analytic_bond_angle_sampling():
+    """
+    Test the analytic bond and angle samplers: the log densities must be normalized, and samples are compared
+    to the corresponding CDFs with a Kolmogorov-Smirnov test.
+    """
+    NSAMPLES = 1000
+    from perses.rjmc.geometry import FFAllAngleGeometryEngine
+    from scipy import integrate
+    import scipy.stats as stats
+    geometry_engine = FFAllAngleGeometryEngine(bond_angle_sampling='analytic', bond_softening_constant=0.01)
+
+    testsystem = FourAtomValenceTestSystem(bond=True, angle=True, torsion=False)
+    bond_with_units = geometry_engine._add_bond_units(testsystem.structure.bonds[0])
+    angle_with_units = geometry_engine._add_angle_units(testsystem.structure.angles[0])
+
+    def tabulated_cdf(logp, lower, upper):
+        grid = np.linspace(lower, upper, 10001)
+        pdf = np.exp([logp(x) for x in grid])
+        cdf = integrate.cumulative_trapezoid(pdf, grid, initial=0.0)
+        assert np.isclose(cdf[-1], 1.0, atol=1.0e-4), 'density is not normalized'
+        return lambda xs: np.interp(xs, grid, cdf)
+
+    r0, sigma_r, r_mode, log_Z = geometry_engine._bond_density_parameters(bond_with_units, beta)
+    bond_cdf = tabulated_cdf(lambda r: geometry_engine._bond_logp(r, bond_with_units, beta, None), max(0.0, r0 - 10*sigma_r), r0 + 10*sigma_r)
+    angle_cdf = tabulated_cdf(lambda theta: geometry_engine._angle_logp(theta, angle_with_units, beta, None), 1.0e-6, np.pi - 1.0e-6)
+
+    bond_array = np.array([geometry_engine._propose_bond(bond_with_units, beta, None) for i in range(NSAMPLES)])
+    angle_array = np.array([geometry_engine._propose_angle(angle_with_units, beta, None) for i in range(NSAMPLES)])
+
+    for samples, cdf, name in [(bond_array, bond_cdf, 'bond'), (angle_array, angle_cdf, 'angle')]:
+        (dval, pval) = stats.kstest(samples, cdf)
+        if pval < pval_threshold:
+            raise Exception("The {} may be drawn from the wrong distribution. p = {}".format(name, pval))
+
 def test_add_bond_units():
     """
     Test that the geometry engine adds the correct units and value to bonds when replacing the default non-unit-bearing parmed
@@ -634,6 +695,62 @@ def test_torsion_log_discrete_pdf():
     if np.max(deviation) > 1.0e-4:
         raise Exception("Torsion pmf didn't match expected.")
 
+def test_batched_torsion_log_pmf():
+    """
+    Check that the batched torsion scan (GrowthSystemEnergyEvaluator) reproduces the per-bin OpenMM torsion scan.
+    """
+    from perses.rjmc.geometry import FFAllAngleGeometryEngine, GeometrySystemGenerator, GrowthSystemEnergyEvaluator
+
+    n_divisions = 360
+    geometry_engine = FFAllAngleGeometryEngine()
+
+    #Create a testsystem with a bond, angle, and torsion, and a growth system that places atom 0
+    testsystem = FourAtomValenceTestSystem(bond=True, angle=True, torsion=True)
+    torsion_atom_indices = [0, 1, 2, 3]
+    growth_system_generator = GeometrySystemGenerator(testsystem.system, [torsion_atom_indices], global_parameter_name='growth_stage', neglect_angles=False)
+    growth_system = growth_system_generator.get_modified_system()
+    context = openmm.Context(growth_system, openmm.VerletIntegrator(1.0), openmm.Platform.getPlatformByName("Reference"))
+    growth_system_generator.set_growth_parameter_index(1, context)
+
+    r, theta, phi = testsystem.internal_coordinates
+    logp_torsions, phis, bin_width, logq = geometry_engine._torsion_log_pmf(context, torsion_atom_indices, testsystem.positions, r, theta, beta, n_divisions, None, None)
+
+    energy_evaluator = GrowthSystemEnergyEvaluator(growth_system)
+    batched_logp_torsions, batched_phis, batched_bin_width, batched_logq = geometry_engine._torsion_log_pmf(context, torsion_atom_indices, testsystem.positions, r, theta, beta, n_divisions, None, None, energy_evaluator=energy_evaluator)
+
+    assert np.allclose(phis, batched_phis) and (bin_width == batched_bin_width)
+    assert np.allclose(logq, batched_logq, rtol=1.0e-8, atol=1.0e-6), "Batched torsion scan energies do not match per-bin OpenMM energies"
+    assert np.allclose(logp_torsions, batched_logp_torsions, atol=1.0e-6)
+
+def test_valence_energy_kernel():
+    """
+    Check that the NumPy valence kernel reproduces growth context energies and Context-free torsion PMFs.
+    """
+    from perses.rjmc.geometry import FFAllAngleGeometryEngine, GeometrySystemGenerator, GrowthSystemEnergyEvaluator
+
+    n_divisions = 360
+    geometry_engine = FFAllAngleGeometryEngine()
+    testsystem = FourAtomValenceTestSystem(bond=True, angle=True, torsion=True)
+    torsion_atom_indices = [0, 1, 2, 3]
+    growth_system_generator = GeometrySystemGenerator(testsystem.system, [torsion_atom_indices], global_parameter_name='growth_stage', neglect_angles=False)
+    growth_system = growth_system_generator.get_modified_system()
+    context = openmm.Context(growth_system, openmm.VerletIntegrator(1.0), openmm.Platform.getPlatformByName("Reference"))
+    energy_evaluator = GrowthSystemEnergyEvaluator(growth_system)
+
+    for growth_index in [0, 1]:
+        growth_system_generator.set_growth_parameter_index(growth_index, context)
+        energy_evaluator.set_growth_parameter_index(growth_index)
+        context.setPositions(testsystem.positions)
+        reference_energy = context.getState(getEnergy=True).getPotentialEnergy().value_in_unit_system(unit.md_unit_system)
+        kernel_energy = energy_evaluator.compute_energy(testsystem.positions.value_in_unit_system(unit.md_unit_system))
+        assert np.isclose(reference_energy, kernel_energy, rtol=1.0e-8, atol=1.0e-6), "Valence kernel energy {} does not match OpenMM energy {}".format(kernel_energy, reference_energy)
+
+    r, theta, phi = testsystem.internal_coordinates
+    logp_torsions, phis, bin_width, logq = geometry_engine._torsion_log_pmf(context, torsion_atom_indices, testsystem.positions, r, theta, beta, n_divisions, None, None)
+    kernel_logp_torsions, kernel_phis, kernel_bin_width, kernel_logq = geometry_engine._torsion_log_pmf(None, torsion_atom_indices, testsystem.positions, r, theta, beta, n_divisions, None, None, energy_evaluator=energy_evaluator)
+    assert np.allclose(logq, kernel_logq, rtol=1.0e-8, atol=1.0e-6)
+    assert np.allclose(logp_torsions, kernel_logp_torsions, atol=1.0e-6)
+
 def calculate_torsion_discrete_log_pdf_manually(beta, torsion, phis):
     """
     Manually calculate the torsion potential for a series of phis and a given beta.
@@ -1280,6 +1397,202 @@ def run_geometry_engine(index=0):
     final_potential = state2.getPotentialEnergy()
     return final_potential / final_potential.unit
 
+def test_growth_cache():
+    """
+    Test that proposals reusing a cached growth system and Contexts are identical to uncached proposals.
+    """
+    from perses.rjmc.geometry import FFAllAngleGeometryEngine
+    from perses.tests.utils import generate_vacuum_topology_proposal
+    topology_proposal, old_positions, _ = generate_vacuum_topology_proposal(current_mol_name="benzene", proposed_mol_name="toluene")
+
+    cached_engine = FFAllAngleGeometryEngine(growth_cache_capacity=2)
+    uncached_engine = FFAllAngleGeometryEngine()
+    results = list()
+    for geometry_engine in [uncached_engine, cached_engine, cached_engine]:
+        # Reseed so that the same torsion proposal order is drawn every time
+        np.random.seed(0)
+        new_positions, logp_forward = geometry_engine.propose(topology_proposal, old_positions, beta)
+        results.append((new_positions.value_in_unit(unit.nanometers), logp_forward))
+
+    assert (cached_engine.growth_cache_misses == 1) and (cached_engine.growth_cache_hits == 1)
+    for new_positions, logp_forward in results[1:]:
+        assert np.allclose(new_positions, results[0][0])
+        assert np.isclose(logp_forward, results[0][1])
+
+def test_unitless_positions():
+    """
+    Test that proposals and reverse logp computed on unitless float64 positions are identical to those computed on Quantities.
+    """
+    from perses.rjmc.geometry import FFAllAngleGeometryEngine
+    from perses.tests.utils import generate_vacuum_topology_proposal
+    topology_proposal, old_positions, _ = generate_vacuum_topology_proposal(current_mol_name="benzene", proposed_mol_name="toluene")
+
+    results = list()
+    for use_unitless_positions in [False, True]:
+        geometry_engine = FFAllAngleGeometryEngine(use_unitless_positions=use_unitless_positions)
+        np.random.seed(0)
+        new_positions, logp_forward = geometry_engine.propose(topology_proposal, old_positions, beta)
+        logp_reverse = geometry_engine.logp_reverse(topology_proposal, new_positions, old_positions, beta)
+        check_dimensionality(new_positions, unit.nanometers)
+        results.append((new_positions.value_in_unit(unit.nanometers), logp_forward, logp_reverse))
+
+    assert np.allclose(results[0][0], results[1][0])
+    assert np.isclose(results[0][1], results[1][1])
+    assert np.isclose(results[0][2], results[1][2])
+
+def test_energy_validation_interval():
+    """
+    Test that proposals without energy validation report the same final reduced potential as validated proposals.
+    """
+    from perses.rjmc.geometry import FFAllAngleGeometryEngine
+    from perses.tests.utils import generate_vacuum_topology_proposal
+    topology_proposal, old_positions, _ = generate_vacuum_topology_proposal(current_mol_name="benzene", proposed_mol_name="toluene")
+
+    validated_engine = FFAllAngleGeometryEngine(energy_validation_interval=1)
+    unvalidated_engine = FFAllAngleGeometryEngine(energy_validation_interval=0)
+    results = list()
+    for geometry_engine in [validated_engine, unvalidated_engine]:
+        np.random.seed(0)
+        new_positions, logp_forward = geometry_engine.propose(topology_proposal, old_positions, beta)
+        results.append((logp_forward, geometry_engine.forward_final_context_reduced_potential))
+
+    assert np.isclose(results[0][0], results[1][0])
+    assert np.isclose(results[0][1], results[1][1], rtol=1.0e-3)
+
+def test_sterics_growth_subsystem():
+    """
+    Test that a sterics growth system restricted to the surroundings of the growing residue reproduces the
+    growth energies of the full solvated system at every growth stage.
+    """
+    from openmmtools.testsystems import AlanineDipeptideExplicit
+    from perses.rjmc.geometry import FFAllAngleGeometryEngine, GeometrySystemGenerator
+    testsystem = AlanineDipeptideExplicit(constraints=None)
+    torsion_proposal_order = [[0, 1, 4, 5], [2, 1, 4, 5], [3, 1, 4, 5]] # methyl hydrogens of the ACE cap
+
+    geometry_engine = FFAllAngleGeometryEngine(sterics_subsystem_radius=1.2*unit.nanometers)
+    geometry_engine.use_sterics = True
+    growth_subsystem = geometry_engine._create_growth_subsystem(testsystem.system, testsystem.topology, torsion_proposal_order, testsystem.positions)
+    assert len(growth_subsystem['atom_indices']) < testsystem.system.getNumParticles()
+
+    growth_system_generator = GeometrySystemGenerator(testsystem.system, torsion_proposal_order, global_parameter_name='growth_stage', use_sterics=True)
+    platform = openmm.Platform.getPlatformByName('Reference')
+    context = openmm.Context(growth_system_generator.get_modified_system(), openmm.VerletIntegrator(1.0), platform)
+    context.setPositions(testsystem.positions)
+    subsystem_context = growth_subsystem['context']
+    subsystem_context.setPositions(growth_subsystem['positions'])
+    for growth_stage in range(1, len(torsion_proposal_order) + 1):
+        growth_system_generator.set_growth_parameter_index(growth_stage, context)
+        growth_subsystem['growth_system_generator'].set_growth_parameter_index(growth_stage, subsystem_context)
+        energy = context.getState(getEnergy=True).getPotentialEnergy().value_in_unit(unit.kilojoules_per_mole)
+        subsystem_energy = subsystem_context.getState(getEnergy=True).getPotentialEnergy().value_in_unit(unit.kilojoules_per_mole)
+        assert np.isclose(energy, subsystem_energy, rtol=1.0e-5)
+
+def test_sterics_growth_subsystem_proposal():
+    """
+    Test that a proposal with a sterics growth subsystem builds no full-system growth system or Contexts, takes the
+    periodic box of the proposal, and proposes the same positions with the same logp as one over the full system.
+    """
+    from openmmtools.testsystems import AlanineDipeptideExplicit
+    from perses.rjmc.geometry import FFAllAngleGeometryEngine
+    import perses.rjmc.topology_proposal as topology_proposal
+    testsystem = AlanineDipeptideExplicit(constraints=None)
+    unique_atoms = [0, 2, 3] # methyl hydrogens of the ACE cap
+    atom_map = {index: index for index in range(testsystem.system.getNumParticles()) if index not in unique_atoms}
+    top_proposal = topology_proposal.TopologyProposal(new_topology=testsystem.topology, new_system=testsystem.system, old_topology=testsystem.topology, old_system=testsystem.system,
+                                                      old_chemical_state_key='A', new_chemical_state_key='B', logp_proposal=0.0, new_to_old_atom_map=atom_map)
+
+    results = list()
+    for sterics_subsystem_radius in [None, 1.2*unit.nanometers]:
+        geometry_engine = FFAllAngleGeometryEngine(sterics_subsystem_radius=sterics_subsystem_radius, energy_validation_interval=0)
+        geometry_engine.use_sterics = True
+        np.random.seed(0)
+        new_positions, logp_forward = geometry_engine.propose(top_proposal, testsystem.positions, beta)
+        results.append((new_positions.value_in_unit(unit.nanometers), logp_forward))
+
+    assert np.allclose(results[0][0], results[1][0])
+    assert np.isclose(results[0][1], results[1][1])
+
+    # the full-system growth system and its Contexts are left to the subsystem of each proposal
+    torsion_proposal_order = [[0, 1, 4, 5], [2, 1, 4, 5], [3, 1, 4, 5]]
+    growth_cache_entry = geometry_engine._get_growth_cache_entry(top_proposal, torsion_proposal_order, 'forward')
+    assert growth_cache_entry['growth_system_generator'] is None
+    assert growth_cache_entry['context'] is None and growth_cache_entry['atoms_with_positions_context'] is None
+
+    # the subsystem takes the periodic box it is given, rather than the default one of the system
+    box_vectors = [vector * 1.1 for vector in testsystem.system.getDefaultPeriodicBoxVectors()]
+    growth_subsystem = geometry_engine._create_growth_subsystem(testsystem.system, testsystem.topology, torsion_proposal_order, testsystem.positions, box_vectors=box_vectors)
+    for vector, subsystem_vector in zip(box_vectors, growth_subsystem['system'].getDefaultPeriodicBoxVectors()):
+        assert np.allclose(vector.value_in_unit(unit.nanometers), subsystem_vector.value_in_unit(unit.nanometers))
+
+def test_geometry_system_generator_partition():
+    """
+    Test that GeometrySystemGenerator assigns each valence term involving new atoms to the growth system with the
+    growth index of _calculate_growth_idx, and that the growth and atoms_with_positions systems together reproduce
+    the valence energy of the reference system.
+    """
+    from openmmtools.testsystems import AlanineDipeptideVacuum
+    from perses.rjmc.geometry import GeometrySystemGenerator
+    testsystem = AlanineDipeptideVacuum(constraints=None)
+    torsion_proposal_order = [[10, 8, 6, 4], [11, 10, 8, 6], [12, 10, 8, 6], [13, 10, 8, 6]] # alanine side chain
+    growth_indices = [torsion[0] for torsion in torsion_proposal_order]
+    growth_system_generator = GeometrySystemGenerator(testsystem.system, torsion_proposal_order, global_parameter_name='growth_stage', neglect_angles=False)
+    growth_system = growth_system_generator.get_modified_system()
+
+    for force in growth_system.getForces():
+        term_name = {'CustomBondForce': 'Bond', 'CustomAngleForce': 'Angle', 'CustomTorsionForce': 'Torsion'}[force.__class__.__name__]
+        n_terms = getattr(force, 'getNum{}s'.format(term_name))()
+        assert n_terms > 0
+        for term_index in range(n_terms):
+            term_parameters = getattr(force, 'get{}Parameters'.format(term_name))(term_index)
+            particles, growth_idx = term_parameters[:-1], term_parameters[-1][-1]
+            assert growth_idx == growth_system_generator._calculate_growth_idx(particles, growth_indices) > 0
+
+    valence_system = copy.deepcopy(testsystem.system)
+    for force_index in reversed(range(valence_system.getNumForces())):
+        if valence_system.getForce(force_index).__class__.__name__ not in ['HarmonicBondForce', 'HarmonicAngleForce', 'PeriodicTorsionForce']:
+            valence_system.removeForce(force_index)
+    energies = list()
+    for system in [valence_system, growth_system, growth_system_generator._atoms_with_positions_system]:
+        context = openmm.Context(system, openmm.VerletIntegrator(1.0), openmm.Platform.getPlatformByName('Reference'))
+        context.setPositions(testsystem.positions)
+        energies.append(context.getState(getEnergy=True).getPotentialEnergy().value_in_unit(unit.kilojoules_per_mole))
+    assert np.isclose(energies[0], energies[1] + energies[2])
+
+def test_networkx_proposal_order_choices():
+    """
+    Test that the torsion chosen for each atom by NetworkXProposalOrder is eligible, and that logp_choice counts
+    the eligible torsions found by a full traversal of the residue graph at each step.
+    """
+    import networkx as nx
+    from types import SimpleNamespace
+    from openmmtools.testsystems import AlanineDipeptideVacuum
+    from perses.rjmc.geometry import NetworkXProposalOrder
+    testsystem = AlanineDipeptideVacuum(constraints=None)
+    atoms = list(testsystem.topology.atoms())
+    alanine = list(testsystem.topology.residues())[1]
+    unique_new_atoms = [atom.index for atom in alanine.atoms() if atom.name not in ['N', 'H', 'CA', 'C', 'O']]
+    new_to_old_atom_map = {index: index for index in range(testsystem.system.getNumParticles()) if index not in unique_new_atoms}
+    topology_proposal = SimpleNamespace(new_topology=testsystem.topology, new_system=testsystem.system, unique_new_atoms=unique_new_atoms, new_to_old_atom_map=new_to_old_atom_map)
+
+    for seed in range(5):
+        np.random.seed(seed)
+        proposal_order_tool = NetworkXProposalOrder(topology_proposal)
+        residue_graph = proposal_order_tool._residue_graph
+        torsion_proposal_order, logp_choice = proposal_order_tool.determine_proposal_order()
+        assert sorted(torsion[0] for torsion in torsion_proposal_order) == sorted(unique_new_atoms)
+
+        atoms_with_positions = set(new_to_old_atom_map.keys())
+        for torsion, logp in zip(torsion_proposal_order, logp_choice):
+            # Atoms of the same element class (heavy or hydrogen) that remain to be placed
+            is_hydrogen = (atoms[torsion[0]].element.symbol == 'H')
+            remaining_atoms = [index for index in unique_new_atoms if (index not in atoms_with_positions) and ((atoms[index].element.symbol == 'H') == is_hydrogen)]
+            eligible_torsions = [path for atom_index in remaining_atoms
+                                 for path in nx.single_source_shortest_path(residue_graph, atom_index, cutoff=4).values()
+                                 if len(path) == 4 and set(path[1:]).issubset(atoms_with_positions)]
+            assert torsion in eligible_torsions
+            assert np.isclose(logp, -np.log(len(eligible_torsions)))
+            atoms_with_positions.add(torsion[0])
+
 def test_existing_coordinates():
     """
     for each torsion, calculate position of atom1
@@ -480,6 +480,161 @@ def test_position_output():
     assert np.all(np.isclose(old_positions.in_units_of(unit.nanometers), old_positions_factory.in_units_of(unit.nanometers)))
     assert np.all(np.isclose(new_positions.in_units_of(unit.nanometers), new_positions_factory.in_units_of(unit.nanometers)))
 
+    #the unitless variants should return the same positions as plain arrays in nm
+    hybrid_positions = factory._compute_hybrid_positions(unitless=True)
+    assert isinstance(hybrid_positions, np.ndarray)
+    assert np.all(hybrid_positions == factory.hybrid_positions.value_in_unit(unit.nanometers))
+    assert np.all(factory.old_positions(hybrid_positions, unitless=True) == old_positions_factory.value_in_unit(unit.nanometers))
+    assert np.all(factory.new_positions(factory.hybrid_positions, unitless=True) == new_positions_factory.value_in_unit(unit.nanometers))
+
+def test_find_parameters():
+    """
+    Test that the indexed parameter lookups of the factory agree with a linear search through the forces, including
+    for terms added to a force after its lookup table was built
+    """
+    topology_proposal, old_positions, new_positions = utils.generate_vacuum_topology_proposal(current_mol_name='propane', proposed_mol_name='pentane')
+    factory = HybridTopologyFactory(topology_proposal, old_positions, new_positions)
+    new_system_forces = {force.__class__.__name__: force for force in topology_proposal.new_system.getForces()}
+
+    bond_force = new_system_forces['HarmonicBondForce']
+    for bond_index in range(bond_force.getNumBonds()):
+        bond_parameters = bond_force.getBondParameters(bond_index)
+        assert factory._find_bond_parameters(bond_force, bond_parameters[1], bond_parameters[0]) == bond_parameters
+
+    torsion_force = new_system_forces['PeriodicTorsionForce']
+    for torsion_index in range(torsion_force.getNumTorsions()):
+        torsion_parameters = torsion_force.getTorsionParameters(torsion_index)
+        matching_torsions = [torsion_force.getTorsionParameters(index) for index in range(torsion_force.getNumTorsions())
+                             if set(torsion_force.getTorsionParameters(index)[:4]) == set(torsion_parameters[:4])]
+        assert factory._find_torsion_parameters(torsion_force, torsion_parameters[:4][::-1]) == matching_torsions
+
+    nonbonded_force = new_system_forces['NonbondedForce']
+    for exception_index in range(nonbonded_force.getNumExceptions()):
+        exception_parameters = nonbonded_force.getExceptionParameters(exception_index)
+        assert factory._find_exception(nonbonded_force, exception_parameters[1], exception_parameters[0]) == exception_parameters
+
+    # Terms added after a lookup are found
+    core_bond_force = factory._hybrid_system_forces['core_bond_force']
+    n_particles = factory.hybrid_system.getNumParticles()
+    assert not factory._find_bond_parameters(core_bond_force, n_particles, n_particles + 1)
+    core_bond_force.addBond(n_particles, n_particles + 1, [0.1, 1.0, 0.1, 1.0])
+    assert factory._find_bond_parameters(core_bond_force, n_particles + 1, n_particles)
+
+def test_hybrid_cache():
+    """
+    Test that a hybrid system reloaded from the on-disk cache is identical to the one that was built
+    """
+    import tempfile
+    topology_proposal, old_positions, new_positions = utils.generate_vacuum_topology_proposal(current_mol_name='propane', proposed_mol_name='pentane')
+    cache_directory = tempfile.mkdtemp()
+    factory = HybridTopologyFactory(topology_proposal, old_positions, new_positions, cache_directory=cache_directory)
+    cached_factory = HybridTopologyFactory(topology_proposal, old_positions, new_positions, cache_directory=cache_directory)
+    assert os.listdir(cache_directory) == [factory._cache_key]
+
+    assert openmm.XmlSerializer.serialize(cached_factory.hybrid_system) == openmm.XmlSerializer.serialize(factory.hybrid_system)
+    assert cached_factory.hybrid_topology == factory.hybrid_topology
+    assert np.all(cached_factory.hybrid_positions == factory.hybrid_positions)
+    assert cached_factory.old_to_hybrid_atom_map == factory.old_to_hybrid_atom_map
+    assert cached_factory.new_to_hybrid_atom_map == factory.new_to_hybrid_atom_map
+    assert cached_factory._atom_classes == factory._atom_classes
+    assert set(cached_factory._hybrid_system_forces.keys()) == set(factory._hybrid_system_forces.keys())
+
+    # Different options are cached separately
+    softened_factory = HybridTopologyFactory(topology_proposal, old_positions, new_positions, bond_softening_constant=0.5, cache_directory=cache_directory)
+    assert softened_factory._cache_key != factory._cache_key
+    assert len(os.listdir(cache_directory)) == 2
+
+def test_reverse_factory():
+    """
+    Test that the reverse factory exchanges the old and new systems, and that its hybrid system at lambda is the
+    forward hybrid system at 1 - lambda
+    """
+    topology_proposal, old_positions, new_positions = utils.generate_vacuum_topology_proposal(current_mol_name='propane', proposed_mol_name='pentane')
+    factory = HybridTopologyFactory(topology_proposal, old_positions, new_positions)
+    reverse_factory = factory.reverse()
+
+    assert reverse_factory.old_to_hybrid_atom_map == factory.new_to_hybrid_atom_map
+    assert reverse_factory.new_to_hybrid_atom_map == factory.old_to_hybrid_atom_map
+    assert reverse_factory._atom_classes['unique_old_atoms'] == factory._atom_classes['unique_new_atoms']
+    assert reverse_factory._atom_classes['unique_new_atoms'] == factory._atom_classes['unique_old_atoms']
+    assert reverse_factory._topology_proposal.old_chemical_state_key == topology_proposal.new_chemical_state_key
+    assert np.all(reverse_factory.old_positions(reverse_factory.hybrid_positions) == factory.new_positions(factory.hybrid_positions))
+
+    def compute_energy(hybrid_system, positions, lambda_value):
+        integrator = openmm.VerletIntegrator(1.0 * unit.femtoseconds)
+        context = openmm.Context(hybrid_system, integrator, openmm.Platform.getPlatformByName('Reference'))
+        context.setPositions(positions)
+        for parameter_name in context.getParameters():
+            if parameter_name.startswith('lambda'):
+                context.setParameter(parameter_name, lambda_value)
+        energy = context.getState(getEnergy=True).getPotentialEnergy().value_in_unit(unit.kilojoule_per_mole)
+        del context, integrator
+        return energy
+
+    for lambda_value in [0.0, 0.3, 1.0]:
+        forward_energy = compute_energy(factory.hybrid_system, factory.hybrid_positions, 1.0 - lambda_value)
+        reverse_energy = compute_energy(reverse_factory.hybrid_system, reverse_factory.hybrid_positions, lambda_value)
+        assert np.isclose(forward_energy, reverse_energy, rtol=1.0e-6)
+
+def test_freeze():
+    """
+    Test that a frozen factory is smaller when pickled, and still maps positions between the hybrid and the old and new systems
+    """
+    import pickle
+    topology_proposal, old_positions, new_positions = utils.generate_vacuum_topology_proposal(current_mol_name='propane', proposed_mol_name='pentane')
+    factory = HybridTopologyFactory(topology_proposal, old_positions, new_positions)
+    old_to_hybrid_atom_map = factory.old_to_hybrid_atom_map
+    new_to_hybrid_atom_map = factory.new_to_hybrid_atom_map
+    pickled_size = len(pickle.dumps(factory))
+
+    frozen_factory = pickle.loads(pickle.dumps(factory.freeze()))
+    assert len(pickle.dumps(frozen_factory)) < pickled_size
+    assert frozen_factory.old_to_hybrid_atom_map == old_to_hybrid_atom_map
+    assert frozen_factory.new_to_hybrid_atom_map == new_to_hybrid_atom_map
+    hybrid_positions = frozen_factory.hybrid_positions
+    assert np.all(frozen_factory.old_positions(hybrid_positions) == factory.old_positions(hybrid_positions))
+    assert np.all(frozen_factory.new_positions(hybrid_positions) == factory.new_positions(hybrid_positions))
+
+def test_lambda_schedule():
+    """
+    Test that the tabulated lambda functions and the lambda expressions of RelativeAlchemicalState agree with the
+    lambda functions, and that the table sets the parameters of the state
+    """
+    from perses.annihilation.lambda_protocol import RelativeAlchemicalState
+    master_lambdas = np.linspace(0.0, 1.0, 11)
+    lambda_table = RelativeAlchemicalState.compute_lambda_table(master_lambdas)
+    assert set(lambda_table.keys()) == set(RelativeAlchemicalState.lambda_expressions.keys())
+    assert set(lambda_table.keys()) == set(RelativeAlchemicalState.lambda_functions.keys())
+    assert np.allclose(lambda_table['lambda_sterics_insert'][[0, 2, 5, 10]], [0.0, 0.4, 1.0, 1.0])
+    assert np.allclose(lambda_table['lambda_sterics_delete'][[0, 5, 8, 10]], [0.0, 0.0, 0.6, 1.0])
+
+    # set the parameters of a state from the table
+    alchemical_state = RelativeAlchemicalState(**{parameter_name: 0.0 for parameter_name in RelativeAlchemicalState.lambda_functions})
+    alchemical_state.set_alchemical_parameters_from_table(lambda_table, 8)
+    for parameter_name, lambda_function in RelativeAlchemicalState.lambda_functions.items():
+        assert np.isclose(getattr(alchemical_state, parameter_name), lambda_function(master_lambdas[8]))
+
+    # evaluate the expressions with a CustomIntegrator on a fine grid (which includes the switch at lambda = 0.5)
+    system = openmm.System()
+    system.addParticle(1.0)
+    integrator = openmm.CustomIntegrator(1.0)
+    integrator.addGlobalVariable('lambda', 0.0)
+    for parameter_name, expression in RelativeAlchemicalState.lambda_expressions.items():
+        integrator.addGlobalVariable(parameter_name, 0.0)
+        integrator.addComputeGlobal(parameter_name, expression)
+    context = openmm.Context(system, integrator, openmm.Platform.getPlatformByName('Reference'))
+    context.setPositions([[0.0, 0.0, 0.0]] * unit.nanometers)
+
+    master_lambdas = np.linspace(0.0, 1.0, 101)
+    lambda_table = RelativeAlchemicalState.compute_lambda_table(master_lambdas)
+    for index, master_lambda in enumerate(master_lambdas):
+        integrator.setGlobalVariableByName('lambda', master_lambda)
+        integrator.step(1)
+        for parameter_name, lambda_function in RelativeAlchemicalState.lambda_functions.items():
+            assert np.isclose(lambda_table[parameter_name][index], lambda_function(master_lambda))
+            assert np.isclose(integrator.getGlobalVariableByName(parameter_name), lambda_function(master_lambda))
+    del context, integrator
+
 def test_generate_endpoint_thermodynamic_states():
     topology_proposal, current_positions, new_positions = utils.generate_vacuum_topology_proposal(current_mol_name='propane', proposed_mol_name='pentane')
     hybrid_factory = HybridTopologyFactory(topology_proposal, current_positions, new_positions, use_dispersion_correction=True)
@@ -67,6 +67,192 @@ def test_run_nonequilibrium_switching_move():
         assert context.getParameter("lambda_sterics") == 1.0
         assert integrator.getGlobalVariableByName("lambda") == 1.0
 
+def test_nonequilibrium_switching_move_work_interval():
+    """
+    Test that the NonequilibriumSwitchingMove switches lambda from 0 to 1 within the integrator, and records the work
+    (and configurations) at the requested interval
+    """
+    from perses.annihilation.lambda_protocol import RelativeAlchemicalState
+    cpd_thermodynamic_state, sampler_state, topology = generate_example_waterbox_states()
+    md_topology = md.Topology.from_openmm(topology)
+
+    for work_save_interval in [5, None]:
+        ne_move = feptasks.NonequilibriumSwitchingMove(default_forward_functions, "V R O H R V", 300.0*unit.kelvin, 10, 1.0*unit.femtoseconds,
+                                                       work_save_interval=work_save_interval, top=md_topology, save_configuration=True)
+        context, integrator = cache.global_context_cache.get_context(cpd_thermodynamic_state, ne_move._integrator)
+        ne_move.apply(cpd_thermodynamic_state, sampler_state)
+
+        n_work_values = 3 if work_save_interval == 5 else 2
+        assert context.getParameter("lambda_sterics") == 1.0
+        assert integrator.getGlobalVariableByName("lambda") == 1.0
+        assert ne_move.cumulative_work.shape == (n_work_values,)
+        assert ne_move.cumulative_work[0] == 0.0
+        assert np.all(np.isfinite(ne_move.cumulative_work))
+        assert ne_move.current_total_work == ne_move.cumulative_work[-1]
+        assert ne_move.trajectory.n_frames == n_work_values - 1
+
+    #the RelativeAlchemicalState lambda functions are compiled to their expressions, but other callables cannot be
+    assert RelativeAlchemicalState.compile_lambda_functions() == RelativeAlchemicalState.lambda_expressions
+    try:
+        RelativeAlchemicalState.compile_lambda_functions({'lambda_sterics_core': lambda x: x**2})
+    except ValueError:
+        pass
+    else:
+        raise Exception("An arbitrary function should not be compiled to an expression")
+    try:
+        feptasks.NonequilibriumSwitchingMove({'lambda_sterics': lambda x: x**2}, "V R O H R V", 300.0*unit.kelvin, 10, 1.0*unit.femtoseconds)
+    except ValueError:
+        pass
+    else:
+        raise Exception("The move should not accept a function that cannot be compiled to an expression")
+
+def test_nonequilibrium_switching_move_shadow_work_streaming():
+    """
+    Test that the shadow work of a NonequilibriumSwitchingMove streaming its trajectory to disk is computed from the final
+    energy of the protocol, rather than from the initial sampler state
+    """
+    import copy
+    import tempfile
+    cpd_thermodynamic_state, sampler_state, topology = generate_example_waterbox_states()
+    md_topology = md.Topology.from_openmm(topology)
+    trajectory_filename = os.path.join(tempfile.mkdtemp(), 'ncmc.dcd')
+
+    #the initial energy of the protocol is taken from the sampler state, so compute it first
+    context, integrator = cache.global_context_cache.get_context(cpd_thermodynamic_state)
+    sampler_state.apply_to_context(context)
+    context.setVelocitiesToTemperature(cpd_thermodynamic_state.temperature)
+    sampler_state.update_from_context(context)
+    initial_sampler_state = copy.deepcopy(sampler_state)
+
+    ne_move = feptasks.NonequilibriumSwitchingMove(default_forward_functions, "V R O H R V", 300.0*unit.kelvin, 10, 1.0*unit.femtoseconds,
+                                                   work_save_interval=5, top=md_topology, save_configuration=True,
+                                                   measure_shadow_work=True, trajectory_filename=trajectory_filename)
+    ne_move.apply(cpd_thermodynamic_state, sampler_state)
+    context, integrator = cache.global_context_cache.get_context(cpd_thermodynamic_state, ne_move._integrator)
+
+    #the sampler state holds the final configuration, and its energy is the one used for the shadow work
+    assert np.allclose(md.load(trajectory_filename, top=md_topology).xyz[-1], sampler_state.positions.value_in_unit(unit.nanometers), atol=1.0e-4)
+    initial_energy = ne_move._beta * (initial_sampler_state.potential_energy + initial_sampler_state.kinetic_energy)
+    final_energy = ne_move._beta * (sampler_state.potential_energy + sampler_state.kinetic_energy)
+    heat = integrator.get_heat(dimensionless=True)
+    assert np.isclose(ne_move.shadow_work, final_energy - initial_energy - (heat + ne_move.protocol_work[-1]))
+    assert final_energy != initial_energy
+
+def test_work_only_external_switching_move():
+    """
+    Test that the work-only mode of the ExternalNonequilibriumSwitchingMove records the same work as the default mode
+    at the requested interval, without saving a trajectory
+    """
+    import copy
+    cpd_thermodynamic_state, sampler_state, topology = generate_example_waterbox_states()
+    sampler_state.velocities = np.zeros([sampler_state.n_particles, 3]) * unit.nanometers / unit.picoseconds
+    python_functions = {'lambda_sterics': lambda x: x, 'lambda_electrostatics': lambda x: x}
+    nsteps_neq, work_save_interval = 10, 5
+
+    results = dict()
+    for work_only in [False, True]:
+        ne_move = feptasks.ExternalNonequilibriumSwitchingMove(python_functions, nsteps_neq=nsteps_neq, timestep=1.0*unit.femtoseconds,
+                                                               temperature=300.0*unit.kelvin, work_configuration_save_interval=work_save_interval,
+                                                               work_only=work_only)
+        #remove the friction (and hence the random forces) of the integrator, so that both modes follow the same trajectory.
+        #the context cache is emptied so that it does not hand back a cached integrator with friction
+        cache.global_context_cache.empty()
+        ne_move._integrator.setGlobalVariableByName("a", 1.0)
+        ne_move._integrator.setGlobalVariableByName("b", 0.0)
+        final_sampler_state = copy.deepcopy(sampler_state)
+        ne_move.apply(cpd_thermodynamic_state, final_sampler_state)
+        results[work_only] = ne_move, final_sampler_state
+
+    ne_move, final_sampler_state = results[False]
+    work_only_move, work_only_sampler_state = results[True]
+    assert work_only_move.cumulative_work.shape == (nsteps_neq // work_save_interval + 1,)
+    assert np.allclose(work_only_move.cumulative_work, ne_move.cumulative_work[::work_save_interval])
+    assert np.allclose(work_only_move.protocol_work, work_only_move.cumulative_work)
+    assert np.allclose(work_only_sampler_state.positions, final_sampler_state.positions)
+    try:
+        work_only_move.trajectory
+    except feptasks.NoTrajectoryException:
+        pass
+    else:
+        raise Exception("The work-only move should not save a trajectory")
+
+def test_external_switching_move_trajectory_streaming():
+    """
+    Test that the ExternalNonequilibriumSwitchingMove streams single precision frames of a subset of atoms to a
+    trajectory file at the save interval
+    """
+    import tempfile
+    cpd_thermodynamic_state, sampler_state, topology = generate_example_waterbox_states()
+    md_topology = md.Topology.from_openmm(topology)
+    python_functions = {'lambda_sterics': lambda x: x, 'lambda_electrostatics': lambda x: x}
+    atom_indices = np.arange(30)
+    trajectory_filename = os.path.join(tempfile.mkdtemp(), 'ncmc.dcd')
+
+    ne_move = feptasks.ExternalNonequilibriumSwitchingMove(python_functions, nsteps_neq=10, timestep=1.0*unit.femtoseconds,
+                                                           temperature=300.0*unit.kelvin, work_configuration_save_interval=5,
+                                                           trajectory_filename=trajectory_filename, topology=md_topology,
+                                                           atom_indices=atom_indices)
+    ne_move.apply(cpd_thermodynamic_state, sampler_state)
+
+    trajectory = md.load(trajectory_filename, top=md_topology.subset(atom_indices))
+    assert trajectory.n_frames == 2
+    assert trajectory.xyz.dtype == np.float32
+    final_positions = sampler_state.positions[atom_indices, :].value_in_unit(unit.nanometers)
+    assert np.allclose(trajectory.xyz[-1], final_positions, atol=1.0e-4)
+    try:
+        ne_move.trajectory
+    except feptasks.NoTrajectoryException:
+        pass
+    else:
+        raise Exception("A streamed trajectory should not be held in memory")
+
+def test_run_equilibrium_trajectory_append():
+    """
+    Test that successive calls to run_equilibrium append their frames to the trajectory file, and report the frames that
+    they wrote
+    """
+    import tempfile
+    cpd_thermodynamic_state, sampler_state, topology = generate_example_waterbox_states()
+    md_topology = md.Topology.from_openmm(topology)
+    atom_indices = list(range(30))
+    trajectory_filename = os.path.join(tempfile.mkdtemp(), 'equilibrium.h5')
+    n_iterations = 3
+
+    eq_result = feptasks.EquilibriumResult(sampler_state, 0.0)
+    for chunk in range(2):
+        eq_result = feptasks.run_equilibrium(eq_result, cpd_thermodynamic_state, 5, md_topology, n_iterations,
+                                             atom_indices_to_save=atom_indices, trajectory_filename=trajectory_filename)
+        assert eq_result.trajectory_frames == (chunk * n_iterations, (chunk + 1) * n_iterations)
+
+    trajectory = md.load(trajectory_filename)
+    assert trajectory.n_frames == 2 * n_iterations
+    assert trajectory.n_atoms == len(atom_indices)
+    assert trajectory.xyz.dtype == np.float32
+    final_positions = eq_result.sampler_state.positions[atom_indices, :].value_in_unit(unit.nanometers)
+    assert np.allclose(trajectory.xyz[-1], final_positions, atol=1.0e-4)
+
+def test_run_protocol_shadow_work_storage():
+    """
+    Test that the result of run_protocol measuring the shadow work can be written to the nonequilibrium work storage
+    """
+    import tempfile
+    from perses.storage import NonequilibriumWorkStorage
+    cpd_thermodynamic_state, sampler_state, topology = generate_example_waterbox_states()
+    md_topology = md.Topology.from_openmm(topology)
+
+    #the equilibrium result provides the energy of the initial sample, from which the shadow work is measured
+    eq_result = feptasks.run_equilibrium(feptasks.EquilibriumResult(sampler_state, 0.0), cpd_thermodynamic_state, 5, md_topology, 1)
+    ne_result = feptasks.run_protocol(eq_result, cpd_thermodynamic_state, default_forward_functions, 10, md_topology, 5,
+                                      measure_shadow_work=True)
+    assert np.ndim(ne_result.shadow_work) == 0
+
+    work_storage = NonequilibriumWorkStorage(os.path.join(tempfile.mkdtemp(), 'work.nc'), mode='w')
+    work_storage.write_nonequilibrium_result(0, 0, ne_result)
+    assert np.allclose(work_storage.read_work('cumulative_work')[0, 0, 0], ne_result.cumulative_work)
+    assert np.isclose(work_storage.read_shadow_work()[0, 0, 0], ne_result.shadow_work)
+    assert np.isnan(work_storage.read_shadow_work()[0, 1, 0])
+    work_storage.close()
+
 def test_run_cdk2_iterations():
     """
     Ensure that we can instantiate and run the cdk2 ligands in vacuum
@@ -92,25 +278,38 @@ def test_run_cdk2_iterations():
 
     n_work_values_per_iteration = length_of_protocol // write_interval
 
-    setup_dict = relative_setup.run_setup(setup_options)
-
-    setup_dict['ne_fep']['solvent'].run(n_iterations=n_iterations)
+    #run with and without measuring the shadow work, which is stored as a single value per protocol. The second
+    #calculation appends its iterations to the storage of the first one
+    for run_index, measure_shadow_work in enumerate([False, True]):
+        setup_options['measure_shadow_work'] = measure_shadow_work
+        setup_dict = relative_setup.run_setup(setup_options)
 
-    #now check that the correct number of iterations was written out:
-    os.chdir(setup_options['trajectory_directory'])
-    import glob
+        #the work is appended to the storage, so remove that of any previous test
+        if run_index == 0 and os.path.exists(setup_dict['ne_fep']['solvent'].work_storage_filename):
+            os.remove(setup_dict['ne_fep']['solvent'].work_storage_filename)
 
-    #for the verification of work writing, we add one to the work dimension, since the first work value is always zero
+        setup_dict['ne_fep']['solvent'].run(n_iterations=n_iterations)
+        iterations = slice(run_index * n_iterations, (run_index + 1) * n_iterations)
 
-    #check for lambda zero
-    lambda_zero_filenames = glob.glob("*0.cw.npy")
-    lambda_zero_npy = np.stack([np.load(filename) for filename in lambda_zero_filenames])
-    assert np.shape(lambda_zero_npy) == (n_iterations, n_work_values_per_iteration+1)
+        #now check that the correct number of iterations was written out:
+        from perses.storage import NonequilibriumWorkStorage
+        work_storage = NonequilibriumWorkStorage(setup_dict['ne_fep']['solvent'].work_storage_filename, mode='r')
 
-    #check for lambda one
-    lambda_one_filenames = glob.glob("*1.cw.npy")
-    lambda_one_npy = np.stack([np.load(filename) for filename in lambda_one_filenames])
-    assert np.shape(lambda_one_npy) == (n_iterations, n_work_values_per_iteration+1)
+        #for the verification of work writing, we add one to the work dimension, since the first work value is always zero
+        #the work is indexed by (iteration, direction, replicate, work value), for both lambda zero and lambda one
+        cumulative_work = work_storage.read_work('cumulative_work')
+        assert np.shape(cumulative_work) == ((run_index + 1) * n_iterations, 2, 1, n_work_values_per_iteration+1)
+        assert np.all(np.isfinite(cumulative_work))
+        assert np.all(np.isfinite(work_storage.read_reduced_potential_differences()))
+        shadow_work = work_storage.read_shadow_work()
+        assert np.shape(shadow_work) == ((run_index + 1) * n_iterations, 2, 1)
+        if measure_shadow_work:
+            assert np.all(np.isfinite(shadow_work[iterations]))
+        else:
+            assert np.all(shadow_work[iterations] == 0.0)
+        #each protocol starts from the sample of one more round of equilibrium than the previous one
+        assert np.all(work_storage.read_equilibrium_indices()[iterations] == np.arange(n_iterations)[:, np.newaxis])
+        work_storage.close()
 
 if __name__=="__main__":
     test_run_cdk2_iterations()
@@ -131,6 +131,35 @@ def test_write_object():
         assert ('iteration' in obj)
         assert (obj['iteration'] == iteration)
 
+def test_nonequilibrium_work_storage():
+    """Test appending nonequilibrium work to the work storage and reading it in bulk.
+    """
+    from perses.storage import NonequilibriumWorkStorage
+    from perses.dispersed.feptasks import EquilibriumResult, NonequilibriumResult
+    filename = os.path.join(tempfile.mkdtemp(), 'work.nc')
+    n_work_values = 5
+
+    # write two iterations, then append a third one after reopening the file
+    for iterations in [range(2), range(2, 3)]:
+        storage = NonequilibriumWorkStorage(filename, mode='a')
+        for iteration in iterations:
+            for direction in [0, 1]:
+                work = np.linspace(0.0, iteration + direction, n_work_values)
+                storage.write_nonequilibrium_result(iteration, direction, NonequilibriumResult(work, np.diff(work, prepend=0.0), 0.1 * direction))
+                storage.write_equilibrium_result(iteration, direction, EquilibriumResult(None, float(iteration), (iteration, iteration + 1)), 0.5, iteration + 10)
+        storage.close()
+
+    storage = NonequilibriumWorkStorage(filename, mode='r')
+    assert storage.n_iterations == 3
+    assert storage.read_work('cumulative_work').shape == (3, 2, 1, n_work_values)
+    assert np.allclose(storage.read_total_work()[:, :, 0], [[0.0, 1.0], [1.0, 2.0], [2.0, 3.0]])
+    assert np.allclose(storage.read_shadow_work()[:, :, 0], [0.0, 0.1])
+    assert np.allclose(storage.read_equilibrium_reduced_potentials()[:, 0], [0.0, 1.0, 2.0])
+    assert np.allclose(storage.read_reduced_potential_differences(), 0.5)
+    assert np.all(storage.read_equilibrium_trajectory_frames()[:, 1] == [[0, 1], [1, 2], [2, 3]])
+    assert np.all(storage.read_equilibrium_indices() == [[10, 10], [11, 11], [12, 12]])
+    storage.close()
+
 def run_sampler(sampler, niterations):
     sampler.run(niterations)
 
@@ -675,6 +675,35 @@ def test_molecular_atom_mapping():
             print(msg)
             #        raise Exception(msg)
 
+def test_topology_proposal_atom_classes():
+    """
+    Test that the atom classes of a TopologyProposal (stored as masks) are consistent with its atom map
+    """
+    from openmmtools import testsystems
+    from perses.rjmc.topology_proposal import TopologyProposal
+    testsystem = testsystems.AlanineDipeptideExplicit()
+    n_atoms = testsystem.system.getNumParticles()
+    unique_atoms = [0, 2, 3]
+    old_alchemical_atoms = set(range(22))
+    new_to_old_atom_map = {index: index for index in range(n_atoms) if index not in unique_atoms}
+    proposal = TopologyProposal(new_topology=testsystem.topology, new_system=testsystem.system,
+                                old_topology=testsystem.topology, old_system=testsystem.system,
+                                new_to_old_atom_map=new_to_old_atom_map, old_alchemical_atoms=old_alchemical_atoms,
+                                old_chemical_state_key='A', new_chemical_state_key='B', logp_proposal=0.0)
+
+    assert proposal.unique_new_atoms == tuple(unique_atoms)
+    assert proposal.unique_old_atoms == tuple(unique_atoms)
+    assert proposal.old_alchemical_atoms == tuple(sorted(old_alchemical_atoms))
+    assert proposal.old_environment_atoms == tuple(range(22, n_atoms))
+    assert proposal.new_alchemical_atoms == tuple(range(n_atoms))
+    assert len(proposal.new_environment_atoms) == 0
+
+    # the index tuples are cached, and the masks cannot be modified
+    assert proposal.old_environment_atoms is proposal.old_environment_atoms
+    assert np.array_equal(np.flatnonzero(proposal.unique_new_atoms_mask), unique_atoms)
+    assert not proposal.old_alchemical_atoms_mask.flags.writeable
+
+
 if __name__ == "__main__":
 
 #    test_run_point_mutation_propose()
@@ -0,0 +1,93 @@
+"""
+Test utility functions.
+
+"""
+
+################################################################################
+# IMPORTS
+################################################################################
+
+from simtk import openmm, unit
+import numpy as np
+
+from perses.utils.openmm_utils import read_serialized_force_terms
+
+################################################################################
+# TEST OPENMM UTILITIES
+################################################################################
+
+def _check_serialized_terms(force, term_name, attributes, n_term_particles):
+    """
+    Check that the terms read from a serialized force agree with those returned by its get<term_name>Parameters method.
+
+    Parameters
+    ----------
+    force : openmm.Force
+        The force to check
+    term_name : str
+        The XML tag of the terms
+    attributes : list of str
+        The attributes to read, particle indices first
+    n_term_particles : int
+        The number of particle indices of each term
+    """
+    n_terms = getattr(force, 'getNum{}s'.format(term_name))()
+    get_term_parameters = getattr(force, 'get{}Parameters'.format(term_name))
+    terms = read_serialized_force_terms(openmm.XmlSerializer.serialize(force), term_name, attributes)
+    assert n_terms > 0
+    assert terms.shape == (n_terms, len(attributes))
+    for term_index in range(n_terms):
+        term_parameters = get_term_parameters(term_index)
+        # Custom forces return the per-term parameters as one tuple after the particle indices
+        if len(term_parameters) == n_term_particles + 1 and isinstance(term_parameters[-1], (list, tuple)):
+            term_parameters = list(term_parameters[:-1]) + list(term_parameters[-1])
+        expected = [parameter.value_in_unit_system(unit.md_unit_system) if isinstance(parameter, unit.Quantity) else parameter for parameter in term_parameters]
+        assert terms[term_index].tolist() == expected, "{} {} of {}: read {}, expected {}".format(term_name, term_index, force.__class__.__name__, terms[term_index].tolist(), expected)
+
+def test_read_serialized_force_terms():
+    """
+    Test that the terms read from serialized forces agree with the parameters returned by the forces, for every kind of
+    force term read from serialized forces by HybridTopologyFactory and GeometrySystemGenerator
+    """
+    from openmmtools import testsystems
+    system = testsystems.AlanineDipeptideExplicit().system
+    forces = {force.__class__.__name__: force for force in system.getForces()}
+
+    _check_serialized_terms(forces['HarmonicBondForce'], 'Bond', ['p1', 'p2', 'd', 'k'], 2)
+    _check_serialized_terms(forces['HarmonicAngleForce'], 'Angle', ['p1', 'p2', 'p3', 'a', 'k'], 3)
+    _check_serialized_terms(forces['PeriodicTorsionForce'], 'Torsion', ['p1', 'p2', 'p3', 'p4', 'periodicity', 'phase', 'k'], 4)
+    _check_serialized_terms(forces['NonbondedForce'], 'Particle', ['q', 'sig', 'eps'], 0)
+    _check_serialized_terms(forces['NonbondedForce'], 'Exception', ['p1', 'p2', 'q', 'sig', 'eps'], 2)
+
+    # The hybrid core bond and angle forces, whose terms are indexed from their serialization, are custom forces
+    custom_bond_force = openmm.CustomBondForce('lambda_bonds*K*(r-r0)^2')
+    custom_angle_force = openmm.CustomAngleForce('lambda_angles*K*(theta-theta0)^2')
+    # Use more than ten parameters, so that the serialized attributes param10 and param2 are not in parameter order
+    for parameter_index in range(11):
+        custom_bond_force.addPerBondParameter('p{}'.format(parameter_index))
+        custom_angle_force.addPerAngleParameter('p{}'.format(parameter_index))
+    for bond_index in range(forces['HarmonicBondForce'].getNumBonds()):
+        p1, p2, r0, K = forces['HarmonicBondForce'].getBondParameters(bond_index)
+        custom_bond_force.addBond(p1, p2, [bond_index + 0.5 * parameter_index for parameter_index in range(11)])
+    for angle_index in range(forces['HarmonicAngleForce'].getNumAngles()):
+        p1, p2, p3, theta0, K = forces['HarmonicAngleForce'].getAngleParameters(angle_index)
+        custom_angle_force.addAngle(p1, p2, p3, [angle_index + 0.5 * parameter_index for parameter_index in range(11)])
+    parameter_attributes = ['param{}'.format(parameter_index + 1) for parameter_index in range(11)]
+    _check_serialized_terms(custom_bond_force, 'Bond', ['p1', 'p2'] + parameter_attributes, 2)
+    _check_serialized_terms(custom_angle_force, 'Angle', ['p1', 'p2', 'p3'] + parameter_attributes, 3)
+
+def test_read_serialized_force_terms_errors():
+    """
+    Test that serialized terms that cannot be read unambiguously raise an error instead of being misread
+    """
+    bond_force = openmm.HarmonicBondForce()
+    bond_force.addBond(0, 1, 0.1, 1000.0)
+    # The first case reads an attribute the bonds do not have; in the second, one bond has no force constant
+    inconsistent_xml = '<Bonds>\n<Bond d="0.1" k="1000" p1="0" p2="1"/>\n<Bond d="0.1" p1="1" p2="2"/>\n<Bond d="0.1" k="1000" p1="2" p2="3"/>\n</Bonds>'
+    for xml, attributes in [(openmm.XmlSerializer.serialize(bond_force), ['p1', 'p2', 'r0', 'k']), (inconsistent_xml, ['p1', 'p2', 'd', 'k'])]:
+        try:
+            read_serialized_force_terms(xml, 'Bond', attributes)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Reading {} from {} did not raise a ValueError".format(attributes, xml))
@@ -935,7 +935,7 @@ def generate_vacuum_topology_proposal(current_mol_name="benzene", proposed_mol_n
 
     return topology_proposal, old_positions, new_positions
 
-def generate_solvated_hybrid_test_topology(current_mol_name="naphthalene", proposed_mol_name="benzene"):
+def generate_solvated_hybrid_test_topology(current_mol_name="naphthalene", proposed_mol_name="benzene", padding=9.0*unit.angstrom):
     """
     Generate a test solvated topology proposal, current positions, and new positions triplet
     from two IUPAC molecule names.
@@ -946,6 +946,8 @@ def generate_solvated_hybrid_test_topology(current_mol_name="naphthalene", propo
         name of the first molecule
     proposed_mol_name : str, optional
         name of the second molecule
+    padding : simtk.unit.Quantity with units compatible with nanometers, optional, default 9 angstroms
+        The solvent padding around the molecule
 
     Returns
     -------
@@ -972,7 +974,7 @@ def generate_solvated_hybrid_test_topology(current_mol_name="naphthalene", propo
     forcefield.registerTemplateGenerator(forcefield_generators.gaffTemplateGenerator)
 
     modeller = app.Modeller(top_old, pos_old)
-    modeller.addSolvent(forcefield, model='tip3p', padding=9.0*unit.angstrom)
+    modeller.addSolvent(forcefield, model='tip3p', padding=padding)
     solvated_topology = modeller.getTopology()
     solvated_positions = modeller.getPositions()
     solvated_system = forcefield.createSystem(solvated_topology, nonbondedMethod=app.PME, removeCMMotion=False)
@@ -0,0 +1,56 @@
+"""
+Utility functions for working with OpenMM objects.
+"""
+
+import re
+import numpy as np
+
+def read_serialized_force_terms(xml, term_name, attributes):
+    """
+    Read attributes of all the terms of one kind from a force serialized with openmm.XmlSerializer.
+
+    Reading all the terms from one serialization is much faster than calling the get<term_name>Parameters method of
+    the force for each term, which creates Quantities. This relies on the format written by XmlSerializer:
+
+    * each term is an empty element named after the term, e.g. ``<Bond d="..." k="..." p1="..." p2="..."/>``
+    * the elements appear in the order in which the terms were added to the force
+    * all the terms of one kind have the same attributes, in the same order
+    * parameters are written as plain numbers in md_unit_system, and per-term parameters of custom forces are
+      written as ``param1``, ``param2``, ...
+
+    If the serialized terms do not have this form, a ValueError is raised rather than returning misread parameters.
+
+    Parameters
+    ----------
+    xml : str
+        The force serialized with openmm.XmlSerializer
+    term_name : str
+        The XML tag of the terms, e.g. 'Bond', 'Angle', 'Torsion', 'Particle', or 'Exception'
+    attributes : list of str
+        The attributes to read, e.g. ['p1', 'p2', 'd', 'k'] for the bonds of a HarmonicBondForce
+
+    Returns
+    -------
+    terms : np.ndarray of shape (n_terms, len(attributes))
+        The attributes of each term (implicitly in md_unit_system), in the order in which the terms appear in the force
+    """
+    first_term = re.search(r'<{}\s([^>]*?)/>'.format(term_name), xml)
+    if first_term is None:
+        return np.zeros([0, len(attributes)], np.float64)
+
+    term_attributes = re.findall(r'(\w+)="', first_term.group(1))
+    missing_attributes = [attribute for attribute in attributes if attribute not in term_attributes]
+    if missing_attributes:
+        raise ValueError("The serialized {} terms have no attributes {} (found {})".format(term_name, missing_attributes, term_attributes))
+
+    # Match terms with exactly the attributes of the first one, capturing the requested attributes in the order in
+    # which they are serialized; a term with other attributes would not match, so the number of terms is checked
+    capture_order = [attribute for attribute in term_attributes if attribute in attributes]
+    attribute_patterns = [r'{}="([^"]*)"'.format(attribute) if attribute in attributes else r'{}="[^"]*"'.format(attribute) for attribute in term_attributes]
+    pattern = r'<{}\s+'.format(term_name) + r'\s+'.join(attribute_patterns) + r'\s*/>'
+    terms = np.array(re.findall(pattern, xml), dtype=np.float64).reshape(-1, len(capture_order))
+    n_terms = len(re.findall(r'<{}\s'.format(term_name), xml))
+    if len(terms) != n_terms:
+        raise ValueError("Only {} of the {} serialized {} terms have the attributes {}".format(len(terms), n_terms, term_name, term_attributes))
+
+    return terms[:, [capture_order.index(attribute) for attribute in attributes]]
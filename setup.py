@@ -74,7 +74,7 @@ setup(name='perses',
       url='https://github.com/choderalab/perses',
       platforms=['Linux', 'Mac OS-X', 'Unix'],
       classifiers=CLASSIFIERS.splitlines(),
-      packages=['perses', 'perses.storage', 'perses.analysis', 'perses.samplers', 'perses.rjmc', 'perses.annihilation', 'perses.bias', 'perses.tests', 'perses.dispersed'],
+      packages=['perses', 'perses.storage', 'perses.analysis', 'perses.samplers', 'perses.rjmc', 'perses.annihilation', 'perses.bias', 'perses.tests', 'perses.dispersed', 'perses.utils'],
       #package_data={'perses' : find_package_data('perses','examples') + find_package_data('perses','data')}, # I don't think this works
       package_data={'perses' : find_package_data('perses/data', 'perses')}, # I think this is fixed
       zip_safe=False,